@@ -24,6 +24,10 @@ from models.user import User
 from models.indicator import Indicator
 from models.regulation import Regulation
 from models.analysis import Analysis
+from models.analysis_result import AnalysisResult
+from models.analysis_partition import AnalysisPartition
+from models.job import Job
+from models.rate_budget import RateBudget, RateBudgetMember
 from models.indicator_status import IndicatorStatus
 from models.report import Report
 
@@ -0,0 +1,32 @@
+"""add vss context usage to analysis
+
+Revision ID: 3c1f9a2d7b10
+Revises: aaea473277f4
+Create Date: 2026-10-17 16:05:12.418230
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3c1f9a2d7b10'
+down_revision: Union[str, Sequence[str], None] = 'aaea473277f4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('analysis', sa.Column('vss_context_mode', sa.String(), nullable=True))
+    op.add_column('analysis', sa.Column('vss_tokens_sent', sa.Integer(), nullable=True))
+    op.add_column('analysis', sa.Column('vss_tokens_saved', sa.Integer(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('analysis', 'vss_tokens_saved')
+    op.drop_column('analysis', 'vss_tokens_sent')
+    op.drop_column('analysis', 'vss_context_mode')
@@ -0,0 +1,34 @@
+"""add regulation ingestion progress
+
+Revision ID: 4b8f2e6a1d93
+Revises: 7d3e9b1c4a62
+Create Date: 2026-10-18 00:12:07.518342
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4b8f2e6a1d93'
+down_revision: Union[str, Sequence[str], None] = '7d3e9b1c4a62'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('regulations', sa.Column('pages_total', sa.Integer(), nullable=True))
+    op.add_column('regulations', sa.Column('pages_done', sa.Integer(), nullable=True))
+    op.add_column('regulations', sa.Column('chunks_total', sa.Integer(), nullable=True))
+    op.add_column('regulations', sa.Column('vectors_upserted', sa.Integer(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('regulations', 'vectors_upserted')
+    op.drop_column('regulations', 'chunks_total')
+    op.drop_column('regulations', 'pages_done')
+    op.drop_column('regulations', 'pages_total')
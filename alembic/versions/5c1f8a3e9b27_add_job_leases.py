@@ -0,0 +1,34 @@
+"""add job leases
+
+Revision ID: 5c1f8a3e9b27
+Revises: 0b6e9d2f7a15
+Create Date: 2026-10-17 21:14:08.402617
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5c1f8a3e9b27'
+down_revision: Union[str, Sequence[str], None] = '0b6e9d2f7a15'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('jobs', sa.Column('worker_id', sa.String(), nullable=True))
+    op.add_column('jobs', sa.Column('lease_expires_at', sa.DateTime(), nullable=True))
+    op.add_column('jobs', sa.Column('heartbeat_at', sa.DateTime(), nullable=True))
+    op.create_index(op.f('ix_jobs_lease_expires_at'), 'jobs', ['lease_expires_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_jobs_lease_expires_at'), table_name='jobs')
+    op.drop_column('jobs', 'heartbeat_at')
+    op.drop_column('jobs', 'lease_expires_at')
+    op.drop_column('jobs', 'worker_id')
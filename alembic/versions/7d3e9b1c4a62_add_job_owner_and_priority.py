@@ -0,0 +1,32 @@
+"""add job owner and priority
+
+Revision ID: 7d3e9b1c4a62
+Revises: e2b7c5d90a41
+Create Date: 2026-10-17 23:31:40.285193
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7d3e9b1c4a62'
+down_revision: Union[str, Sequence[str], None] = 'e2b7c5d90a41'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('jobs', sa.Column('owner', sa.String(), nullable=True))
+    op.add_column('jobs', sa.Column('priority', sa.String(), nullable=True))
+    op.create_index(op.f('ix_jobs_owner'), 'jobs', ['owner'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_jobs_owner'), table_name='jobs')
+    op.drop_column('jobs', 'priority')
+    op.drop_column('jobs', 'owner')
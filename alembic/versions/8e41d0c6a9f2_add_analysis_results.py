@@ -0,0 +1,47 @@
+"""add analysis results
+
+Revision ID: 8e41d0c6a9f2
+Revises: 3c1f9a2d7b10
+Create Date: 2026-10-17 16:42:37.905113
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8e41d0c6a9f2'
+down_revision: Union[str, Sequence[str], None] = '3c1f9a2d7b10'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('analysis_results',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('analysis_id', sa.Integer(), nullable=False),
+    sa.Column('indicator_id', sa.String(), nullable=False),
+    sa.Column('result', sa.Text(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['analysis_id'], ['analysis.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('analysis_id', 'indicator_id', name='uq_analysis_indicator')
+    )
+    op.create_index(op.f('ix_analysis_results_analysis_id'), 'analysis_results', ['analysis_id'], unique=False)
+    op.create_index(op.f('ix_analysis_results_id'), 'analysis_results', ['id'], unique=False)
+    op.add_column('analysis', sa.Column('process_id', sa.String(), nullable=True))
+    op.add_column('analysis', sa.Column('namespace', sa.String(), nullable=True))
+    op.add_column('analysis', sa.Column('vss_paths', sa.Text(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('analysis', 'vss_paths')
+    op.drop_column('analysis', 'namespace')
+    op.drop_column('analysis', 'process_id')
+    op.drop_index(op.f('ix_analysis_results_id'), table_name='analysis_results')
+    op.drop_index(op.f('ix_analysis_results_analysis_id'), table_name='analysis_results')
+    op.drop_table('analysis_results')
@@ -0,0 +1,51 @@
+"""add analysis partitions
+
+Revision ID: 9a4d2c7e1f38
+Revises: 5c1f8a3e9b27
+Create Date: 2026-10-17 22:02:51.118304
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9a4d2c7e1f38'
+down_revision: Union[str, Sequence[str], None] = '5c1f8a3e9b27'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('analysis_partitions',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('analysis_id', sa.Integer(), nullable=False),
+    sa.Column('position', sa.Integer(), nullable=False),
+    sa.Column('first_indicator_id', sa.Integer(), nullable=False),
+    sa.Column('last_indicator_id', sa.Integer(), nullable=False),
+    sa.Column('indicator_count', sa.Integer(), nullable=False),
+    sa.Column('status', sa.String(), nullable=True),
+    sa.Column('job_id', sa.Integer(), nullable=True),
+    sa.Column('usage', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('finished_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['analysis_id'], ['analysis.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('analysis_id', 'position', name='uq_analysis_partition')
+    )
+    op.create_index(op.f('ix_analysis_partitions_analysis_id'), 'analysis_partitions', ['analysis_id'], unique=False)
+    op.create_index(op.f('ix_analysis_partitions_id'), 'analysis_partitions', ['id'], unique=False)
+    op.add_column('analysis', sa.Column('partition_count', sa.Integer(), nullable=True))
+    op.add_column('analysis', sa.Column('merge_queued_at', sa.DateTime(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('analysis', 'merge_queued_at')
+    op.drop_column('analysis', 'partition_count')
+    op.drop_index(op.f('ix_analysis_partitions_id'), table_name='analysis_partitions')
+    op.drop_index(op.f('ix_analysis_partitions_analysis_id'), table_name='analysis_partitions')
+    op.drop_table('analysis_partitions')
@@ -0,0 +1,30 @@
+"""add llm batch to analysis
+
+Revision ID: a7d3f1c9e5b2
+Revises: d8e2b4a6c1f7
+Create Date: 2026-10-18 11:02:37.518204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a7d3f1c9e5b2'
+down_revision: Union[str, Sequence[str], None] = 'd8e2b4a6c1f7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('analysis', sa.Column('llm_batch', sa.Text(), nullable=True))
+    op.add_column('analysis_partitions', sa.Column('llm_batch', sa.Text(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('analysis_partitions', 'llm_batch')
+    op.drop_column('analysis', 'llm_batch')
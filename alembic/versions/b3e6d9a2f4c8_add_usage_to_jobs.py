@@ -0,0 +1,28 @@
+"""add usage to jobs
+
+Revision ID: b3e6d9a2f4c8
+Revises: a7d3f1c9e5b2
+Create Date: 2026-10-18 15:26:51.204937
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b3e6d9a2f4c8'
+down_revision: Union[str, Sequence[str], None] = 'a7d3f1c9e5b2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('jobs', sa.Column('usage', sa.Text(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('jobs', 'usage')
@@ -0,0 +1,34 @@
+"""add result fingerprints
+
+Revision ID: b7d25e1f4c83
+Revises: 8e41d0c6a9f2
+Create Date: 2026-10-17 17:20:03.114592
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7d25e1f4c83'
+down_revision: Union[str, Sequence[str], None] = '8e41d0c6a9f2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('analysis_results', sa.Column('fingerprint', sa.String(), nullable=True))
+    op.add_column('analysis_results', sa.Column('reused', sa.Boolean(), nullable=True))
+    op.create_index(op.f('ix_analysis_results_fingerprint'), 'analysis_results', ['fingerprint'], unique=False)
+    op.add_column('analysis', sa.Column('reused_results', sa.Integer(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('analysis', 'reused_results')
+    op.drop_index(op.f('ix_analysis_results_fingerprint'), table_name='analysis_results')
+    op.drop_column('analysis_results', 'reused')
+    op.drop_column('analysis_results', 'fingerprint')
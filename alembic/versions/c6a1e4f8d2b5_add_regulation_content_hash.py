@@ -0,0 +1,34 @@
+"""add regulation content hash
+
+Revision ID: c6a1e4f8d2b5
+Revises: 4b8f2e6a1d93
+Create Date: 2026-10-18 01:04:52.730116
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c6a1e4f8d2b5'
+down_revision: Union[str, Sequence[str], None] = '4b8f2e6a1d93'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('regulations', sa.Column('content_hash', sa.String(), nullable=True))
+    op.add_column('regulations', sa.Column('chunks_reused', sa.Integer(), nullable=True))
+    op.add_column('regulations', sa.Column('vectors_deleted', sa.Integer(), nullable=True))
+    op.create_index(op.f('ix_regulations_content_hash'), 'regulations', ['content_hash'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_regulations_content_hash'), table_name='regulations')
+    op.drop_column('regulations', 'vectors_deleted')
+    op.drop_column('regulations', 'chunks_reused')
+    op.drop_column('regulations', 'content_hash')
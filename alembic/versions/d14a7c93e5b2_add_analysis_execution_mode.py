@@ -0,0 +1,28 @@
+"""add analysis execution mode
+
+Revision ID: d14a7c93e5b2
+Revises: b7d25e1f4c83
+Create Date: 2026-10-17 17:51:44.602871
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd14a7c93e5b2'
+down_revision: Union[str, Sequence[str], None] = 'b7d25e1f4c83'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('analysis', sa.Column('execution_mode', sa.String(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('analysis', 'execution_mode')
@@ -0,0 +1,30 @@
+"""add regulation document key
+
+Revision ID: d8e2b4a6c1f7
+Revises: c6a1e4f8d2b5
+Create Date: 2026-10-18 09:41:26.104857
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd8e2b4a6c1f7'
+down_revision: Union[str, Sequence[str], None] = 'c6a1e4f8d2b5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('regulations', sa.Column('document_key', sa.String(), nullable=True))
+    op.create_index(op.f('ix_regulations_document_key'), 'regulations', ['document_key'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_regulations_document_key'), table_name='regulations')
+    op.drop_column('regulations', 'document_key')
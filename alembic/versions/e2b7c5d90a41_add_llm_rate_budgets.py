@@ -0,0 +1,47 @@
+"""add llm rate budgets
+
+Revision ID: e2b7c5d90a41
+Revises: 9a4d2c7e1f38
+Create Date: 2026-10-17 22:48:19.730562
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e2b7c5d90a41'
+down_revision: Union[str, Sequence[str], None] = '9a4d2c7e1f38'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('llm_rate_budgets',
+    sa.Column('model', sa.String(), nullable=False),
+    sa.Column('requests', sa.Float(), nullable=False),
+    sa.Column('tokens', sa.Float(), nullable=False),
+    sa.Column('updated_at', sa.Float(), nullable=False),
+    sa.Column('paused_until', sa.Float(), nullable=True),
+    sa.Column('version', sa.Integer(), nullable=True),
+    sa.PrimaryKeyConstraint('model')
+    )
+    op.create_table('llm_rate_budget_members',
+    sa.Column('model', sa.String(), nullable=False),
+    sa.Column('member', sa.String(), nullable=False),
+    sa.Column('requests', sa.Float(), nullable=False),
+    sa.Column('tokens', sa.Float(), nullable=False),
+    sa.Column('updated_at', sa.Float(), nullable=False),
+    sa.PrimaryKeyConstraint('model', 'member')
+    )
+    op.create_index(op.f('ix_llm_rate_budget_members_updated_at'), 'llm_rate_budget_members', ['updated_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_llm_rate_budget_members_updated_at'), table_name='llm_rate_budget_members')
+    op.drop_table('llm_rate_budget_members')
+    op.drop_table('llm_rate_budgets')
@@ -0,0 +1,32 @@
+"""add llm usage to jobs
+
+Revision ID: f3a8c2e61d94
+Revises: d14a7c93e5b2
+Create Date: 2026-10-17 19:12:08.331457
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f3a8c2e61d94'
+down_revision: Union[str, Sequence[str], None] = 'd14a7c93e5b2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('analysis', sa.Column('usage', sa.Text(), nullable=True))
+    op.add_column('indicator_statuses', sa.Column('usage', sa.Text(), nullable=True))
+    op.add_column('reports', sa.Column('usage', sa.Text(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('reports', 'usage')
+    op.drop_column('indicator_statuses', 'usage')
+    op.drop_column('analysis', 'usage')
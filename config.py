@@ -1,5 +1,7 @@
 # config.py
 
+from typing import Any, Dict
+
 from pydantic import SecretStr
 from pydantic_settings import BaseSettings
 from dotenv import load_dotenv
@@ -18,6 +20,141 @@ class Settings(BaseSettings):
     PINECONE_NAMESPACE: str = ""
     REGION: str = "us-east-1"
     CLOUD: str = "aws"
+    # "full" sends every VSS document with each analysis sub-batch,
+    # "retrieved" sends only the top-k VSS passages for the sub-batch.
+    VSS_CONTEXT_MODE: str = "full"
+    VSS_RETRIEVAL_TOP_K: int = 8
+    VSS_CHUNK_SIZE: int = 1500
+    VSS_CHUNK_OVERLAP: int = 250
+    LLM_CACHE_ENABLED: bool = False
+    LLM_CACHE_PATH: str = "llm_cache/responses.sqlite3"
+    LLM_CACHE_MAX_BYTES: int = 512 * 1024 * 1024
+    LLM_CACHE_MAX_ENTRIES: int = 100_000
+    LLM_CACHE_TTL_SECONDS: int = 30 * 24 * 3600
+    # On-disk cache of embedding vectors (float32), shared by ingestion and retrieval
+    EMBEDDING_CACHE_ENABLED: bool = True
+    EMBEDDING_CACHE_PATH: str = "llm_cache/embeddings.sqlite3"
+    EMBEDDING_CACHE_MAX_BYTES: int = 1024 * 1024 * 1024
+    EMBEDDING_CACHE_MAX_ENTRIES: int = 200_000
+    # Stream analysis completions and abort them once they go off-format
+    LLM_STREAMING: bool = True
+    LLM_STREAM_MAX_PREFIX_CHARS: int = 32
+    # Shared rate limiter defaults; LLM_MODEL_CONFIG can override rpm/tpm per model
+    OPENAI_RPM_LIMIT: int = 500
+    OPENAI_TPM_LIMIT: int = 200_000
+    # Embedding models have limits of their own
+    OPENAI_EMBEDDING_RPM_LIMIT: int = 3_000
+    OPENAI_EMBEDDING_TPM_LIMIT: int = 1_000_000
+    LLM_MAX_CONCURRENCY: int = 32
+    LLM_MIN_CONCURRENCY: int = 1
+    LLM_INITIAL_CONCURRENCY: int = 8
+    # Share the RPM/TPM budget with every process using this database; credits
+    # are leased ahead in chunks of LEASE_FRACTION of the limit, and processes
+    # that leased within MEMBER_TTL split the limit evenly
+    LLM_SHARED_RATE_LIMIT: bool = False
+    LLM_RATE_BUDGET_LEASE_FRACTION: float = 0.02
+    LLM_RATE_BUDGET_MEMBER_TTL_SECONDS: float = 10.0
+    # USD per million tokens, used for per-job cost accounting
+    LLM_PRICING: Dict[str, Dict[str, float]] = {
+        "gpt-4o-mini": {"input": 0.15, "cached_input": 0.075, "output": 0.60},
+        "gpt-4o": {"input": 2.50, "cached_input": 1.25, "output": 10.00},
+        "text-embedding-ada-002": {"input": 0.10},
+    }
+    # Circuit breaker: open after N consecutive server errors/timeouts, probe
+    # again after RESET seconds, give up once an outage lasts MAX_OUTAGE seconds
+    LLM_CIRCUIT_FAILURE_THRESHOLD: int = 5
+    LLM_CIRCUIT_RESET_SECONDS: float = 30.0
+    LLM_CIRCUIT_MAX_OUTAGE_SECONDS: float = 900.0
+    # Connection pool shared by every LLM client (HTTP/2 needs the h2 package)
+    LLM_HTTP2: bool = True
+    LLM_MAX_CONNECTIONS: int = 100
+    LLM_MAX_KEEPALIVE_CONNECTIONS: int = 20
+    LLM_KEEPALIVE_EXPIRY: float = 30.0
+    LLM_TIMEOUT_SECONDS: float = 600.0
+    LLM_CONNECT_TIMEOUT_SECONDS: float = 10.0
+    LLM_MAX_RETRIES: int = 2
+    # Per-model overrides as JSON, e.g.
+    # {"gpt-4o": {"timeout": 120, "max_retries": 4, "rpm": 5000, "tpm": 800000}}
+    LLM_MODEL_CONFIG: Dict[str, Dict[str, Any]] = {}
+    RAG_CONCURRENCY: int = 16
+    # Indicators per batched RAG search, and texts per embedding request
+    RAG_QUERY_BATCH_SIZE: int = 100
+    RAG_EMBED_BATCH_SIZE: int = 100
+    # Evidence passages per indicator, and hybrid retrieval: BM25 over regulation
+    # chunks (built at ingestion under LEXICAL_INDEX_DIR) fused with the vector
+    # matches by reciprocal rank; each side contributes CANDIDATES matches
+    RAG_TOP_K: int = 8
+    RAG_HYBRID_ENABLED: bool = True
+    RAG_HYBRID_CANDIDATES: int = 20
+    RAG_HYBRID_LEXICAL_WEIGHT: float = 1.0
+    RAG_HYBRID_RRF_K: int = 60
+    LEXICAL_INDEX_DIR: str = "lexical_index"
+    # Vector store: "pinecone" or "local" (in-process index persisted per
+    # namespace under LOCAL_VECTOR_DIR)
+    VECTOR_BACKEND: str = "pinecone"
+    LOCAL_VECTOR_DIR: str = "vector_index"
+    # Regulation ingestion: pages per extraction task in the process pool,
+    # concurrent embed/upsert workers and the bounded queues between stages
+    INGEST_CHUNK_SIZE: int = 1500
+    INGEST_CHUNK_OVERLAP: int = 250
+    INGEST_PAGES_PER_TASK: int = 10
+    INGEST_EXTRACT_PROCESSES: int = 4
+    INGEST_EMBED_CONCURRENCY: int = 4
+    INGEST_UPSERT_CONCURRENCY: int = 4
+    INGEST_QUEUE_SIZE: int = 8
+    RAG_RETRIEVAL_WORKERS: int = 2
+    # Token budgets for packing indicators into analysis sub-batches
+    ANALYSIS_BATCH_INPUT_TOKENS: int = 12_000
+    ANALYSIS_BATCH_OUTPUT_TOKENS: int = 8_000
+    ANALYSIS_OUTPUT_TOKENS_PER_INDICATOR: int = 700
+    ANALYSIS_BATCH_MAX_INDICATORS: int = 10
+    # Packed sub-batches held back so the largest of them are sent first
+    ANALYSIS_BATCH_LOOKAHEAD: int = 8
+    # Analysis pipeline: bounded queues between retrieval, packing and LLM stages
+    ANALYSIS_EVIDENCE_QUEUE_SIZE: int = 200
+    ANALYSIS_BATCH_QUEUE_SIZE: int = 32
+    ANALYSIS_LLM_WORKERS: int = 32
+    # Reuse stored indicator results whose fingerprint is unchanged
+    ANALYSIS_RESULT_REUSE: bool = True
+    # Cap on LLM calls made by retries per job: max(MIN_CALLS, first-pass batches * RATIO)
+    ANALYSIS_RETRY_BUDGET_RATIO: float = 0.5
+    ANALYSIS_RETRY_MIN_CALLS: int = 10
+    # Analyses with more indicators run as partition jobs of this size (0 disables)
+    ANALYSIS_PARTITION_SIZE: int = 500
+    # Offline batch-API execution: "openai" or the "local" stand-in
+    LLM_BATCH_BACKEND: str = "openai"
+    LLM_BATCH_COMPLETION_WINDOW: str = "24h"
+    LLM_BATCH_POLL_SECONDS: int = 60
+    # The local backend answers without API calls ("stub") or with real chat
+    # calls ("live"); the stub returns LOCAL_RESPONSE, or a placeholder result
+    # per indicator when it is empty
+    LLM_BATCH_LOCAL_RESPONDER: str = "stub"
+    LLM_BATCH_LOCAL_RESPONSE: str = ""
+    # Fair scheduling: analyses up to this many indicators use the interactive
+    # lane; tenants (JWT sub) share each lane in proportion to their weight
+    SCHEDULER_INTERACTIVE_MAX_INDICATORS: int = 100
+    SCHEDULER_TENANT_WEIGHTS: Dict[str, float] = {}
+    # Background job runner: worker slots per job type, attempts and backoff
+    JOB_CONCURRENCY: Dict[str, int] = {
+        "analysis": 2,
+        "analysis_partition": 2,
+        "regulation_embedding": 2,
+        "indicator_extraction": 4,
+        "report": 2,
+    }
+    JOB_DEFAULT_CONCURRENCY: int = 1
+    JOB_MAX_ATTEMPTS: int = 3
+    JOB_RETRY_BACKOFF_SECONDS: float = 30.0
+    JOB_POLL_SECONDS: float = 2.0
+    # Queued jobs considered per free slot when picking fairly between owners
+    JOB_CLAIM_WINDOW: int = 20
+    # Worker leases: running jobs are re-queued when heartbeats stop for this long
+    JOB_LEASE_SECONDS: float = 60.0
+    JOB_HEARTBEAT_SECONDS: float = 15.0
+    # Set to False on API nodes when separate worker.py processes run the jobs
+    JOB_RUN_IN_API: bool = True
+    # Threads for synchronous job handlers (e.g. regulation embedding)
+    JOB_SYNC_WORKERS: int = 4
 
     class Config:
         env_file = ".env"
@@ -1,6 +1,7 @@
 INDICATOR_EXTRACT_ERROR = "Indicator extraction failed: {}"
 INDICATOR_STATUS_NOT_FOUND = "IndicatorStatus with id {} not found."
 INDICATOR_FILE_PATH_TEMPLATE = "indicators/extract_{}.xlsx"
+INDICATOR_UPLOAD_DIR = "indicator_uploads"
 INDICATOR_EXCEL_MEDIA_TYPE = (
     "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
 )
@@ -1,29 +1,168 @@
 import os
+import json
 import uuid
-from fastapi import BackgroundTasks, HTTPException, UploadFile
+from fastapi import HTTPException, UploadFile
 from fastapi.responses import FileResponse
 from sqlalchemy.orm import Session
-from enums.analysis import AnalysisStatusEnum
+from enums.analysis import (
+    AnalysisExecutionModeEnum,
+    AnalysisStatusEnum,
+    VSSContextModeEnum,
+)
 from constants.analysis import (
     ANALYSIS_EXTRACT_ERROR,
     ANALYSIS_STATUS_NOT_FOUND,
     ANALYSIS_FILE_PATH_TEMPLATE,
     ANALYSIS_EXCEL_MEDIA_TYPE,
 )
+from enums.job import JobPriorityEnum, JobTypeEnum
+from schemas.analysis import AnalysisOut
 from services.analysis import AnalysisService
+from services.jobs import job_runner
+from services.openAI.scheduler import current_scheduling
+from services.openAI.usage import usage_headers
 from models.analysis import Analysis
+from models.indicator import Indicator
+from config import settings
 import logging
 
 analysis_service = AnalysisService()
 logger = logging.getLogger(__name__)
 
 
+async def run_analysis_job(
+    db: Session,
+    analysis_id: int,
+    vss_paths: list[str],
+    process_id: str,
+    namespace: str,
+    vss_context_mode: str | None = None,
+    execution_mode: str | None = None,
+):
+    """Job handler; a retried or recovered run resumes from the saved results.
+
+    Analyses larger than ``ANALYSIS_PARTITION_SIZE`` are handed to partition
+    jobs instead, which any worker can pick up.
+    """
+    analysis_service.update_analysis_status(
+        db, analysis_id, AnalysisStatusEnum.IN_PROGRESS.value
+    )
+    if analysis_service.plan_partitions(db, analysis_id, process_id):
+        # Embedded once here and loaded by every partition
+        await analysis_service.prepare_vss_index(
+            db, analysis_id, vss_paths, vss_context_mode
+        )
+        enqueue_partition_jobs(
+            db,
+            analysis_id,
+            {
+                "vss_paths": vss_paths,
+                "process_id": process_id,
+                "namespace": namespace,
+                "vss_context_mode": vss_context_mode,
+                "execution_mode": execution_mode,
+            },
+        )
+        return
+    await analysis_service.run_analysis(
+        db,
+        vss_paths,
+        analysis_id,
+        process_id,
+        namespace,
+        vss_context_mode,
+        execution_mode,
+    )
+
+
+def enqueue_partition_jobs(db: Session, analysis_id: int, payload: dict):
+    """Queue every unfinished partition, or the merge once all are done.
+
+    Called from the analysis job, whose lane the partitions and merge keep.
+    """
+    priority = current_scheduling().priority
+    pending = analysis_service.pending_partitions(db, analysis_id)
+    for partition in pending:
+        job = job_runner.enqueue(
+            db,
+            JobTypeEnum.ANALYSIS_PARTITION.value,
+            {"partition_id": partition.id, **payload},
+            priority=priority,
+        )
+        analysis_service.set_partition_job(db, int(partition.id), int(job.id))
+    if pending:
+        logger.info(f"Analysis {analysis_id}: queued {len(pending)} partition jobs")
+        return
+    merge = analysis_service.active_job(db, analysis_id, [JobTypeEnum.ANALYSIS_MERGE.value])
+    if merge is not None:
+        logger.info(f"Analysis {analysis_id}: merge job {merge.id} is already {merge.status}")
+    elif analysis_service.claim_merge(db, analysis_id, force=True):
+        job_runner.enqueue(
+            db,
+            JobTypeEnum.ANALYSIS_MERGE.value,
+            {"analysis_id": analysis_id, "process_id": payload["process_id"]},
+            priority=priority,
+        )
+
+
+async def run_analysis_partition_job(
+    db: Session,
+    partition_id: int,
+    vss_paths: list[str],
+    process_id: str,
+    namespace: str,
+    vss_context_mode: str | None = None,
+    execution_mode: str | None = None,
+):
+    """Job handler for one partition; the last one to finish queues the merge."""
+    analysis_id = await analysis_service.run_partition(
+        db,
+        partition_id,
+        vss_paths,
+        process_id,
+        namespace,
+        vss_context_mode,
+        execution_mode,
+    )
+    if analysis_service.claim_merge(db, analysis_id):
+        job_runner.enqueue(
+            db,
+            JobTypeEnum.ANALYSIS_MERGE.value,
+            {"analysis_id": analysis_id, "process_id": process_id},
+            priority=current_scheduling().priority,
+        )
+
+
+def merge_analysis_job(db: Session, analysis_id: int, process_id: str):
+    """Job handler writing the output of a partitioned analysis."""
+    analysis_service.merge_partitions(db, analysis_id, process_id)
+
+
+def analysis_priority(db: Session, process_id: str) -> str:
+    """Small analyses run in the interactive lane, large ones in the batch lane."""
+    count = db.query(Indicator).filter(Indicator.process_id == process_id).count()
+    if count <= settings.SCHEDULER_INTERACTIVE_MAX_INDICATORS:
+        return JobPriorityEnum.INTERACTIVE.value
+    return JobPriorityEnum.BATCH.value
+
+
+job_runner.register(JobTypeEnum.ANALYSIS.value, run_analysis_job)
+job_runner.register(
+    JobTypeEnum.ANALYSIS_PARTITION.value,
+    run_analysis_partition_job,
+    priority=JobPriorityEnum.BATCH.value,
+)
+job_runner.register(JobTypeEnum.ANALYSIS_MERGE.value, merge_analysis_job)
+
+
 def start_analysis_extraction(
-    background_tasks: BackgroundTasks,
     vss_files: list[UploadFile],
     process_id: str,
     db: Session,
     namespace: str,
+    vss_context_mode: str | None = None,
+    execution_mode: str | None = None,
+    owner: str | None = None,
 ):
     from vector_store.pinecone_store import namespace_exists
 
@@ -31,6 +170,18 @@ def start_analysis_extraction(
         raise HTTPException(
             status_code=400, detail=f"Pinecone namespace '{namespace}' does not exist."
         )
+    valid_modes = [mode.value for mode in VSSContextModeEnum]
+    if vss_context_mode and vss_context_mode not in valid_modes:
+        raise HTTPException(
+            status_code=400,
+            detail=f"vss_context_mode must be one of: {', '.join(valid_modes)}",
+        )
+    valid_execution_modes = [mode.value for mode in AnalysisExecutionModeEnum]
+    if execution_mode and execution_mode not in valid_execution_modes:
+        raise HTTPException(
+            status_code=400,
+            detail=f"execution_mode must be one of: {', '.join(valid_execution_modes)}",
+        )
     vss_paths = []
     for file in vss_files:
         if not file.filename:
@@ -46,29 +197,107 @@ def start_analysis_extraction(
             content = file.file.read()
             f.write(content)
         vss_paths.append(path)
-    analysis = analysis_service.create_analysis(db)
+    analysis = analysis_service.create_analysis(
+        db, process_id, namespace, vss_paths, execution_mode
+    )
     analysis_id = int(getattr(analysis, "id"))
-    background_tasks.add_task(
-        analysis_service.run_analysis, db, vss_paths, analysis_id, process_id, namespace
+    job = job_runner.enqueue(
+        db,
+        JobTypeEnum.ANALYSIS.value,
+        {
+            "analysis_id": analysis_id,
+            "vss_paths": vss_paths,
+            "process_id": process_id,
+            "namespace": namespace,
+            "vss_context_mode": vss_context_mode,
+            "execution_mode": execution_mode,
+        },
+        owner=owner,
+        priority=analysis_priority(db, process_id),
     )
     return {
         "analysis_id": analysis_id,
+        "job_id": job.id,
+        "priority": job.priority,
         "message": "Analysis started. Check status with GET /analysis/{analysis_id}",
     }
 
 
+def resume_analysis_controller(analysis_id: int, db: Session, owner: str | None = None):
+    # Row lock so concurrent resumes of one analysis queue a single job
+    analysis = (
+        db.query(Analysis).filter(Analysis.id == analysis_id).with_for_update().first()
+    )
+    if not analysis:
+        raise HTTPException(status_code=404, detail="Analysis not found")
+    if str(analysis.status) == AnalysisStatusEnum.COMPLETED.value:
+        raise HTTPException(status_code=400, detail="Analysis is already completed")
+    if not analysis.process_id:
+        raise HTTPException(
+            status_code=400, detail="Analysis was created without resume information"
+        )
+    vss_paths = json.loads(str(analysis.vss_paths or "[]"))
+    missing_files = [path for path in vss_paths if not os.path.exists(path)]
+    if missing_files:
+        raise HTTPException(
+            status_code=400,
+            detail=f"VSS files for this analysis are no longer available: {missing_files}",
+        )
+    active = analysis_service.active_job(
+        db,
+        analysis_id,
+        [
+            JobTypeEnum.ANALYSIS.value,
+            JobTypeEnum.ANALYSIS_PARTITION.value,
+            JobTypeEnum.ANALYSIS_MERGE.value,
+        ],
+    )
+    if active is not None:
+        db.rollback()
+        raise HTTPException(
+            status_code=409,
+            detail=f"Analysis is already being processed by {active.job_type} job {active.id}",
+        )
+    # Committed together with the job, which releases the row lock
+    setattr(analysis, "status", AnalysisStatusEnum.IN_PROGRESS.value)
+    job = job_runner.enqueue(
+        db,
+        JobTypeEnum.ANALYSIS.value,
+        {
+            "analysis_id": analysis_id,
+            "vss_paths": vss_paths,
+            "process_id": str(analysis.process_id),
+            "namespace": str(analysis.namespace),
+            "vss_context_mode": analysis.vss_context_mode,
+            "execution_mode": analysis.execution_mode,
+        },
+        owner=owner,
+        priority=analysis_priority(db, str(analysis.process_id)),
+    )
+    return {
+        "analysis_id": analysis_id,
+        "job_id": job.id,
+        "priority": job.priority,
+        "message": "Analysis resumed. Only indicators without a saved result will be re-run.",
+    }
+
+
 def get_analysis_status_controller(analysis_id: int, db: Session):
     analysis = db.query(Analysis).filter(Analysis.id == analysis_id).first()
     if not analysis:
         raise HTTPException(status_code=404, detail="Analysis not found")
     status = str(getattr(analysis, "status", ""))
     output_file = str(getattr(analysis, "output_file", ""))
+    usage = analysis_service.get_usage(db, analysis)
     if status == AnalysisStatusEnum.COMPLETED.value and output_file:
         return FileResponse(
             output_file,
             media_type=ANALYSIS_EXCEL_MEDIA_TYPE,
             filename="analysis_results.xlsx",
+            headers=usage_headers(usage),
         )
-    return analysis
+    return AnalysisOut.model_validate(analysis).model_copy(
+        update={"usage": usage, "progress": analysis_service.get_progress(db, analysis)}
+    )
 
 
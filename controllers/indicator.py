@@ -1,18 +1,23 @@
 import os
 import json
 import pandas as pd
-from fastapi import BackgroundTasks, HTTPException, UploadFile, File
+from fastapi import HTTPException, UploadFile, File
 from fastapi.responses import FileResponse
 from sqlalchemy.orm import Session
 from enums.indicator import IndicatorStatusEnum
+from enums.job import JobTypeEnum
+from enums.usage import UsageJobTypeEnum, UsageStageEnum
 from db import SessionLocal
 from constants.indicator import (
     INDICATOR_EXTRACT_ERROR,
     INDICATOR_STATUS_NOT_FOUND,
     INDICATOR_FILE_PATH_TEMPLATE,
     INDICATOR_EXCEL_MEDIA_TYPE,
+    INDICATOR_UPLOAD_DIR,
 )
 from services.indicator import IndicatorService
+from services.jobs import current_attempt, job_runner
+from services.openAI.usage import job_usage, usage_headers, usage_scope
 from models.indicator_status import IndicatorStatus
 from utils.file_extraction import (
     extract_text_from_pdf_bytes,
@@ -27,31 +32,76 @@ indicator_service = IndicatorService()
 logger = logging.getLogger(__name__)
 
 
-def start_indicator_extraction(
-    background_tasks: BackgroundTasks, file: UploadFile, db: Session
-):
+def start_indicator_extraction(file: UploadFile, db: Session, owner: str | None = None):
     logger.info(f"Received file for indicator extraction: {file.filename}")
     if not file.filename or not file.filename.endswith((".pdf", ".docx")):
         logger.error(f"Unsupported file type: {file.filename}")
         raise HTTPException(
             status_code=400, detail="Only PDF and DOCX files are supported"
         )
-    content = file.file.read()
     filename = file.filename
+    # The job reads the upload from disk so it survives retries and restarts
+    os.makedirs(INDICATOR_UPLOAD_DIR, exist_ok=True)
+    upload_path = os.path.join(INDICATOR_UPLOAD_DIR, f"{uuid.uuid4()}_{filename}")
+    with open(upload_path, "wb") as f:
+        f.write(file.file.read())
     status_job = indicator_service.create_status_job(db)
     status_id = int(getattr(status_job, "id"))
     logger.info(f"Created status job with ID: {status_id}")
-    background_tasks.add_task(
-        process_and_save_indicators_bg, content, filename, status_id
+    job = job_runner.enqueue(
+        db,
+        JobTypeEnum.INDICATOR_EXTRACTION.value,
+        {"upload_path": upload_path, "filename": filename, "status_id": status_id},
+        owner=owner,
     )
-    logger.info(f"Background task started for status ID: {status_id}")
+    logger.info(f"Queued extraction job {job.id} for status ID: {status_id}")
     return {
         "status_id": status_id,
+        "job_id": job.id,
         "message": "Indicator extraction started. Check status with GET /indicators/extract/status/{status_id}",
     }
 
 
-def process_and_save_indicators_bg(content: bytes, filename: str, status_id: int):
+async def extract_indicators_job(
+    db: Session, upload_path: str, filename: str, status_id: int
+):
+    """Job handler; a failed extraction is re-raised so the runner retries it.
+
+    The upload is deleted once the extraction succeeds or its last attempt
+    fails; an interrupted attempt keeps it for the job's next run.
+    """
+    indicator_service.update_status_job(
+        db, status_id, IndicatorStatusEnum.IN_PROGRESS.value
+    )
+    try:
+        with open(upload_path, "rb") as f:
+            content = f.read()
+        with usage_scope(
+            UsageJobTypeEnum.INDICATOR_EXTRACTION.value,
+            status_id,
+            UsageStageEnum.EXTRACT.value,
+        ):
+            try:
+                await extract_and_save_indicators(content, filename, status_id)
+            finally:
+                indicator_service.record_llm_usage(db, status_id)
+    except Exception:
+        attempt = current_attempt()
+        if attempt is None or attempt.final:
+            remove_upload(upload_path)
+        raise
+    remove_upload(upload_path)
+
+
+def remove_upload(upload_path: str):
+    if os.path.exists(upload_path):
+        os.remove(upload_path)
+
+
+job_runner.register(JobTypeEnum.INDICATOR_EXTRACTION.value, extract_indicators_job)
+
+
+async def extract_and_save_indicators(content: bytes, filename: str, status_id: int):
     logger.info(f"[Status {status_id}] Starting extraction for file: {filename}")
     try:
         if filename.endswith(".pdf"):
@@ -66,12 +116,8 @@ def process_and_save_indicators_bg(content: bytes, filename: str, status_id: int
         if not extracted_text:
             logger.error(f"[Status {status_id}] No readable text found in file.")
             raise Exception("No readable text found in file.")
-        import asyncio
-
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
         logger.info(f"[Status {status_id}] Starting LLM indicator parsing...")
-        result_text = loop.run_until_complete(parse_indicators_with_llm(extracted_text))
+        result_text = await parse_indicators_with_llm(extracted_text)
         logger.info(f"[Status {status_id}] LLM parsing complete.")
         data = []
         if isinstance(result_text, list):
@@ -124,6 +170,7 @@ def process_and_save_indicators_bg(content: bytes, filename: str, status_id: int
             db.commit()
             logger.info(f"[Status {status_id}] Status updated to ERROR.")
         db.close()
+        raise
 
 
 def upload_indicators_from_excel(file: UploadFile, db: Session):
@@ -160,11 +207,24 @@ def get_indicator_status_controller(status_id: int, db: Session):
     )
     if not status_job:
         raise HTTPException(status_code=404, detail="Indicator status not found")
+    usage = job_usage(
+        UsageJobTypeEnum.INDICATOR_EXTRACTION.value,
+        status_id,
+        getattr(status_job, "usage", None),
+        db,
+    )
     file_path = getattr(status_job, "file", None)
     if isinstance(file_path, str) and file_path and os.path.exists(file_path):
         return FileResponse(
             file_path,
             media_type=INDICATOR_EXCEL_MEDIA_TYPE,
             filename=os.path.basename(file_path),
+            headers=usage_headers(usage),
         )
-    return status_job
+    return {
+        "id": status_job.id,
+        "status": status_job.status,
+        "created_at": status_job.created_at,
+        "file": file_path,
+        "usage": usage,
+    }
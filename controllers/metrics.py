@@ -0,0 +1,11 @@
+from services.openAI.cache import get_embedding_cache, get_response_cache
+
+
+def get_cache_metrics():
+    """Hit/miss counts and size of this process's LLM response and embedding caches."""
+    response_cache = get_response_cache()
+    embedding_cache = get_embedding_cache()
+    return {
+        "llm_responses": response_cache.stats() if response_cache else None,
+        "embeddings": embedding_cache.stats() if embedding_cache else None,
+    }
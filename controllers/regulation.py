@@ -1,4 +1,6 @@
 from sqlalchemy.orm import Session
+from enums.job import JobPriorityEnum, JobTypeEnum
+from services.jobs import job_runner
 from services.regulation import RegulationService
 import asyncio
 import logging
@@ -8,18 +10,37 @@ logger = logging.getLogger(__name__)
 regulation_service = RegulationService()
 
 
-def create_regulation(db: Session, name: str, file_type: str):
+async def process_regulation_job(db: Session, file_path: str, regulation_id: int):
+    """Job handler; raises so the runner can retry a failed embedding."""
+    regulation_service.update_embedding_status(db, regulation_id, "in process")
+    await regulation_service.process_regulation(db, file_path, regulation_id)
+    logger.info(f"Regulation processing completed for regulation_id={regulation_id}")
+
+
+job_runner.register(
+    JobTypeEnum.REGULATION_EMBEDDING.value,
+    process_regulation_job,
+    priority=JobPriorityEnum.BATCH.value,
+)
+
+
+def create_regulation(
+    db: Session, name: str, file_type: str, document_key: str | None = None
+):
     """Create a new regulation entry using the service layer."""
-    return regulation_service.create_regulation(db, name, file_type)
+    return regulation_service.create_regulation(db, name, file_type, document_key)
 
 
-def process_regulation(db: Session, file_path: str, reg_id: int):
-    """Process a regulation file asynchronously using the service layer."""
-    try:
-        regulation_service.process_regulation(db, file_path, reg_id)
-        logger.info(f"Regulation processing completed for regulation_id={reg_id}")
-    except Exception as e:
-        logger.error(f"Regulation processing failed for regulation_id={reg_id}: {e}")
+def process_regulation(
+    db: Session, file_path: str, reg_id: int, owner: str | None = None
+):
+    """Queue a regulation file for embedding by the job runner."""
+    return job_runner.enqueue(
+        db,
+        JobTypeEnum.REGULATION_EMBEDDING.value,
+        {"file_path": file_path, "regulation_id": reg_id},
+        owner=owner,
+    )
 
 
 def get_regulation_status(db: Session, regulation_id: int):
@@ -30,6 +51,21 @@ def get_regulation_status(db: Session, regulation_id: int):
     return str(getattr(regulation, "embedding_status", "not found"))
 
 
+def get_regulation_progress(db: Session, regulation_id: int):
+    """Ingestion counters of a regulation, or None when it does not exist."""
+    regulation = regulation_service.get_regulation(db, regulation_id)
+    if not regulation:
+        return None
+    return {
+        "pages_total": regulation.pages_total or 0,
+        "pages_done": regulation.pages_done or 0,
+        "chunks_total": regulation.chunks_total or 0,
+        "chunks_reused": regulation.chunks_reused or 0,
+        "vectors_upserted": regulation.vectors_upserted or 0,
+        "vectors_deleted": regulation.vectors_deleted or 0,
+    }
+
+
 def get_regulation_status_controller(regulation_id: int, db: Session):
     status = get_regulation_status(db, regulation_id)
     logger.info(
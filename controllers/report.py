@@ -1,21 +1,35 @@
-from fastapi import BackgroundTasks, HTTPException, UploadFile
+from fastapi import HTTPException, UploadFile
 from fastapi.responses import FileResponse
 from sqlalchemy.orm import Session
 from services.report import ReportService
 from enums.report import ReportStatus
+from enums.job import JobTypeEnum
+from enums.usage import UsageJobTypeEnum
+from services.jobs import job_runner
+from services.openAI.usage import job_usage, usage_headers
 import logging
 import os
 
 logger = logging.getLogger(__name__)
 
+
+async def generate_report_job(db: Session, report_id: int, temp_file_path: str, **report_fields):
+    """Job handler; the service manages its own session and marks failures itself."""
+    await ReportService().generate_and_save_report(report_id, temp_file_path, **report_fields)
+
+
+# The uploaded Excel file is removed after the first attempt, so never retry
+job_runner.register(JobTypeEnum.REPORT.value, generate_report_job, max_attempts=1)
+
+
 async def start_report_generation(
-    background_tasks: BackgroundTasks,
     excel_file: UploadFile,
     db: Session,
     standard_name: str,
     standard_version: str,
     standard_year: str,
     organization: str,
+    owner: str | None = None,
 ):
     """
     Start background report generation process.
@@ -39,19 +53,24 @@ async def start_report_generation(
         # Save uploaded file temporarily
         temp_file_path = await report_service.save_temp_file(excel_file)
 
-        # Start background task
-        background_tasks.add_task(
-            report_service.generate_and_save_report,
-            report_id,
-            temp_file_path,
-            standard_name,
-            standard_version,
-            standard_year,
-            organization,
+        # Queue the report for the job runner
+        job = job_runner.enqueue(
+            db,
+            JobTypeEnum.REPORT.value,
+            {
+                "report_id": report_id,
+                "temp_file_path": temp_file_path,
+                "standard_name": standard_name,
+                "standard_version": standard_version,
+                "standard_year": standard_year,
+                "organization": organization,
+            },
+            owner=owner,
         )
         
         return {
             "report_id": report_id,
+            "job_id": job.id,
             "status": ReportStatus.IN_PROGRESS.value,
             "message": "Report generation started. Use GET /report/{report_id}/status to check progress."
         }
@@ -84,6 +103,7 @@ async def get_report_status_and_file_controller(db: Session, report_id: int):
                 file_path,
                 media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
                 filename=os.path.basename(file_path),
+                headers=usage_headers(job_usage(UsageJobTypeEnum.REPORT.value, report_id, getattr(report, 'usage', None), db)),
             )
         
         # Otherwise, return the status information
@@ -93,6 +113,7 @@ async def get_report_status_and_file_controller(db: Session, report_id: int):
             "report_id": getattr(report, 'id'),
             "status": status_value,
             "created_at": getattr(report, 'created_at').isoformat() if hasattr(report, 'created_at') and getattr(report, 'created_at') else None,
+            "usage": job_usage(UsageJobTypeEnum.REPORT.value, report_id, getattr(report, 'usage', None), db),
         }
         
         if status_value == ReportStatus.COMPLETED.value:
@@ -5,3 +5,20 @@ class AnalysisStatusEnum(str, Enum):
     IN_PROGRESS = "in_progress"
     COMPLETED = "completed"
     ERROR = "error"
+
+
+class AnalysisPartitionStatusEnum(str, Enum):
+    QUEUED = "queued"
+    IN_PROGRESS = "in_progress"
+    COMPLETED = "completed"
+    ERROR = "error"
+
+
+class VSSContextModeEnum(str, Enum):
+    FULL = "full"
+    RETRIEVED = "retrieved"
+
+
+class AnalysisExecutionModeEnum(str, Enum):
+    ONLINE = "online"
+    BATCH = "batch"
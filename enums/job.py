@@ -0,0 +1,25 @@
+from enum import Enum
+
+
+class JobTypeEnum(str, Enum):
+    ANALYSIS = "analysis"
+    ANALYSIS_PARTITION = "analysis_partition"
+    ANALYSIS_MERGE = "analysis_merge"
+    REGULATION_EMBEDDING = "regulation_embedding"
+    INDICATOR_EXTRACTION = "indicator_extraction"
+    REPORT = "report"
+
+
+class JobPriorityEnum(str, Enum):
+    """Scheduling lanes, served strictly in this order."""
+
+    INTERACTIVE = "interactive"
+    STANDARD = "standard"
+    BATCH = "batch"
+
+
+class JobStatusEnum(str, Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
@@ -0,0 +1,15 @@
+from enum import Enum
+
+
+class UsageJobTypeEnum(str, Enum):
+    ANALYSIS = "analysis"
+    ANALYSIS_PARTITION = "analysis_partition"
+    REPORT = "report"
+    INDICATOR_EXTRACTION = "indicator_extraction"
+
+
+class UsageStageEnum(str, Enum):
+    EXTRACT = "extract"
+    RETRIEVE = "retrieve"
+    ANALYSE = "analyse"
+    REPORT = "report"
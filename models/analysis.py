@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime
+from sqlalchemy import Column, Integer, String, DateTime, Text
 from db import Base
 from datetime import datetime
 from enums.analysis import AnalysisStatusEnum
@@ -11,4 +11,19 @@ class Analysis(Base):
         String, default=AnalysisStatusEnum.IN_PROGRESS.value
     )  # in_progress, error, completed
     output_file = Column(String, nullable=True)
+    # Inputs kept so an interrupted analysis can be resumed
+    process_id = Column(String, nullable=True)
+    namespace = Column(String, nullable=True)
+    vss_paths = Column(Text, nullable=True)  # JSON list of uploaded VSS file paths
+    execution_mode = Column(String, nullable=True)  # online, batch
+    vss_context_mode = Column(String, nullable=True)  # full, retrieved
+    vss_tokens_sent = Column(Integer, nullable=True)
+    vss_tokens_saved = Column(Integer, nullable=True)
+    reused_results = Column(Integer, nullable=True)
+    usage = Column(Text, nullable=True)  # JSON LLM token, cost and latency totals
+    # Large analyses run as partition jobs; set once the merge job is queued
+    partition_count = Column(Integer, nullable=True)
+    merge_queued_at = Column(DateTime, nullable=True)
+    # JSON batch ID and request indicator IDs of a submitted batch-mode run
+    llm_batch = Column(Text, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
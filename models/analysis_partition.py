@@ -0,0 +1,26 @@
+from sqlalchemy import Column, DateTime, ForeignKey, Integer, String, Text, UniqueConstraint
+from db import Base
+from datetime import datetime
+from enums.analysis import AnalysisPartitionStatusEnum
+
+
+class AnalysisPartition(Base):
+    __tablename__ = "analysis_partitions"
+    __table_args__ = (
+        UniqueConstraint("analysis_id", "position", name="uq_analysis_partition"),
+    )
+    id = Column(Integer, primary_key=True, index=True)
+    analysis_id = Column(Integer, ForeignKey("analysis.id"), index=True, nullable=False)
+    position = Column(Integer, nullable=False)  # order within the analysis
+    # Inclusive range of Indicator.id covered by this partition
+    first_indicator_id = Column(Integer, nullable=False)
+    last_indicator_id = Column(Integer, nullable=False)
+    indicator_count = Column(Integer, nullable=False)
+    status = Column(
+        String, default=AnalysisPartitionStatusEnum.QUEUED.value
+    )  # queued, in_progress, completed, error
+    job_id = Column(Integer, nullable=True)  # latest job that ran the partition
+    usage = Column(Text, nullable=True)  # JSON LLM token, cost and latency totals
+    llm_batch = Column(Text, nullable=True)  # as Analysis.llm_batch, for this partition
+    created_at = Column(DateTime, default=datetime.utcnow)
+    finished_at = Column(DateTime, nullable=True)
@@ -0,0 +1,27 @@
+from sqlalchemy import (
+    Boolean,
+    Column,
+    DateTime,
+    ForeignKey,
+    Integer,
+    String,
+    Text,
+    UniqueConstraint,
+)
+from db import Base
+from datetime import datetime
+
+
+class AnalysisResult(Base):
+    __tablename__ = "analysis_results"
+    __table_args__ = (
+        UniqueConstraint("analysis_id", "indicator_id", name="uq_analysis_indicator"),
+    )
+    id = Column(Integer, primary_key=True, index=True)
+    analysis_id = Column(Integer, ForeignKey("analysis.id"), index=True, nullable=False)
+    indicator_id = Column(String, nullable=False)
+    result = Column(Text, nullable=False)  # JSON object returned by the LLM
+    # Hash of everything that determines the result, see indicator_fingerprint
+    fingerprint = Column(String, index=True, nullable=True)
+    reused = Column(Boolean, default=False)  # copied from an earlier analysis
+    created_at = Column(DateTime, default=datetime.utcnow)
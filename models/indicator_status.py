@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime
+from sqlalchemy import Column, Integer, String, DateTime, Text
 from db import Base
 from datetime import datetime
 from enums.indicator import IndicatorStatusEnum
@@ -13,3 +13,4 @@ class IndicatorStatus(Base):
     )  # in_progress, completed, error
     created_at = Column(DateTime, default=datetime.utcnow)
     file = Column(String, nullable=True)  # Path to the generated Excel file
+    usage = Column(Text, nullable=True)  # JSON LLM token, cost and latency totals
@@ -0,0 +1,30 @@
+from sqlalchemy import Column, DateTime, Integer, String, Text
+from db import Base
+from datetime import datetime
+from enums.job import JobPriorityEnum, JobStatusEnum
+
+
+class Job(Base):
+    __tablename__ = "jobs"
+    id = Column(Integer, primary_key=True, index=True)
+    job_type = Column(String, index=True, nullable=False)
+    status = Column(
+        String, index=True, default=JobStatusEnum.QUEUED.value
+    )  # queued, running, completed, failed
+    payload = Column(Text, nullable=False)  # JSON keyword arguments for the handler
+    attempts = Column(Integer, default=0)
+    max_attempts = Column(Integer, default=1)
+    last_error = Column(Text, nullable=True)
+    run_after = Column(DateTime, nullable=True)  # retry backoff
+    owner = Column(String, index=True, nullable=True)  # JWT sub of the requester
+    priority = Column(
+        String, default=JobPriorityEnum.STANDARD.value
+    )  # interactive, standard, batch
+    worker_id = Column(String, nullable=True)  # host:pid:nonce of the claiming worker
+    lease_expires_at = Column(DateTime, index=True, nullable=True)
+    heartbeat_at = Column(DateTime, nullable=True)
+    # JSON live LLM usage of the running attempt, flushed with each heartbeat
+    usage = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
@@ -0,0 +1,25 @@
+from sqlalchemy import Column, Float, Integer, String
+from db import Base
+
+
+class RateBudget(Base):
+    """Unleased RPM/TPM credits for one model, shared by every process."""
+
+    __tablename__ = "llm_rate_budgets"
+    model = Column(String, primary_key=True)
+    requests = Column(Float, nullable=False)
+    tokens = Column(Float, nullable=False)
+    updated_at = Column(Float, nullable=False)  # epoch seconds of the last refill
+    paused_until = Column(Float, default=0.0)  # set on a 429 by any process
+    version = Column(Integer, default=0)  # optimistic concurrency for leases
+
+
+class RateBudgetMember(Base):
+    """One process's fair-share allowance; only that process writes its row."""
+
+    __tablename__ = "llm_rate_budget_members"
+    model = Column(String, primary_key=True)
+    member = Column(String, primary_key=True)  # host:pid:nonce
+    requests = Column(Float, nullable=False)
+    tokens = Column(Float, nullable=False)
+    updated_at = Column(Float, nullable=False, index=True)  # last lease
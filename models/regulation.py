@@ -18,3 +18,14 @@ class Regulation(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
     embedding_status = Column(String, default="in process")
     pinecone_namespace = Column(String, unique=False)
+    # Uploads sharing a document key are versions of one document and share
+    # vectors; without an explicit key each regulation is its own document
+    document_key = Column(String, index=True)
+    # SHA-256 of the uploaded file; an unchanged re-upload skips ingestion
+    content_hash = Column(String, index=True)
+    pages_total = Column(Integer, default=0)
+    pages_done = Column(Integer, default=0)
+    chunks_total = Column(Integer, default=0)
+    chunks_reused = Column(Integer, default=0)
+    vectors_upserted = Column(Integer, default=0)
+    vectors_deleted = Column(Integer, default=0)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime
+from sqlalchemy import Column, Integer, String, DateTime, Text
 from sqlalchemy.ext.declarative import declarative_base
 from datetime import datetime
 
@@ -11,5 +11,6 @@ class Report(Base):
     status = Column(String, nullable=False)
     file = Column(String, nullable=True)
     created_at = Column(DateTime, nullable=True, default=datetime.utcnow)
+    usage = Column(Text, nullable=True)  # JSON LLM token, cost and latency totals
 
     
\ No newline at end of file
@@ -4,6 +4,7 @@ from routers.regulation import router as regulation_router
 from routers.indicator import router as indicator_router
 from routers.analysis import router as analysis_router
 from routers.report import router as report_router
+from routers.metrics import router as metrics_router
 import logging
 import os
 
@@ -15,3 +16,4 @@ api_router.include_router(regulation_router)
 api_router.include_router(indicator_router)
 api_router.include_router(analysis_router)
 api_router.include_router(report_router)
+api_router.include_router(metrics_router)
@@ -6,7 +6,6 @@ from fastapi import (
     UploadFile,
     File,
     HTTPException,
-    BackgroundTasks,
     Depends,
     Form,
     Query,
@@ -16,6 +15,7 @@ from sqlalchemy.orm import Session
 from db import SessionLocal
 from controllers.analysis import (
     start_analysis_extraction,
+    resume_analysis_controller,
     get_analysis_status_controller,
 )
 from schemas.analysis import AnalysisOut
@@ -36,13 +36,21 @@ def get_db():
         db.close()
 
 
-@router.post("/run", dependencies=[Depends(get_current_user)])
+@router.post("/run")
 def run_analysis(
-    background_tasks: BackgroundTasks,
     vss_files: list[UploadFile] = File(...),
     process_id: str = File(...),
     namespace: str = Form(..., description="Pinecone namespace to use for RAG search"),
+    vss_context_mode: str | None = Form(
+        None,
+        description="'full' sends the whole VSS with every batch, 'retrieved' only the relevant VSS passages (defaults to VSS_CONTEXT_MODE)",
+    ),
+    execution_mode: str | None = Form(
+        None,
+        description="'online' (default) calls the LLM directly, 'batch' submits all prompts through the provider batch API",
+    ),
     db: Session = Depends(get_db),
+    current_user: dict = Depends(get_current_user),
 ):
     from vector_store.pinecone_store import namespace_exists
 
@@ -53,10 +61,25 @@ def run_analysis(
             status_code=400, detail=f"Pinecone namespace '{namespace}' does not exist."
         )
     return start_analysis_extraction(
-        background_tasks, vss_files, process_id, db, namespace
+        vss_files,
+        process_id,
+        db,
+        namespace,
+        vss_context_mode,
+        execution_mode,
+        owner=current_user.get("sub"),
     )
 
 
+@router.post("/{analysis_id}/resume")
+def resume_analysis(
+    analysis_id: int,
+    db: Session = Depends(get_db),
+    current_user: dict = Depends(get_current_user),
+):
+    return resume_analysis_controller(analysis_id, db, owner=current_user.get("sub"))
+
+
 @router.get(
     "/{analysis_id}",
     response_model=AnalysisOut,
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException, BackgroundTasks, Depends
+from fastapi import APIRouter, UploadFile, File, HTTPException, Depends
 from fastapi.responses import FileResponse
 from sqlalchemy.orm import Session
 from db import SessionLocal
@@ -12,13 +12,13 @@ from utils.security import get_current_user
 router = APIRouter(prefix="/indicators", tags=["indicators"])
 
 
-@router.post("/extract", dependencies=[Depends(get_current_user)])
+@router.post("/extract")
 def extract_indicators(
-    background_tasks: BackgroundTasks,
     file: UploadFile = File(...),
     db: Session = Depends(get_db),
+    current_user: dict = Depends(get_current_user),
 ):
-    return start_indicator_extraction(background_tasks, file, db)
+    return start_indicator_extraction(file, db, owner=current_user.get("sub"))
 
 
 @router.get("/extract/status/{status_id}", dependencies=[Depends(get_current_user)])
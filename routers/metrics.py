@@ -0,0 +1,10 @@
+from fastapi import APIRouter, Depends
+from controllers.metrics import get_cache_metrics
+from utils.security import get_current_user
+
+router = APIRouter(prefix="/metrics", tags=["metrics"])
+
+
+@router.get("/cache", dependencies=[Depends(get_current_user)])
+def cache_metrics():
+    return get_cache_metrics()
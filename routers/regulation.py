@@ -5,7 +5,6 @@ from fastapi import (
     File,
     HTTPException,
     Form,
-    BackgroundTasks,
 )
 from fastapi.responses import FileResponse
 from sqlalchemy.orm import Session
@@ -14,6 +13,7 @@ from controllers.regulation import (
     create_regulation,
     process_regulation,
     get_regulation_status,
+    get_regulation_progress,
 )
 from schemas.regulation import RegulationStatus
 from utils.security import get_current_user
@@ -31,11 +31,15 @@ def get_db():
         db.close()
 
 
-@router.post("/upload", dependencies=[Depends(get_current_user)])
+@router.post("/upload")
 def upload_regulation(
-    background_tasks: BackgroundTasks,
     file: UploadFile = File(...),
+    document_key: str | None = Form(
+        None,
+        description="Stable ID of the document; an upload with the key of an earlier one replaces it as a new version",
+    ),
     db: Session = Depends(get_db),
+    current_user: dict = Depends(get_current_user),
 ):
     if not file.filename or not file.filename.endswith(".pdf"):
         raise HTTPException(status_code=400, detail="Only PDF files are supported")
@@ -50,14 +54,16 @@ def upload_regulation(
         db,
         str(file.filename),
         str(file.content_type) if file.content_type else "application/pdf",
+        document_key or None,
     )
     reg_id = reg.__dict__.get("id", 0)
 
-    background_tasks.add_task(process_regulation, db, file_path, reg_id)
+    job = process_regulation(db, file_path, reg_id, owner=current_user.get("sub"))
 
     return {
         "message": "File uploaded, embeddings being created",
         "regulation_id": reg_id,
+        "job_id": job.id,
     }
 
 
@@ -72,4 +78,8 @@ def check_status(regulation_id: int, db: Session = Depends(get_db)):
     if status == "not found":
         raise HTTPException(status_code=404, detail="Regulation not found")
 
-    return {"regulation_id": regulation_id, "embedding_status": status}
+    return {
+        "regulation_id": regulation_id,
+        "embedding_status": status,
+        **get_regulation_progress(db, regulation_id),
+    }
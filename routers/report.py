@@ -1,5 +1,5 @@
 import logging
-from fastapi import APIRouter, UploadFile, File, HTTPException, BackgroundTasks, Depends, Form
+from fastapi import APIRouter, UploadFile, File, HTTPException, Depends, Form
 from fastapi.responses import FileResponse
 from sqlalchemy.orm import Session
 from db import SessionLocal
@@ -19,15 +19,15 @@ def get_db():
     finally:
         db.close()
 
-@router.post("/generate", dependencies=[Depends(get_current_user)])
+@router.post("/generate")
 async def request_report_generation(
-    background_tasks: BackgroundTasks,
     excel_file: UploadFile = File(..., description="Excel file containing analysis results"),
     standard_name: str = Form("User Standard", description="Name of the benchmarked standard"),
     standard_version: str = Form("1.0", description="Version of the standard"),
     standard_year: str = Form("2024", description="Year of publication"),
     organization: str = Form("User Organization", description="Name of the founding organization"),
     db: Session = Depends(get_db),
+    current_user: dict = Depends(get_current_user),
 ):
     """
     Submit an Excel file for report generation.
@@ -36,13 +36,13 @@ async def request_report_generation(
     """
     try:
         return await start_report_generation(
-            background_tasks,
             excel_file,
             db,
             standard_name,
             standard_version,
             standard_year,
             organization,
+            owner=current_user.get("sub"),
         )
     except Exception as e:
         logger.error(f"Error starting report generation: {str(e)}")
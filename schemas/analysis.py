@@ -1,5 +1,6 @@
-from pydantic import BaseModel
-from typing import Optional
+import json
+from pydantic import BaseModel, field_validator
+from typing import Any, Dict, Optional
 from datetime import datetime
 from enums.analysis import AnalysisStatusEnum
 
@@ -26,6 +27,22 @@ class AnalysisCreate(AnalysisBase):
 class AnalysisOut(AnalysisBase):
     id: int
     created_at: datetime
+    execution_mode: Optional[str] = None
+    vss_context_mode: Optional[str] = None
+    vss_tokens_sent: Optional[int] = None
+    vss_tokens_saved: Optional[int] = None
+    reused_results: Optional[int] = None
+    partition_count: Optional[int] = None
+    # LLM token, cost and latency totals per stage and overall
+    usage: Optional[Dict[str, Any]] = None
+    # Indicators with a saved result and, when partitioned, partition statuses
+    progress: Optional[Dict[str, Any]] = None
+
+    @field_validator("usage", mode="before")
+    @classmethod
+    def parse_usage(cls, value):
+        # Stored as JSON text on the model
+        return json.loads(value) if isinstance(value, str) else value
 
     class Config:
         from_attributes = True
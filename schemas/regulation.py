@@ -21,6 +21,12 @@ class RegulationCreate(RegulationBase):
 class RegulationStatus(BaseModel):
     regulation_id: int
     embedding_status: str
+    pages_total: int = 0
+    pages_done: int = 0
+    chunks_total: int = 0
+    chunks_reused: int = 0
+    vectors_upserted: int = 0
+    vectors_deleted: int = 0
 
 
 class Regulation(RegulationBase):
@@ -3,6 +3,8 @@ from fastapi import FastAPI
 from routers import api_router
 from db import Base, engine
 from config import settings
+from services.jobs import job_runner
+from services.openAI.clients import llm_clients
 
 logger = logging.getLogger(__name__)
 
@@ -21,6 +23,17 @@ app = FastAPI()
 @app.on_event("startup")
 def startup_event():
     log_pinecone_namespace()
+    if not settings.JOB_RUN_IN_API:
+        logger.info("Job runner disabled on this node; jobs run in worker processes")
+        return
+    # LLM connections belong to the runner's event loop; close them there
+    job_runner.shutdown_hooks.append(llm_clients.aclose)
+    job_runner.start()
+
+
+@app.on_event("shutdown")
+def shutdown_event():
+    job_runner.stop()
 
 
 # Create DB tables
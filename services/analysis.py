@@ -1,27 +1,59 @@
 import logging
 import pandas as pd
+from sqlalchemy import func
 from sqlalchemy.orm import Session
 from models.indicator import Indicator
 from utils.prompts.alignment import alignment_def
-from utils.prompts.analysis import build_batch_prompt
-from vector_store.pinecone_store import rag_searcher
-from openai import AsyncOpenAI, RateLimitError
+from utils.prompts.analysis import ANALYSIS_PROMPT_VERSION, build_batch_prompt
+from openai import AsyncOpenAI
 import uuid
 import os
 import re
 import json
+import hashlib
 from models.analysis import Analysis
-from typing import List, Dict, Any, Tuple
+from models.analysis_partition import AnalysisPartition
+from models.analysis_result import AnalysisResult
+from models.job import Job
+from typing import AsyncIterator, Callable, List, Dict, Any, Optional, Tuple
 import asyncio
 import datetime
-from services.openAI.chat import OpenAIClient
+from services.openAI.clients import get_llm_client
+from services.openAI.errors import LLMCircuitOpenError, LLMError, retry_delay
+from services.openAI.usage import (
+    job_usage,
+    load_usage,
+    merge_usage,
+    usage_scope,
+    usage_stage,
+    usage_tracker,
+)
+from services.openAI.batch import (
+    BATCH_DIR,
+    BatchBackend,
+    get_batch_backend,
+    run_batch,
+    write_batch_requests,
+)
+from vector_store.vss_index import VSSIndex
+from utils.tokens import count_tokens
+from utils.batching import BatchPacker, pack_batches
+from utils.json_stream import missing_ids, salvage_json_array
+from enums.analysis import (
+    AnalysisExecutionModeEnum,
+    AnalysisPartitionStatusEnum,
+    AnalysisStatusEnum,
+    VSSContextModeEnum,
+)
+from enums.job import JobStatusEnum
+from enums.usage import UsageJobTypeEnum, UsageStageEnum
+from config import settings
 import tiktoken
 
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
-openai_client = OpenAIClient(model="gpt-4o-mini")
 
 
 def chunk_text_by_tokens(text, model, max_tokens):
@@ -47,17 +79,106 @@ def extract_json_array(text: str | None) -> List[Dict[str, Any]]:
         if isinstance(parsed, list):
             return parsed
     except json.JSONDecodeError:
-        match = re.search(r"\[.*\]", text, re.DOTALL)
-        if match:
-            try:
-                return json.loads(match.group(0))
-            except json.JSONDecodeError as e:
-                logger.error(
-                    f"Regex-extracted JSON is invalid: {e}\nRaw text: {text[:1000]}"
-                )
+        pass
+    # Recover every complete object from a truncated or slightly malformed array
+    salvaged = salvage_json_array(text)
+    if not salvaged:
         logger.error(f"No valid JSON array found in text: {text[:1000]}")
-        return []
-    return []
+    return salvaged
+
+
+def read_vss_texts(vss_paths: List[str]) -> List[str]:
+    """The text of each PDF or DOCX VSS file."""
+    vss_texts = []
+    for path in vss_paths:
+        ext = os.path.splitext(path)[1].lower()
+        if ext == ".pdf":
+            import pdfplumber
+
+            with pdfplumber.open(path) as pdf:
+                text = "".join(page.extract_text() or "" for page in pdf.pages)
+                vss_texts.append(text)
+        elif ext == ".docx":
+            from docx import Document
+
+            doc = Document(path)
+            text = "\n".join([p.text for p in doc.paragraphs])
+            vss_texts.append(text)
+    return vss_texts
+
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def indicator_fingerprint(
+    question: str,
+    evidence_ids: List[str],
+    vss_hashes: List[str],
+    vss_context_mode: str,
+    model: str,
+) -> str:
+    """Hash of everything that determines an indicator's analysis result."""
+    payload = json.dumps(
+        {
+            "question": question.strip(),
+            "evidence_ids": sorted(evidence_ids),
+            "vss_hashes": sorted(vss_hashes),
+            "vss_context_mode": vss_context_mode,
+            "prompt_version": ANALYSIS_PROMPT_VERSION,
+            "alignment_def": alignment_def,
+            "model": model,
+        },
+        sort_keys=True,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def keep_expected_results(
+    items: List[Dict[str, str]], batch_results: List[Dict[str, Any]]
+) -> List[Dict[str, Any]]:
+    """Drop results for indicators that were not in ``items`` and duplicates."""
+    expected_ids = {item["indicator_id"] for item in items}
+    kept: List[Dict[str, Any]] = []
+    for row in batch_results:
+        indicator_id = row.get("Indicator ID")
+        if indicator_id in expected_ids:
+            kept.append(row)
+            expected_ids.discard(indicator_id)
+    return kept
+
+
+class CallBudget:
+    """Caps the LLM API calls made by a group of retries."""
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.used = 0
+
+    @property
+    def exhausted(self) -> bool:
+        return self.used >= self.limit
+
+    def take(self) -> bool:
+        """Reserve one call; False once the budget is spent."""
+        if self.exhausted:
+            return False
+        self.used += 1
+        return True
+
+    def refund(self) -> None:
+        """Return a reserved call that never reached the API."""
+        self.used -= 1
+
+
+def batch_max_tokens(num_indicators: int) -> int:
+    """Completion limit for a sub-batch: twice the expected output, capped at 16k."""
+    expected = num_indicators * settings.ANALYSIS_OUTPUT_TOKENS_PER_INDICATOR
+    return min(16000, 2 * expected)
 
 
 async def process_gpt_batch(
@@ -66,96 +187,408 @@ async def process_gpt_batch(
     vss_texts: List[str],
     openai_client: Any,
     max_retries: int = 3,
+    vss_index: Optional[VSSIndex] = None,
+    vss_usage: Optional[Dict[str, int]] = None,
+    on_results: Optional[Callable[[List[Dict[str, Any]]], None]] = None,
 ) -> List[Dict[str, Any]]:
-    combined_vss_text = " ".join(vss_texts)
+    """Analyse a fully retrieved list of indicators."""
+    if vss_index is not None:
+        # Embed every indicator question up front in one request
+        await vss_index.embed_questions(batch)
+
+    # Pack indicators into sub-batches by token cost, largest batches first
+    batches = pack_batches(
+        batch,
+        input_budget=settings.ANALYSIS_BATCH_INPUT_TOKENS,
+        output_budget=settings.ANALYSIS_BATCH_OUTPUT_TOKENS,
+        output_tokens_per_item=settings.ANALYSIS_OUTPUT_TOKENS_PER_INDICATOR,
+        max_items=settings.ANALYSIS_BATCH_MAX_INDICATORS,
+    )
+    logger.info(f"Created {len(batches)} sub-batches for {len(batch)} indicators")
+
+    async def batch_source():
+        for sub_batch in batches:
+            yield sub_batch
+
+    results = await process_gpt_batches(
+        batch_source(),
+        alignment_def,
+        vss_texts,
+        openai_client,
+        max_retries=max_retries,
+        vss_index=vss_index,
+        vss_usage=vss_usage,
+        on_results=on_results,
+    )
+    # Packing reorders indicators; return results in input order
+    input_id_order = {item["indicator_id"]: i for i, item in enumerate(batch)}
+    results.sort(key=lambda x: input_id_order.get(x["Indicator ID"], float("inf")))
+    return results
+
+
+class SubBatchPromptBuilder:
+    """Builds sub-batch prompts with full or retrieved VSS context.
+
+    The VSS tokens sent, and those saved compared with sending the full VSS,
+    are accumulated in ``vss_usage``.
+    """
+
+    def __init__(
+        self,
+        alignment_def: str,
+        vss_texts: List[str],
+        vss_index: Optional[VSSIndex] = None,
+        vss_usage: Optional[Dict[str, int]] = None,
+    ):
+        self.alignment_def = alignment_def
+        self.vss_index = vss_index
+        self.combined_vss_text = " ".join(vss_texts)
+        self.full_vss_tokens = (
+            vss_index.full_tokens
+            if vss_index is not None
+            else count_tokens(self.combined_vss_text)
+        )
+        logger.info(
+            f"Combined VSS text length: {len(self.combined_vss_text)} characters ({self.full_vss_tokens} tokens)"
+        )
+        self.vss_usage = vss_usage if vss_usage is not None else {}
+        self.vss_usage.setdefault("tokens_sent", 0)
+        self.vss_usage.setdefault("tokens_saved", 0)
+
+    async def __call__(self, single_batch: List[Dict[str, str]]) -> str:
+        if self.vss_index is not None:
+            vss_context = await self.vss_index.context_for_batch(single_batch)
+            context_tokens = count_tokens(vss_context)
+        else:
+            vss_context = self.combined_vss_text
+            context_tokens = self.full_vss_tokens
+        self.vss_usage["tokens_sent"] += context_tokens
+        self.vss_usage["tokens_saved"] += max(self.full_vss_tokens - context_tokens, 0)
+        return build_batch_prompt(single_batch, self.alignment_def, vss_context)
+
+
+async def process_gpt_batches_offline(
+    batch_source: AsyncIterator[List[Dict[str, str]]],
+    alignment_def: str,
+    vss_texts: List[str],
+    openai_client: Any,
+    job_name: str,
+    vss_index: Optional[VSSIndex] = None,
+    vss_usage: Optional[Dict[str, int]] = None,
+    on_results: Optional[Callable[[List[Dict[str, Any]]], None]] = None,
+    backend: Optional[BatchBackend] = None,
+    submitted_batch: Optional[Dict[str, Any]] = None,
+    on_batch: Optional[Callable[[Optional[Dict[str, Any]]], None]] = None,
+) -> List[Dict[str, Any]]:
+    """Analyse sub-batches through the provider batch API.
+
+    All sub-batch prompts are written to one JSONL file, submitted, polled
+    until done and mapped back by ``custom_id``. Indicators missing from the
+    batch output are re-run online with ``process_gpt_batch``.
+
+    ``on_batch`` gets ``{"batch_id", "requests"}`` (indicator IDs by
+    ``custom_id``) once the batch is submitted, and None once its results
+    are handed to ``on_results``. Passing that record back as
+    ``submitted_batch``, e.g. from a retried job, awaits the same batch
+    instead of submitting the indicators again.
+    """
+    build_prompt = SubBatchPromptBuilder(alignment_def, vss_texts, vss_index, vss_usage)
+    batches: Dict[str, List[Dict[str, str]]] = {}
+    # Always drained, so the retrieval stage feeding it can finish
+    sub_batches = [sub_batch async for sub_batch in batch_source]
+    if not sub_batches:
+        return []
+    backend = backend or get_batch_backend(openai_client.client)
+    missing_indicators: List[Dict[str, str]] = []
+
+    if submitted_batch:
+        pending = {
+            item["indicator_id"]: item for sub_batch in sub_batches for item in sub_batch
+        }
+        for custom_id, indicator_ids in submitted_batch["requests"].items():
+            batches[custom_id] = [pending.pop(i) for i in indicator_ids if i in pending]
+        # Indicators the earlier batch did not cover are run online below
+        missing_indicators.extend(pending.values())
+        contents = await run_batch(backend, None, batch_id=submitted_batch["batch_id"])
+    else:
+        requests = []
+        for sub_batch in sub_batches:
+            custom_id = f"{job_name}-batch-{len(batches)}"
+            batches[custom_id] = sub_batch
+            requests.append(
+                (custom_id, await build_prompt(sub_batch), batch_max_tokens(len(sub_batch)))
+            )
+        path = write_batch_requests(
+            os.path.join(BATCH_DIR, f"{job_name}_{uuid.uuid4()}.jsonl"),
+            openai_client.model,
+            requests,
+        )
+
+        def on_submitted(batch_id: str) -> None:
+            if on_batch:
+                on_batch(
+                    {
+                        "batch_id": batch_id,
+                        "requests": {
+                            custom_id: [item["indicator_id"] for item in sub_batch]
+                            for custom_id, sub_batch in batches.items()
+                        },
+                    }
+                )
+
+        contents = await run_batch(backend, path, on_submitted=on_submitted)
+
+    results: List[Dict[str, Any]] = []
+    for custom_id, sub_batch in batches.items():
+        batch_results = keep_expected_results(
+            sub_batch, extract_json_array(contents.get(custom_id))
+        )
+        if batch_results and on_results:
+            on_results(batch_results)
+        results.extend(batch_results)
+        returned_ids = {row["Indicator ID"] for row in batch_results}
+        missing_indicators.extend(
+            item for item in sub_batch if item["indicator_id"] not in returned_ids
+        )
+    if on_batch:
+        on_batch(None)
     logger.info(
-        f"Combined VSS text length: {len(combined_vss_text)} characters (~{len(combined_vss_text)//4} tokens)"
+        f"Batch job {job_name}: {len(results)} indicator results, {len(missing_indicators)} missing"
     )
 
+    if missing_indicators:
+        results.extend(
+            await process_gpt_batch(
+                missing_indicators,
+                alignment_def,
+                vss_texts,
+                openai_client,
+                vss_index=vss_index,
+                vss_usage=build_prompt.vss_usage,
+                on_results=on_results,
+            )
+        )
+    return results
+
+
+async def process_gpt_batches(
+    batch_source: AsyncIterator[List[Dict[str, str]]],
+    alignment_def: str,
+    vss_texts: List[str],
+    openai_client: Any,
+    max_retries: int = 3,
+    vss_index: Optional[VSSIndex] = None,
+    vss_usage: Optional[Dict[str, int]] = None,
+    on_results: Optional[Callable[[List[Dict[str, Any]]], None]] = None,
+) -> List[Dict[str, Any]]:
+    """Analyse sub-batches as ``batch_source`` produces them.
+
+    Sub-batches go through a bounded queue to ANALYSIS_LLM_WORKERS workers, so
+    the LLM stage starts on the first batch while later ones are still being
+    retrieved and packed.
+    """
+    build_prompt = SubBatchPromptBuilder(alignment_def, vss_texts, vss_index, vss_usage)
+
+    emitted_ids: set = set()
+
+    def emit(rows: List[Dict[str, Any]]) -> None:
+        """Hand each indicator's result to ``on_results`` exactly once."""
+        fresh = [row for row in rows if row["Indicator ID"] not in emitted_ids]
+        if not fresh:
+            return
+        emitted_ids.update(row["Indicator ID"] for row in fresh)
+        if on_results:
+            on_results(fresh)
+
+    streaming = settings.LLM_STREAMING and hasattr(openai_client, "chat_json_array")
+
     async def process_single_batch(
-        single_batch: List[Dict[str, str]], batch_index: int
+        single_batch: List[Dict[str, str]],
+        batch_index: int,
+        budget: Optional[CallBudget] = None,
     ) -> Tuple[int, List[Dict[str, Any]]]:
-        prompt = build_batch_prompt(single_batch, alignment_def, combined_vss_text)
-        for attempt in range(max_retries):
-            try:
-                response = await openai_client.chat(
-                    prompt, max_tokens=16000
-                )  # Increased for chunk_size=5
-                batch_results = extract_json_array(response)
-                logger.info(
-                    f"Batch {batch_index} token usage: {openai_client.last_response.usage if hasattr(openai_client, 'last_response') else 'unknown'}"
+        """Analyse one sub-batch in up to ``max_retries`` calls, each taken from ``budget``."""
+        prompt = await build_prompt(single_batch)
+        input_ids = {item["indicator_id"] for item in single_batch}
+
+        def covers_batch(batch_results: List[Dict[str, Any]]) -> bool:
+            return len(batch_results) == len(single_batch) and not missing_ids(
+                batch_results, input_ids, "Indicator ID"
+            )
+
+        attempt = 0
+        while attempt < max_retries:
+            if budget is not None and not budget.take():
+                logger.error(
+                    f"Batch {batch_index}: retry budget of {budget.limit} calls exhausted"
                 )
+                break
+            try:
+                if streaming:
+                    # Results are saved as each object closes; the stream is
+                    # cut off as soon as the output goes off-format
+                    batch_results = await openai_client.chat_json_array(
+                        prompt,
+                        max_objects=len(single_batch),
+                        on_object=lambda obj: emit(
+                            keep_expected_results(single_batch, [obj])
+                        ),
+                        max_tokens=batch_max_tokens(len(single_batch)),
+                        use_cache=attempt == 0,
+                        validate=covers_batch,
+                    )
+                else:
+                    # A retry must not be answered by the cached response that
+                    # failed; only complete answers are cached
+                    response = await openai_client.chat(
+                        prompt,
+                        max_tokens=batch_max_tokens(len(single_batch)),
+                        use_cache=attempt == 0,
+                        validate=lambda text: covers_batch(salvage_json_array(text)),
+                    )
+                    batch_results = extract_json_array(response)
                 if isinstance(batch_results, list):
-                    input_ids = {item["indicator_id"] for item in single_batch}
-                    output_ids = {
-                        result["Indicator ID"]
-                        for result in batch_results
-                        if "Indicator ID" in result
-                    }
-                    if (
-                        len(batch_results) == len(single_batch)
-                        and input_ids == output_ids
-                    ):
+                    if covers_batch(batch_results):
                         return batch_index, batch_results
                     logger.warning(
-                        f"Batch {batch_index} output mismatch: expected {len(single_batch)} indicators, got {len(batch_results)}, missing IDs: {input_ids - output_ids}"
+                        f"Batch {batch_index} output mismatch: expected {len(single_batch)} indicators, got {len(batch_results)}, missing IDs: {missing_ids(batch_results, input_ids, 'Indicator ID')}"
                     )
                     return batch_index, batch_results  # Preserve partial results
                 logger.warning(f"Batch {batch_index} invalid output: not a list")
-            except (RateLimitError, Exception) as e:
-                logger.error(
-                    f"Batch {batch_index} failed: {e}\nContent: {response[:1000] if 'response' in locals() else 'N/A'}"
-                )
-                with open(
-                    f"gpt_batch_error_output_{uuid.uuid4()}.json", "w", encoding="utf-8"
-                ) as f:
-                    f.write(response if "response" in locals() else str(e))
-                if isinstance(e, RateLimitError) or "503" in str(e) or "520" in str(e):
-                    await asyncio.sleep(2**attempt)  # Exponential backoff
+            except LLMCircuitOpenError as e:
+                if not e.retryable:
+                    logger.error(f"Batch {batch_index} abandoned: {e}")
+                    break
+                # The provider is down: wait with every other batch without
+                # spending this batch's retries or the retry budget
+                if budget is not None:
+                    budget.refund()
+                await asyncio.sleep(e.retry_after)
+                continue
+            except LLMError as e:
+                logger.error(f"Batch {batch_index} failed ({type(e).__name__}): {e}")
+                # Context overflow is not retried here; the retry pass bisects the batch
+                delay = retry_delay(e, attempt)
+                if delay is None:
+                    break
+                await asyncio.sleep(delay)
+            attempt += 1
         return batch_index, []  # Explicit return for all code paths
 
-    # Split batch into smaller chunks
-    chunk_size = 3
-    batches = [batch[i : i + chunk_size] for i in range(0, len(batch), chunk_size)]
-    logger.info(f"Created {len(batches)} sub-batches for {len(batch)} indicators")
-
-    # Process batches concurrently
-    tasks = [process_single_batch(b, i) for i, b in enumerate(batches)]
+    batches: List[List[Dict[str, str]]] = []
     results_by_index: Dict[int, List[Dict[str, Any]]] = {}
-    for future in asyncio.as_completed(tasks):
-        batch_index, batch_result = await future
-        if batch_result:
-            results_by_index[batch_index] = batch_result
+    batch_queue: asyncio.Queue = asyncio.Queue(
+        maxsize=settings.ANALYSIS_BATCH_QUEUE_SIZE
+    )
+
+    async def feed_batches():
+        async for sub_batch in batch_source:
+            batches.append(sub_batch)
+            await batch_queue.put((len(batches) - 1, sub_batch))
 
-    # Combine results in original order
+    async def llm_worker():
+        while True:
+            batch_index, sub_batch = await batch_queue.get()
+            try:
+                batch_index, batch_result = await process_single_batch(
+                    sub_batch, batch_index
+                )
+                batch_result = keep_expected_results(sub_batch, batch_result)
+                if batch_result:
+                    results_by_index[batch_index] = batch_result
+                    emit(batch_result)
+            except Exception as e:
+                # The batch is left missing and retried below
+                logger.error(f"Batch {batch_index} worker error: {e}")
+            finally:
+                batch_queue.task_done()
+
+    workers = [
+        asyncio.create_task(llm_worker())
+        for _ in range(settings.ANALYSIS_LLM_WORKERS)
+    ]
+    try:
+        await feed_batches()
+        await batch_queue.join()
+    finally:
+        for worker in workers:
+            worker.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+
+    # Combine first-pass results; every indicator without a result is retried
+    batch = [item for sub_batch in batches for item in sub_batch]
     results: List[Dict[str, Any]] = []
-    missing_indicators: List[Dict[str, str]] = []
-    for i in range(len(batches)):
-        if i in results_by_index:
-            results.extend(results_by_index[i])
-        else:
-            missing_batch = batches[i]
-            missing_indicators.extend(missing_batch)
-            logger.warning(f"Batch {i} missing from results")
+    retry_groups: List[Tuple[List[Dict[str, str]], bool]] = []
+    for i, sub_batch in enumerate(batches):
+        returned = keep_expected_results(sub_batch, results_by_index.get(i, []))
+        results.extend(returned)
+        returned_ids = {row["Indicator ID"] for row in returned}
+        missing = [item for item in sub_batch if item["indicator_id"] not in returned_ids]
+        if missing:
+            logger.warning(
+                f"Batch {i} missing {len(missing)}/{len(sub_batch)} indicators"
+            )
+            retry_groups.append((missing, bool(returned)))
 
-    # Retry missing indicators individually
-    if missing_indicators:
+    # Retries start only after the first pass has finished. A partial batch
+    # retries just its missing IDs as one call; a batch that returned nothing
+    # is split in half recursively. The API calls made by retries, including
+    # each attempt inside a retry, are capped.
+    budget = CallBudget(
+        max(
+            settings.ANALYSIS_RETRY_MIN_CALLS,
+            int(len(batches) * settings.ANALYSIS_RETRY_BUDGET_RATIO),
+        )
+    )
+    retry_count = 0
+    # Bisection fans out; keep retry calls to as many as the first pass ran
+    retry_slots = asyncio.Semaphore(settings.ANALYSIS_LLM_WORKERS)
+
+    async def retry(items: List[Dict[str, str]], split: bool) -> List[Dict[str, Any]]:
+        nonlocal retry_count
+        if split and len(items) > 1:
+            middle = len(items) // 2
+            halves = await asyncio.gather(
+                retry(items[:middle], False), retry(items[middle:], False)
+            )
+            return halves[0] + halves[1]
+        if budget.exhausted:
+            logger.error(
+                f"Retry budget of {budget.limit} calls exhausted; giving up on {len(items)} indicators"
+            )
+            return []
+        retry_count += 1
+        retry_index = len(batches) + retry_count
+        try:
+            async with retry_slots:
+                _, retry_result = await process_single_batch(items, retry_index, budget)
+        except Exception as e:
+            # Only these indicators are given up on; the other groups carry on
+            logger.error(f"Retry batch {retry_index} error: {e}")
+            return []
+        returned = keep_expected_results(items, retry_result)
+        emit(returned)
+        returned_ids = {row["Indicator ID"] for row in returned}
+        missing = [item for item in items if item["indicator_id"] not in returned_ids]
+        if not missing:
+            return returned
+        if len(items) == 1:
+            logger.error(f"Failed to retry indicator: {items[0]['indicator_id']}")
+            return returned
+        # Partial answer: retry the remainder together; no answer: bisect
+        return returned + await retry(missing, split=not returned)
+
+    if retry_groups:
         logger.info(
-            f"Retrying {len(missing_indicators)} missing indicators individually"
+            f"Retrying {sum(len(group) for group, _ in retry_groups)} missing indicators "
+            f"from {len(retry_groups)} batches (budget {budget.limit} calls)"
         )
-        retry_tasks = [
-            process_single_batch([indicator], i + len(batches))
-            for i, indicator in enumerate(missing_indicators)
-        ]
-        for future in asyncio.as_completed(retry_tasks):
-            batch_index, retry_result = await future
-            if retry_result:
-                results.extend(retry_result)
-            else:
-                missing_id = missing_indicators[batch_index - len(batches)][
-                    "indicator_id"
-                ]
-                logger.error(f"Failed to retry indicator: {missing_id}")
+        retried = await asyncio.gather(
+            *(retry(group, split=not partial) for group, partial in retry_groups)
+        )
+        for rows in retried:
+            results.extend(rows)
+        logger.info(f"Retries used {budget.used} calls")
 
     # Validate all indicators are included
     input_ids = {item["indicator_id"] for item in batch}
@@ -174,8 +607,21 @@ async def process_gpt_batch(
 
 
 class AnalysisService:
-    def create_analysis(self, db: Session) -> Analysis:
-        analysis = Analysis(status="in_progress")
+    def create_analysis(
+        self,
+        db: Session,
+        process_id: str = "",
+        namespace: str = "",
+        vss_paths: Optional[List[str]] = None,
+        execution_mode: Optional[str] = None,
+    ) -> Analysis:
+        analysis = Analysis(
+            status="in_progress",
+            process_id=process_id,
+            namespace=namespace,
+            vss_paths=json.dumps(vss_paths or []),
+            execution_mode=execution_mode or AnalysisExecutionModeEnum.ONLINE.value,
+        )
         db.add(analysis)
         db.commit()
         db.refresh(analysis)
@@ -193,7 +639,163 @@ class AnalysisService:
             db.commit()
             logger.info(f"Updated analysis {analysis_id} to status {status}")
 
-    
+    def record_vss_context_usage(
+        self,
+        db: Session,
+        analysis_id: int,
+        mode: str,
+        tokens_sent: int,
+        tokens_saved: int,
+    ):
+        # Accumulate so a resumed analysis reports the usage of every run; the
+        # increment is done in SQL because partitions report concurrently
+        updated = (
+            db.query(Analysis)
+            .filter(Analysis.id == analysis_id)
+            .update(
+                {
+                    Analysis.vss_context_mode: mode,
+                    Analysis.vss_tokens_sent: func.coalesce(Analysis.vss_tokens_sent, 0)
+                    + tokens_sent,
+                    Analysis.vss_tokens_saved: func.coalesce(Analysis.vss_tokens_saved, 0)
+                    + tokens_saved,
+                },
+                synchronize_session=False,
+            )
+        )
+        db.commit()
+        if updated:
+            logger.info(
+                f"Analysis {analysis_id} VSS context ({mode}): {tokens_sent} tokens sent, {tokens_saved} tokens saved"
+            )
+
+    def save_results(
+        self,
+        db: Session,
+        analysis_id: int,
+        results: List[Dict[str, Any]],
+        fingerprints: Optional[Dict[str, str]] = None,
+        reused: bool = False,
+    ):
+        """Persist indicator results as they arrive; already stored IDs are skipped."""
+        fingerprints = fingerprints or {}
+        indicator_ids = [
+            str(row["Indicator ID"]) for row in results if "Indicator ID" in row
+        ]
+        existing = {
+            indicator_id
+            for (indicator_id,) in db.query(AnalysisResult.indicator_id).filter(
+                AnalysisResult.analysis_id == analysis_id,
+                AnalysisResult.indicator_id.in_(indicator_ids),
+            )
+        }
+        saved = 0
+        for row in results:
+            indicator_id = str(row.get("Indicator ID", ""))
+            if not indicator_id or indicator_id in existing:
+                continue
+            db.add(
+                AnalysisResult(
+                    analysis_id=analysis_id,
+                    indicator_id=indicator_id,
+                    result=json.dumps(row),
+                    fingerprint=fingerprints.get(indicator_id),
+                    reused=reused,
+                )
+            )
+            existing.add(indicator_id)
+            saved += 1
+        db.commit()
+        logger.info(f"Analysis {analysis_id}: saved {saved} indicator results")
+
+    def find_reusable_results(
+        self, db: Session, fingerprints: List[str]
+    ) -> Dict[str, Dict[str, Any]]:
+        """Return the latest stored result for each of ``fingerprints`` that has one."""
+        if not fingerprints:
+            return {}
+        rows = (
+            db.query(AnalysisResult)
+            .filter(AnalysisResult.fingerprint.in_(fingerprints))
+            .order_by(AnalysisResult.id.desc())
+            .all()
+        )
+        reusable: Dict[str, Dict[str, Any]] = {}
+        for row in rows:
+            reusable.setdefault(str(row.fingerprint), json.loads(str(row.result)))
+        return reusable
+
+    def record_reused_results(self, db: Session, analysis_id: int, count: int):
+        updated = (
+            db.query(Analysis)
+            .filter(Analysis.id == analysis_id)
+            .update(
+                {Analysis.reused_results: func.coalesce(Analysis.reused_results, 0) + count},
+                synchronize_session=False,
+            )
+        )
+        db.commit()
+        if updated:
+            logger.info(f"Analysis {analysis_id}: reused {count} earlier indicator results")
+
+    def get_saved_results(self, db: Session, analysis_id: int) -> Dict[str, Dict[str, Any]]:
+        rows = (
+            db.query(AnalysisResult)
+            .filter(AnalysisResult.analysis_id == analysis_id)
+            .all()
+        )
+        return {str(row.indicator_id): json.loads(str(row.result)) for row in rows}
+
+    def write_results_file(self, results: List[Dict[str, Any]]) -> str:
+        output_dir = "analysis"
+        os.makedirs(output_dir, exist_ok=True)
+        output_file = os.path.join(output_dir, f"llm_results_{uuid.uuid4()}.xlsx")
+
+        # Prepare DataFrame with required columns and formatted GPT response
+        def format_gpt_response(row):
+            return (
+                f"STATEMENT: {row.get('STATEMENT', '')}\n"
+                f"EVIDENCE: {row.get('EVIDENCE', '')}\n"
+                f"CITATIONS: {row.get('CITATIONS', '')}\n"
+                f"ALIGNMENT CATEGORY: {row.get('ALIGNMENT CATEGORY', '')}\n"
+                f"JUSTIFICATION: {row.get('JUSTIFICATION', '')}"
+            )
+
+        data = []
+        for row in results:
+            data.append(
+                {
+                    "Indicator ID": row.get("Indicator ID", ""),
+                    "Statement": row.get("STATEMENT", ""),
+                    "Alignment Category": row.get("ALIGNMENT CATEGORY", ""),
+                    "GPT Response": format_gpt_response(row),
+                }
+            )
+        df = pd.DataFrame(data)
+        df.to_excel(output_file, index=False)
+        return output_file
+
+    def write_ordered_results(
+        self, db: Session, analysis_id: int, indicators: List[Indicator]
+    ) -> str:
+        """Write every checkpointed result to the output file, in indicator order."""
+        saved_results = self.get_saved_results(db, analysis_id)
+        ordered_results = [
+            saved_results[str(ind.indicator_id)]
+            for ind in indicators
+            if str(ind.indicator_id) in saved_results
+        ]
+        return self.write_results_file(ordered_results)
+
+    def record_llm_usage(self, db: Session, analysis_id: int):
+        """Persist the job's token, cost and latency totals, adding to earlier runs."""
+        usage = usage_tracker.pop(UsageJobTypeEnum.ANALYSIS.value, analysis_id)
+        analysis = db.query(Analysis).filter(Analysis.id == analysis_id).first()
+        if analysis and usage:
+            merged = merge_usage(load_usage(analysis.usage), usage)
+            setattr(analysis, "usage", json.dumps(merged))
+            db.commit()
+            logger.info(f"Analysis {analysis_id} LLM usage: {merged['total']}")
 
     async def run_analysis(
         self,
@@ -202,68 +804,530 @@ class AnalysisService:
         analysis_id: int,
         process_id: str,
         namespace: str,
+        vss_context_mode: Optional[str] = None,
+        execution_mode: Optional[str] = None,
     ) -> None:
+        with usage_scope(
+            UsageJobTypeEnum.ANALYSIS.value, analysis_id, UsageStageEnum.RETRIEVE.value
+        ):
+            try:
+                await self._run_analysis(
+                    db,
+                    vss_paths,
+                    analysis_id,
+                    process_id,
+                    namespace,
+                    vss_context_mode,
+                    execution_mode,
+                )
+            finally:
+                self.record_llm_usage(db, analysis_id)
+
+    def get_partitions(self, db: Session, analysis_id: int) -> List[AnalysisPartition]:
+        return (
+            db.query(AnalysisPartition)
+            .filter(AnalysisPartition.analysis_id == analysis_id)
+            .order_by(AnalysisPartition.position)
+            .all()
+        )
+
+    def plan_partitions(
+        self, db: Session, analysis_id: int, process_id: str
+    ) -> List[AnalysisPartition]:
+        """Split a large analysis into ranges of ``Indicator.id``, once.
+
+        Returns the existing plan on a retry or resume, and no partitions when
+        the analysis is small enough to run as a single job.
+        """
+        partitions = self.get_partitions(db, analysis_id)
+        size = settings.ANALYSIS_PARTITION_SIZE
+        if partitions or size <= 0:
+            return partitions
+        indicator_ids = [
+            indicator_id
+            for (indicator_id,) in db.query(Indicator.id)
+            .filter(Indicator.process_id == process_id)
+            .order_by(Indicator.id)
+        ]
+        if len(indicator_ids) <= size:
+            return []
+        for position, start in enumerate(range(0, len(indicator_ids), size)):
+            chunk = indicator_ids[start : start + size]
+            db.add(
+                AnalysisPartition(
+                    analysis_id=analysis_id,
+                    position=position,
+                    first_indicator_id=chunk[0],
+                    last_indicator_id=chunk[-1],
+                    indicator_count=len(chunk),
+                    status=AnalysisPartitionStatusEnum.QUEUED.value,
+                )
+            )
+        partition_count = (len(indicator_ids) + size - 1) // size
+        db.query(Analysis).filter(Analysis.id == analysis_id).update(
+            {Analysis.partition_count: partition_count}, synchronize_session=False
+        )
+        db.commit()
+        logger.info(
+            f"Analysis {analysis_id}: split {len(indicator_ids)} indicators into "
+            f"{partition_count} partitions of up to {size}"
+        )
+        return self.get_partitions(db, analysis_id)
+
+    def pending_partitions(
+        self, db: Session, analysis_id: int
+    ) -> List[AnalysisPartition]:
+        """Unfinished partitions that have no queued or running job."""
+        partitions = self.get_partitions(db, analysis_id)
+        job_ids = [p.job_id for p in partitions if p.job_id is not None]
+        active = {
+            job_id
+            for (job_id,) in db.query(Job.id).filter(
+                Job.id.in_(job_ids),
+                Job.status.in_(
+                    [JobStatusEnum.QUEUED.value, JobStatusEnum.RUNNING.value]
+                ),
+            )
+        }
+        return [
+            p
+            for p in partitions
+            if str(p.status) != AnalysisPartitionStatusEnum.COMPLETED.value
+            and p.job_id not in active
+        ]
+
+    def active_job(
+        self, db: Session, analysis_id: int, job_types: List[str]
+    ) -> Optional[Job]:
+        """The oldest queued or running job of ``job_types`` working on the analysis.
+
+        Partition jobs are matched through their partition rows, the others
+        through the ``analysis_id`` in their payload.
+        """
+        partition_jobs = {
+            job_id
+            for (job_id,) in db.query(AnalysisPartition.job_id).filter(
+                AnalysisPartition.analysis_id == analysis_id,
+                AnalysisPartition.job_id.isnot(None),
+            )
+        }
+        jobs = (
+            db.query(Job)
+            .filter(
+                Job.job_type.in_(job_types),
+                Job.status.in_([JobStatusEnum.QUEUED.value, JobStatusEnum.RUNNING.value]),
+            )
+            .order_by(Job.id)
+        )
+        for job in jobs:
+            if job.id in partition_jobs or json.loads(str(job.payload)).get(
+                "analysis_id"
+            ) == analysis_id:
+                return job
+        return None
+
+    def set_partition_job(self, db: Session, partition_id: int, job_id: int):
+        db.query(AnalysisPartition).filter(AnalysisPartition.id == partition_id).update(
+            {
+                AnalysisPartition.job_id: job_id,
+                AnalysisPartition.status: AnalysisPartitionStatusEnum.QUEUED.value,
+            },
+            synchronize_session=False,
+        )
+        db.commit()
+
+    def update_partition_status(self, db: Session, partition_id: int, status: str):
+        partition = (
+            db.query(AnalysisPartition).filter(AnalysisPartition.id == partition_id).first()
+        )
+        if partition:
+            setattr(partition, "status", status)
+            if status == AnalysisPartitionStatusEnum.COMPLETED.value:
+                setattr(partition, "finished_at", datetime.datetime.utcnow())
+            db.commit()
+            logger.info(
+                f"Analysis {partition.analysis_id} partition {partition.position} is {status}"
+            )
+
+    def _llm_batch_row(
+        self, db: Session, analysis_id: int, indicator_range: Optional[Tuple[int, int]]
+    ):
+        """The partition row for ``indicator_range``, otherwise the analysis row."""
+        if indicator_range:
+            return (
+                db.query(AnalysisPartition)
+                .filter(
+                    AnalysisPartition.analysis_id == analysis_id,
+                    AnalysisPartition.first_indicator_id == indicator_range[0],
+                )
+                .first()
+            )
+        return db.query(Analysis).filter(Analysis.id == analysis_id).first()
+
+    def get_llm_batch(
+        self,
+        db: Session,
+        analysis_id: int,
+        indicator_range: Optional[Tuple[int, int]] = None,
+    ) -> Optional[Dict[str, Any]]:
+        """The batch a previous batch-mode attempt submitted and did not finish."""
+        row = self._llm_batch_row(db, analysis_id, indicator_range)
+        return json.loads(str(row.llm_batch)) if row is not None and row.llm_batch else None
+
+    def set_llm_batch(
+        self,
+        db: Session,
+        analysis_id: int,
+        indicator_range: Optional[Tuple[int, int]],
+        record: Optional[Dict[str, Any]],
+    ):
+        row = self._llm_batch_row(db, analysis_id, indicator_range)
+        if row is not None:
+            setattr(row, "llm_batch", json.dumps(record) if record else None)
+            db.commit()
+
+    def record_partition_usage(self, db: Session, partition_id: int):
+        """Persist usage on the partition row, which only its own job writes.
+
+        Usage is tracked under the partition, so partitions of one analysis
+        running in the same process never take each other's.
+        """
+        usage = usage_tracker.pop(UsageJobTypeEnum.ANALYSIS_PARTITION.value, partition_id)
+        partition = (
+            db.query(AnalysisPartition).filter(AnalysisPartition.id == partition_id).first()
+        )
+        if partition and usage:
+            setattr(
+                partition, "usage", json.dumps(merge_usage(load_usage(partition.usage), usage))
+            )
+            db.commit()
+
+    async def run_partition(
+        self,
+        db: Session,
+        partition_id: int,
+        vss_paths: List[str],
+        process_id: str,
+        namespace: str,
+        vss_context_mode: Optional[str] = None,
+        execution_mode: Optional[str] = None,
+    ) -> int:
+        """Analyse one partition; returns the analysis it belongs to."""
+        partition = (
+            db.query(AnalysisPartition).filter(AnalysisPartition.id == partition_id).one()
+        )
+        analysis_id = int(partition.analysis_id)
+        indicator_range = (
+            int(partition.first_indicator_id),
+            int(partition.last_indicator_id),
+        )
+        self.update_partition_status(
+            db, partition_id, AnalysisPartitionStatusEnum.IN_PROGRESS.value
+        )
+        # A failed attempt marks the analysis as errored; a retry clears that
+        self.update_analysis_status(db, analysis_id, AnalysisStatusEnum.IN_PROGRESS.value)
+        status = AnalysisPartitionStatusEnum.ERROR.value
+        with usage_scope(
+            UsageJobTypeEnum.ANALYSIS_PARTITION.value,
+            partition_id,
+            UsageStageEnum.RETRIEVE.value,
+        ):
+            try:
+                await self._run_analysis(
+                    db,
+                    vss_paths,
+                    analysis_id,
+                    process_id,
+                    namespace,
+                    vss_context_mode,
+                    execution_mode,
+                    indicator_range=indicator_range,
+                )
+                status = AnalysisPartitionStatusEnum.COMPLETED.value
+            finally:
+                self.record_partition_usage(db, partition_id)
+                self.update_partition_status(db, partition_id, status)
+        return analysis_id
+
+    def claim_merge(self, db: Session, analysis_id: int, force: bool = False) -> bool:
+        """True for exactly one caller once every partition has completed.
+
+        Each partition commits its own status before calling this, so the
+        last one to finish always sees the full set. ``force`` re-claims a
+        merge that was queued before, e.g. when resuming after it failed.
+        """
+        remaining = (
+            db.query(AnalysisPartition)
+            .filter(
+                AnalysisPartition.analysis_id == analysis_id,
+                AnalysisPartition.status != AnalysisPartitionStatusEnum.COMPLETED.value,
+            )
+            .count()
+        )
+        if remaining:
+            return False
+        query = db.query(Analysis).filter(Analysis.id == analysis_id)
+        if not force:
+            query = query.filter(Analysis.merge_queued_at.is_(None))
+        claimed = query.update(
+            {Analysis.merge_queued_at: datetime.datetime.utcnow()},
+            synchronize_session=False,
+        )
+        db.commit()
+        return bool(claimed)
+
+    def merge_partitions(self, db: Session, analysis_id: int, process_id: str) -> None:
+        """Write the output of a partitioned analysis in indicator order."""
         try:
-            start_time = datetime.datetime.now()
-            logger.info(f"Starting analysis service at {start_time}")
             indicators = (
-                db.query(Indicator).filter(Indicator.process_id == process_id).all()
+                db.query(Indicator)
+                .filter(Indicator.process_id == process_id)
+                .order_by(Indicator.id)
+                .all()
             )
-            if not indicators:
-                raise Exception("No indicators found in DB for this process_id.")
+            output_file = self.write_ordered_results(db, analysis_id, indicators)
+            self.update_analysis_status(
+                db, analysis_id, AnalysisStatusEnum.COMPLETED.value, output_file
+            )
+            logger.info(f"Merged partitions of analysis {analysis_id} into {output_file}")
+            analysis = db.query(Analysis).filter(Analysis.id == analysis_id).first()
+            if analysis is not None:
+                self.remove_vss_index(analysis_id, json.loads(str(analysis.vss_paths or "[]")))
+        except Exception as e:
+            logger.error(f"Merging analysis {analysis_id} failed: {str(e)}")
+            self.update_analysis_status(db, analysis_id, AnalysisStatusEnum.ERROR.value)
+            raise
+
+    @staticmethod
+    def vss_index_path(analysis_id: int, vss_paths: List[str]) -> str:
+        directory = os.path.dirname(vss_paths[0]) if vss_paths else "vss_uploads"
+        return os.path.join(directory, f"vss_index_{analysis_id}.npz")
+
+    async def get_vss_index(
+        self, analysis_id: int, vss_paths: List[str], vss_texts: List[str]
+    ) -> VSSIndex:
+        """The analysis's VSS index, embedded by the first job that needs it.
 
-            # Read VSS text
-            vss_texts = []
-            for path in vss_paths:
-                ext = os.path.splitext(path)[1].lower()
-                if ext == ".pdf":
-                    import pdfplumber
+        It is saved next to the VSS files, so partition jobs and retries on
+        any worker load it instead of embedding the VSS again.
+        """
+        path = self.vss_index_path(analysis_id, vss_paths)
+        vss_index = await asyncio.to_thread(VSSIndex.load, path)
+        if vss_index is None:
+            vss_index = VSSIndex(vss_texts)
+            await vss_index.build()
+            await asyncio.to_thread(vss_index.save, path)
+        return vss_index
+
+    async def prepare_vss_index(
+        self,
+        db: Session,
+        analysis_id: int,
+        vss_paths: List[str],
+        vss_context_mode: Optional[str] = None,
+    ) -> None:
+        """Build the VSS index before partition jobs start, so they share it."""
+        if (vss_context_mode or settings.VSS_CONTEXT_MODE) != VSSContextModeEnum.RETRIEVED.value:
+            return
+        with usage_scope(
+            UsageJobTypeEnum.ANALYSIS.value, analysis_id, UsageStageEnum.RETRIEVE.value
+        ):
+            try:
+                await self.get_vss_index(analysis_id, vss_paths, read_vss_texts(vss_paths))
+            finally:
+                self.record_llm_usage(db, analysis_id)
+
+    def remove_vss_index(self, analysis_id: int, vss_paths: List[str]) -> None:
+        path = self.vss_index_path(analysis_id, vss_paths)
+        if os.path.exists(path):
+            os.remove(path)
+
+    def get_usage(self, db: Session, analysis: Analysis) -> Optional[Dict[str, Any]]:
+        """Usage of the analysis job plus that of its partition jobs."""
+        analysis_id = int(getattr(analysis, "id"))
+        usage = job_usage(
+            UsageJobTypeEnum.ANALYSIS.value,
+            analysis_id,
+            getattr(analysis, "usage", None),
+            db,
+        )
+        partition_usage = [
+            job_usage(UsageJobTypeEnum.ANALYSIS_PARTITION.value, int(p.id), p.usage, db)
+            for p in self.get_partitions(db, analysis_id)
+        ]
+        partition_usage = [u for u in partition_usage if u]
+        if not partition_usage:
+            return usage
+        return merge_usage(usage, *partition_usage)
+
+    def get_progress(self, db: Session, analysis: Analysis) -> Dict[str, Any]:
+        """Indicator and, for partitioned analyses, partition counts."""
+        analysis_id = int(getattr(analysis, "id"))
+        progress: Dict[str, Any] = {
+            "indicators_total": db.query(func.count(Indicator.id))
+            .filter(Indicator.process_id == analysis.process_id)
+            .scalar(),
+            "indicators_done": db.query(func.count(AnalysisResult.id))
+            .filter(AnalysisResult.analysis_id == analysis_id)
+            .scalar(),
+        }
+        partitions = self.get_partitions(db, analysis_id)
+        if partitions:
+            counts = {status.value: 0 for status in AnalysisPartitionStatusEnum}
+            for partition in partitions:
+                counts[str(partition.status)] = counts.get(str(partition.status), 0) + 1
+            progress["partitions"] = {"total": len(partitions), **counts}
+        return progress
+
+    async def _run_analysis(
+        self,
+        db: Session,
+        vss_paths: List[str],
+        analysis_id: int,
+        process_id: str,
+        namespace: str,
+        vss_context_mode: Optional[str],
+        execution_mode: Optional[str],
+        indicator_range: Optional[Tuple[int, int]] = None,
+    ) -> None:
+        """Analyse the indicators of ``process_id``, or only those whose
+        ``Indicator.id`` lies in ``indicator_range`` for a partition job; a
+        partition saves its results but leaves the output file to the merge job.
+        """
+        try:
+            start_time = datetime.datetime.now()
+            logger.info(f"Starting analysis service at {start_time}")
+            openai_client = get_llm_client("gpt-4o-mini")
+            query = db.query(Indicator).filter(Indicator.process_id == process_id)
+            if indicator_range:
+                query = query.filter(Indicator.id.between(*indicator_range))
+            all_indicators = query.order_by(Indicator.id).all()
+            if not all_indicators:
+                raise Exception("No indicators found in DB for this process_id.")
 
-                    with pdfplumber.open(path) as pdf:
-                        text = "".join(page.extract_text() or "" for page in pdf.pages)
-                        vss_texts.append(text)
-                elif ext == ".docx":
-                    from docx import Document
+            # Skip indicators already checkpointed by an earlier, interrupted run
+            saved_results = self.get_saved_results(db, analysis_id)
+            indicators = [
+                ind
+                for ind in all_indicators
+                if str(ind.indicator_id) not in saved_results
+            ]
+            if saved_results:
+                logger.info(
+                    f"Resuming analysis {analysis_id}: {len(saved_results)} results already saved, "
+                    f"{len(indicators)} indicators remaining"
+                )
 
-                    doc = Document(path)
-                    text = "\n".join([p.text for p in doc.paragraphs])
-                    vss_texts.append(text)
+            vss_texts = read_vss_texts(vss_paths)
 
             # Prepare all indicator batches concurrently
             from vector_store.pinecone_store import RAGSearcher
 
             rag_searcher = RAGSearcher(namespace=namespace)
 
-            async def fetch_evidence(indicator_obj):
-                indicator_id = str(indicator_obj.indicator_id)
-                question = str(indicator_obj.indicator)
+            vss_context_mode = vss_context_mode or settings.VSS_CONTEXT_MODE
+            vss_hashes = [file_sha256(path) for path in vss_paths]
+            fingerprints: Dict[str, str] = {}
+
+            # Retrieval and LLM stages run as a pipeline: evidence flows through
+            # a bounded queue into the packer while earlier batches are with the LLM
+            indicator_queue: asyncio.Queue = asyncio.Queue()
+            for k in range(0, len(indicators), settings.RAG_QUERY_BATCH_SIZE):
+                indicator_queue.put_nowait(
+                    indicators[k : k + settings.RAG_QUERY_BATCH_SIZE]
+                )
+            evidence_queue: asyncio.Queue = asyncio.Queue(
+                maxsize=settings.ANALYSIS_EVIDENCE_QUEUE_SIZE
+            )
+
+            async def retrieval_worker():
+                while True:
+                    try:
+                        group = indicator_queue.get_nowait()
+                    except asyncio.QueueEmpty:
+                        return
+                    questions = [str(ind.indicator) for ind in group]
+                    match_lists = await rag_searcher.batch_search_matches(questions)
+                    items = []
+                    lookup = []
+                    for indicator_obj, matches in zip(group, match_lists):
+                        indicator_id = str(indicator_obj.indicator_id)
+                        question = str(indicator_obj.indicator)
+                        fingerprints[indicator_id] = indicator_fingerprint(
+                            question,
+                            [match["id"] for match in matches],
+                            vss_hashes,
+                            vss_context_mode,
+                            openai_client.model,
+                        )
+                        # An empty retrieval is usually a transient failure; never reuse it
+                        if matches:
+                            lookup.append(fingerprints[indicator_id])
+                        items.append(
+                            {
+                                "indicator_id": indicator_id,
+                                "question": question,
+                                "evidence": [match["text"] for match in matches],
+                            }
+                        )
+
+                    # Reuse stored results whose inputs are unchanged
+                    reusable = {}
+                    if settings.ANALYSIS_RESULT_REUSE:
+                        reusable = self.find_reusable_results(db, lookup)
+                    reused_rows = []
+                    for item in items:
+                        previous = reusable.get(fingerprints[item["indicator_id"]])
+                        if previous is not None:
+                            reused_rows.append(
+                                {**previous, "Indicator ID": item["indicator_id"]}
+                            )
+                        else:
+                            await evidence_queue.put(item)
+                    if reused_rows:
+                        self.save_results(
+                            db, analysis_id, reused_rows, fingerprints, reused=True
+                        )
+                        self.record_reused_results(db, analysis_id, len(reused_rows))
+
+            async def retrieval_stage():
+                workers = [
+                    asyncio.create_task(retrieval_worker())
+                    for _ in range(settings.RAG_RETRIEVAL_WORKERS)
+                ]
                 try:
-                    evidence = await rag_searcher.async_search(str(question))
-                except Exception as e:
-                    logger.error(f"RAG search failed for indicator {indicator_id}: {e}")
-                    evidence = []
-                return {
-                    "indicator_id": indicator_id,
-                    "question": question,
-                    "evidence": evidence,
-                }
+                    await asyncio.gather(*workers)
+                except Exception:
+                    for worker in workers:
+                        worker.cancel()
+                    # Still end the stream so the LLM stage drains and stops;
+                    # the error is re-raised by ``await retrieval_task``
+                    await evidence_queue.put(None)
+                    raise
+                await evidence_queue.put(None)
+
+            async def packed_batches():
+                packer = BatchPacker(
+                    input_budget=settings.ANALYSIS_BATCH_INPUT_TOKENS,
+                    output_budget=settings.ANALYSIS_BATCH_OUTPUT_TOKENS,
+                    output_tokens_per_item=settings.ANALYSIS_OUTPUT_TOKENS_PER_INDICATOR,
+                    max_items=settings.ANALYSIS_BATCH_MAX_INDICATORS,
+                    lookahead=settings.ANALYSIS_BATCH_LOOKAHEAD,
+                )
+                while True:
+                    item = await evidence_queue.get()
+                    if item is None:
+                        break
+                    for sub_batch in packer.add(item):
+                        yield sub_batch
+                for sub_batch in packer.flush():
+                    yield sub_batch
 
             logger.info(
-                f"Fetching RAG evidence for {len(indicators)} indicators concurrently..."
+                f"Analysing {len(indicators)} indicators "
+                f"({settings.RAG_RETRIEVAL_WORKERS} retrieval workers, {settings.ANALYSIS_LLM_WORKERS} LLM workers)..."
             )
-            # Batch RAG searches to avoid rate limits (e.g., 50 at a time)
-            rag_batch_size = 50
-            all_batches = []
-            for i in range(0, len(indicators), rag_batch_size):
-                batch = indicators[i : i + rag_batch_size]
-                batch_results = await asyncio.gather(
-                    *(fetch_evidence(ind) for ind in batch)
-                )
-                all_batches.extend(batch_results)
-                logger.info(
-                    f"Completed RAG batch {i // rag_batch_size + 1}/{len(indicators) // rag_batch_size + 1}"
-                )
-                await asyncio.sleep(1)  # Brief pause to respect rate limits
+            retrieval_task = asyncio.create_task(retrieval_stage())
 
             # Convert alignment_def to string if necessary
             alignment_def_str = (
@@ -275,47 +1339,67 @@ class AnalysisService:
                 f"alignment_def type: {type(alignment_def)}, value: {alignment_def_str[:100]}"
             )
 
-            # Process all batches in parallel
-            logger.info(
-                f"Processing {len(all_batches)} indicators in parallel batches of 5..."
-            )
-            results = await process_gpt_batch(
-                all_batches, alignment_def_str, vss_texts, openai_client
-            )
-            logger.info(
-                f"Total GPT calls made: {len(all_batches) // 5 + (1 if len(all_batches) % 5 else 0)}"
-            )
+            vss_index = None
+            vss_usage: Dict[str, int] = {}
+            try:
+                if vss_context_mode == VSSContextModeEnum.RETRIEVED.value and indicators:
+                    vss_index = await self.get_vss_index(analysis_id, vss_paths, vss_texts)
 
-            # Save to Excel
-            output_dir = "analysis"
-            os.makedirs(output_dir, exist_ok=True)
-            output_file = os.path.join(output_dir, f"llm_results_{uuid.uuid4()}.xlsx")
-
-            # Prepare DataFrame with required columns and formatted GPT response
-            def format_gpt_response(row):
-                return (
-                    f"STATEMENT: {row.get('STATEMENT', '')}\n"
-                    f"EVIDENCE: {row.get('EVIDENCE', '')}\n"
-                    f"CITATIONS: {row.get('CITATIONS', '')}\n"
-                    f"ALIGNMENT CATEGORY: {row.get('ALIGNMENT CATEGORY', '')}\n"
-                    f"JUSTIFICATION: {row.get('JUSTIFICATION', '')}"
-                )
+                def on_results(rows: List[Dict[str, Any]]) -> None:
+                    self.save_results(db, analysis_id, rows, fingerprints)
+
+                # The retrieval task keeps its own stage; LLM workers inherit this one
+                with usage_stage(UsageStageEnum.ANALYSE.value):
+                    if execution_mode == AnalysisExecutionModeEnum.BATCH.value:
+                        await process_gpt_batches_offline(
+                            packed_batches(),
+                            alignment_def_str,
+                            vss_texts,
+                            openai_client,
+                            job_name=f"analysis_{analysis_id}"
+                            + (f"_{indicator_range[0]}" if indicator_range else ""),
+                            vss_index=vss_index,
+                            vss_usage=vss_usage,
+                            on_results=on_results,
+                            submitted_batch=self.get_llm_batch(
+                                db, analysis_id, indicator_range
+                            ),
+                            on_batch=lambda record: self.set_llm_batch(
+                                db, analysis_id, indicator_range, record
+                            ),
+                        )
+                    else:
+                        await process_gpt_batches(
+                            packed_batches(),
+                            alignment_def_str,
+                            vss_texts,
+                            openai_client,
+                            vss_index=vss_index,
+                            vss_usage=vss_usage,
+                            on_results=on_results,
+                        )
+                await retrieval_task
+            finally:
+                retrieval_task.cancel()
+                await rag_searcher.aclose()
+            self.record_vss_context_usage(
+                db,
+                analysis_id,
+                vss_context_mode,
+                vss_usage["tokens_sent"],
+                vss_usage["tokens_saved"],
+            )
 
-            data = []
-            for row in results:
-                data.append(
-                    {
-                        "Indicator ID": row.get("Indicator ID", ""),
-                        "Statement": row.get("STATEMENT", ""),
-                        "Alignment Category": row.get("ALIGNMENT CATEGORY", ""),
-                        "GPT Response": format_gpt_response(row),
-                    }
-                )
-            df = pd.DataFrame(data)
-            df.to_excel(output_file, index=False)
-            self.update_analysis_status(db, analysis_id, "completed", output_file)
             end_time = datetime.datetime.now()
-            logger.info(f"Analysis completed at {end_time}")
+            if indicator_range:
+                logger.info(
+                    f"Analysis {analysis_id} partition {indicator_range} completed at {end_time}"
+                )
+            else:
+                output_file = self.write_ordered_results(db, analysis_id, all_indicators)
+                self.update_analysis_status(db, analysis_id, "completed", output_file)
+                self.remove_vss_index(analysis_id, vss_paths)
+                logger.info(f"Analysis completed at {end_time}")
             logger.info(f"Total analysis duration: {end_time - start_time}")
         except Exception as e:
             logger.error(f"Analysis failed: {str(e)}")
@@ -1,7 +1,13 @@
+import json
+import logging
 from sqlalchemy.orm import Session
 from models.indicator import Indicator
 from schemas.indicator import IndicatorCreate
 from models.indicator_status import IndicatorStatus
+from enums.usage import UsageJobTypeEnum
+from services.openAI.usage import load_usage, merge_usage, usage_tracker
+
+logger = logging.getLogger(__name__)
 
 
 class IndicatorService:
@@ -30,3 +36,16 @@ class IndicatorService:
         if status_job:
             setattr(status_job, "status", status)
             db.commit()
+
+    def record_llm_usage(self, db: Session, status_id: int):
+        """Persist the extraction job's token, cost and latency totals."""
+        usage = usage_tracker.pop(UsageJobTypeEnum.INDICATOR_EXTRACTION.value, status_id)
+        status_job = (
+            db.query(IndicatorStatus).filter(IndicatorStatus.id == status_id).first()
+        )
+        if status_job and usage:
+            # A retried extraction adds to the usage of its earlier attempts
+            usage = merge_usage(load_usage(status_job.usage), usage)
+            setattr(status_job, "usage", json.dumps(usage))
+            db.commit()
+            logger.info(f"[Status {status_id}] LLM usage: {usage['total']}")
@@ -0,0 +1,577 @@
+import asyncio
+import contextvars
+import datetime
+import inspect
+import json
+import logging
+import os
+import socket
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+
+from sqlalchemy import case, func
+from sqlalchemy.orm import Session
+
+from config import settings
+from db import SessionLocal
+from enums.job import JobPriorityEnum, JobStatusEnum
+from models.job import Job
+from services.openAI.scheduler import LANES, current_scheduling, lane_rank, scheduling_scope
+from services.openAI.usage import (
+    load_usage,
+    merge_usage,
+    runner_job_scope,
+    usage_tracker,
+)
+
+logger = logging.getLogger(__name__)
+
+# A handler receives a session owned by the job plus the job's payload
+JobHandlerFunc = Callable[..., Optional[Awaitable[None]]]
+
+
+@dataclass
+class JobHandler:
+    func: JobHandlerFunc
+    concurrency: int
+    max_attempts: int
+    priority: str
+
+
+@dataclass(frozen=True)
+class JobAttempt:
+    job_id: int
+    attempt: int
+    max_attempts: int
+
+    @property
+    def final(self) -> bool:
+        """Whether a failure now fails the job for good."""
+        return self.attempt >= self.max_attempts
+
+
+# Set while a handler runs, so it can tell whether a failure will be retried
+_job_attempt: contextvars.ContextVar[Optional[JobAttempt]] = contextvars.ContextVar(
+    "job_attempt", default=None
+)
+
+
+def current_attempt() -> Optional[JobAttempt]:
+    """The attempt of the job running in this context; None outside a job."""
+    return _job_attempt.get()
+
+
+def flushed_usage(db: Session, key: str) -> Optional[Dict[str, Any]]:
+    """Live usage under ``key`` (see ``usage_key``) flushed by running jobs."""
+    snapshots = db.query(Job.usage).filter(
+        Job.status == JobStatusEnum.RUNNING.value, Job.usage.isnot(None)
+    )
+    found = [
+        snapshot[key]
+        for snapshot in (load_usage(usage) for (usage,) in snapshots)
+        if snapshot and key in snapshot
+    ]
+    return merge_usage(*found) if found else None
+
+
+class JobRunner:
+    """DB-backed job queue executed by a worker pool outside the web server.
+
+    Jobs are rows in ``jobs``; the runner claims queued rows on its own event
+    loop in a dedicated thread, so job work never competes with request
+    handling. Each job type has its own concurrency limit and attempt budget;
+    a failed job is re-queued with exponential backoff until its attempts run
+    out. Async handlers run on the runner loop, sync handlers in its thread pool.
+
+    Several runners (API nodes and ``worker.py`` processes, on any host) can
+    share one database. A claimed job carries a lease owned by the claiming
+    worker that is renewed by heartbeats while the job runs; any runner
+    re-queues jobs whose lease has expired, e.g. because their worker died.
+
+    Each job carries its requester (``owner``) and a priority lane. Free slots
+    go to higher lanes first and then to the owner with the fewest running
+    jobs of that type; inside the job, LLM calls queue under the same owner
+    and lane (see ``FairQueue``).
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session] = SessionLocal,
+        worker_id: Optional[str] = None,
+    ):
+        self.session_factory = session_factory
+        self.worker_id = (
+            worker_id or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        )
+        self.handlers: Dict[str, JobHandler] = {}
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.thread: Optional[threading.Thread] = None
+        self.executor: Optional[ThreadPoolExecutor] = None
+        self._wake: Optional[asyncio.Event] = None
+        self._stopping = False
+        self._tasks: Dict[str, Set[asyncio.Task]] = {}
+        self._running: Dict[int, asyncio.Task] = {}
+        # Jobs cancelled because another worker took over their expired lease
+        self._lost: Set[int] = set()
+        # Coroutines run on the runner loop before it closes, e.g. closing
+        # clients whose connections belong to that loop
+        self.shutdown_hooks: List[Callable[[], Awaitable[None]]] = []
+
+    def register(
+        self,
+        job_type: str,
+        func: JobHandlerFunc,
+        concurrency: Optional[int] = None,
+        max_attempts: Optional[int] = None,
+        priority: Optional[str] = None,
+    ) -> None:
+        self.handlers[job_type] = JobHandler(
+            func=func,
+            concurrency=concurrency
+            or settings.JOB_CONCURRENCY.get(job_type, settings.JOB_DEFAULT_CONCURRENCY),
+            max_attempts=max_attempts or settings.JOB_MAX_ATTEMPTS,
+            priority=priority or JobPriorityEnum.STANDARD.value,
+        )
+
+    def enqueue(
+        self,
+        db: Session,
+        job_type: str,
+        payload: Dict[str, Any],
+        owner: Optional[str] = None,
+        priority: Optional[str] = None,
+    ) -> Job:
+        """Persist a job; it starts as soon as a worker slot for its type is free.
+
+        Jobs queued from inside another job default to that job's owner.
+        """
+        if job_type not in self.handlers:
+            raise ValueError(f"No handler registered for job type '{job_type}'")
+        job = Job(
+            job_type=job_type,
+            status=JobStatusEnum.QUEUED.value,
+            payload=json.dumps(payload),
+            max_attempts=self.handlers[job_type].max_attempts,
+            owner=owner or current_scheduling().tenant,
+            priority=priority or self.handlers[job_type].priority,
+        )
+        db.add(job)
+        db.commit()
+        db.refresh(job)
+        logger.info(f"Queued {job_type} job {job.id} ({job.priority}, owner {job.owner})")
+        self.wake()
+        return job
+
+    def wake(self) -> None:
+        if self.loop is not None and self._wake is not None:
+            self.loop.call_soon_threadsafe(self._wake.set)
+
+    def start(self) -> None:
+        if self.thread is not None:
+            return
+        self.recover()
+        self._stopping = False
+        self.executor = ThreadPoolExecutor(
+            max_workers=settings.JOB_SYNC_WORKERS, thread_name_prefix="job-sync"
+        )
+        ready = threading.Event()
+        self.thread = threading.Thread(
+            target=self._run_loop, args=(ready,), name="job-runner", daemon=True
+        )
+        self.thread.start()
+        ready.wait()
+        logger.info(
+            f"Job runner {self.worker_id} started: "
+            + ", ".join(f"{t}={h.concurrency}" for t, h in self.handlers.items())
+        )
+
+    def stop(self, timeout: float = 10.0) -> None:
+        """Stop claiming jobs, cancel running ones and hand them back to the queue."""
+        if self.thread is None or self.loop is None:
+            return
+        self._stopping = True
+        self.loop.call_soon_threadsafe(self._cancel_all)
+        self.thread.join(timeout)
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+        if self.thread.is_alive():
+            # Jobs may still be running; their leases expire and another
+            # worker picks them up
+            logger.warning(f"Job runner {self.worker_id} did not stop within {timeout}s")
+        else:
+            self.release_leases()
+        self.thread = None
+        self.loop = None
+
+    def recover(self) -> None:
+        """Re-queue running jobs whose worker stopped renewing their lease."""
+        db = self.session_factory()
+        try:
+            now = datetime.datetime.utcnow()
+            expired = (
+                db.query(Job)
+                .filter(
+                    Job.status == JobStatusEnum.RUNNING.value,
+                    (Job.lease_expires_at.is_(None)) | (Job.lease_expires_at < now),
+                )
+                .with_for_update(skip_locked=True)
+                .all()
+            )
+            recovered = 0
+            for job in expired:
+                owner = job.worker_id or "unknown worker"
+                if self._settle(db, job, f"Lease held by {owner} expired"):
+                    recovered += 1
+            db.commit()
+            if recovered:
+                logger.warning(f"Recovered {recovered} jobs with expired leases")
+        finally:
+            db.close()
+
+    def release_leases(self) -> None:
+        """Re-queue this worker's running jobs without counting the attempt."""
+        db = self.session_factory()
+        try:
+            released = (
+                db.query(Job)
+                .filter(
+                    Job.status == JobStatusEnum.RUNNING.value,
+                    Job.worker_id == self.worker_id,
+                )
+                .update(
+                    {
+                        Job.status: JobStatusEnum.QUEUED.value,
+                        Job.attempts: func.coalesce(Job.attempts, 1) - 1,
+                        Job.lease_expires_at: None,
+                        Job.usage: None,
+                        Job.last_error: "Interrupted by worker shutdown",
+                    },
+                    synchronize_session=False,
+                )
+            )
+            db.commit()
+            if released:
+                logger.warning(f"Released {released} running jobs back to the queue")
+        finally:
+            db.close()
+
+    def _run_loop(self, ready: threading.Event) -> None:
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self.loop.set_default_executor(self.executor)
+        self._wake = asyncio.Event()
+        ready.set()
+        try:
+            self.loop.run_until_complete(self._dispatch())
+        finally:
+            for hook in self.shutdown_hooks:
+                try:
+                    self.loop.run_until_complete(hook())
+                except Exception as e:
+                    logger.warning(f"Job runner shutdown hook failed: {e}")
+            self.loop.run_until_complete(self.loop.shutdown_asyncgens())
+            self.loop.close()
+
+    def _cancel_all(self) -> None:
+        for tasks in self._tasks.values():
+            for task in tasks:
+                task.cancel()
+        if self._wake is not None:
+            self._wake.set()
+
+    async def _dispatch(self) -> None:
+        heartbeat = asyncio.create_task(self._heartbeat())
+        while not self._stopping:
+            self._wake.clear()
+            try:
+                self.recover()
+                self._claim_jobs()
+            except Exception as e:
+                logger.error(f"Job dispatch failed: {e}")
+            try:
+                await asyncio.wait_for(
+                    self._wake.wait(), timeout=settings.JOB_POLL_SECONDS
+                )
+            except asyncio.TimeoutError:
+                pass
+        running = [task for tasks in self._tasks.values() for task in tasks]
+        await asyncio.gather(*running, return_exceptions=True)
+        heartbeat.cancel()
+
+    async def _heartbeat(self) -> None:
+        while True:
+            await asyncio.sleep(settings.JOB_HEARTBEAT_SECONDS)
+            try:
+                self._renew_leases()
+            except Exception as e:
+                logger.warning(f"Job lease renewal failed: {e}")
+
+    def _renew_leases(self) -> None:
+        if not self._running:
+            return
+        db = self.session_factory()
+        try:
+            now = datetime.datetime.utcnow()
+            lease_until = now + datetime.timedelta(seconds=settings.JOB_LEASE_SECONDS)
+            for job_id, task in list(self._running.items()):
+                # Status endpoints in other processes read the live usage here
+                usage = usage_tracker.snapshot(job_id)
+                renewed = (
+                    db.query(Job)
+                    .filter(
+                        Job.id == job_id,
+                        Job.status == JobStatusEnum.RUNNING.value,
+                        Job.worker_id == self.worker_id,
+                    )
+                    .update(
+                        {
+                            Job.lease_expires_at: lease_until,
+                            Job.heartbeat_at: now,
+                            Job.usage: json.dumps(usage) if usage else None,
+                        },
+                        synchronize_session=False,
+                    )
+                )
+                db.commit()
+                if not renewed:
+                    # The lease expired and the job was re-queued; stop working
+                    # on it so it never runs twice at once
+                    logger.error(f"Job {job_id} lost its lease; cancelling it")
+                    self._lost.add(job_id)
+                    task.cancel()
+        finally:
+            db.close()
+
+    def _claim_jobs(self) -> None:
+        db = self.session_factory()
+        try:
+            now = datetime.datetime.utcnow()
+            lease_until = now + datetime.timedelta(seconds=settings.JOB_LEASE_SECONDS)
+            for job_type, handler in self.handlers.items():
+                running = self._tasks.setdefault(job_type, set())
+                free = handler.concurrency - len(running)
+                if free <= 0:
+                    continue
+                # SKIP LOCKED keeps concurrent workers off each other's
+                # candidates on Postgres; the conditional update below decides
+                # the winner on databases without row locks (SQLite)
+                candidates = (
+                    db.query(Job.id, Job.owner, Job.priority)
+                    .filter(
+                        Job.job_type == job_type,
+                        Job.status == JobStatusEnum.QUEUED.value,
+                        (Job.run_after.is_(None)) | (Job.run_after <= now),
+                    )
+                    .order_by(
+                        case(
+                            {lane: rank for rank, lane in enumerate(LANES)},
+                            value=Job.priority,
+                            else_=lane_rank(None),
+                        ),
+                        Job.id,
+                    )
+                    .limit(free * settings.JOB_CLAIM_WINDOW)
+                    .with_for_update(skip_locked=True)
+                    .all()
+                )
+                claimed = [
+                    job_id
+                    for job_id in self._fair_order(db, job_type, candidates, free)
+                    if db.query(Job)
+                    .filter(Job.id == job_id, Job.status == JobStatusEnum.QUEUED.value)
+                    .update(
+                        {
+                            Job.status: JobStatusEnum.RUNNING.value,
+                            Job.attempts: func.coalesce(Job.attempts, 0) + 1,
+                            Job.started_at: now,
+                            Job.worker_id: self.worker_id,
+                            Job.lease_expires_at: lease_until,
+                            Job.heartbeat_at: now,
+                        },
+                        synchronize_session=False,
+                    )
+                ]
+                db.commit()
+                if not claimed:
+                    continue
+                jobs = db.query(Job).filter(Job.id.in_(claimed)).order_by(Job.id).all()
+                for job in jobs:
+                    job_id = int(job.id)
+                    stale = self._running.get(job_id)
+                    if stale is not None:
+                        # This worker re-claimed its own expired lease; the
+                        # old copy must not keep running next to the new one
+                        logger.error(
+                            f"Job {job_id} re-claimed after its lease expired; "
+                            "cancelling the old copy"
+                        )
+                        self._lost.add(job_id)
+                        stale.cancel()
+                    task = asyncio.create_task(
+                        self._execute(job_id, job_type, json.loads(str(job.payload)))
+                    )
+                    running.add(task)
+                    self._running[job_id] = task
+                    task.add_done_callback(running.discard)
+                    task.add_done_callback(
+                        lambda t, j=job_id: self._running.pop(j)
+                        if self._running.get(j) is t
+                        else None
+                    )
+                    task.add_done_callback(lambda _: self._wake.set())
+        finally:
+            db.close()
+
+    def _fair_order(
+        self, db: Session, job_type: str, candidates: List[Any], free: int
+    ) -> List[int]:
+        """Pick up to ``free`` candidates: highest lane first, then the owner
+        with the fewest running jobs of this type across all workers, then the
+        owner who started one least recently (round robin)."""
+        owners = {c.owner for c in candidates}
+        running = dict(
+            db.query(Job.owner, func.count(Job.id))
+            .filter(Job.job_type == job_type, Job.status == JobStatusEnum.RUNNING.value)
+            .group_by(Job.owner)
+            .all()
+        )
+        last_started = dict(
+            db.query(Job.owner, func.max(Job.started_at))
+            .filter(Job.job_type == job_type, Job.owner.in_(owners))
+            .group_by(Job.owner)
+            .all()
+        )
+        pending = list(candidates)
+        chosen: List[int] = []
+        now = datetime.datetime.utcnow()
+        while pending and len(chosen) < free:
+            best = min(
+                pending,
+                key=lambda c: (
+                    lane_rank(c.priority),
+                    running.get(c.owner, 0),
+                    last_started.get(c.owner) or datetime.datetime.min,
+                    c.id,
+                ),
+            )
+            pending.remove(best)
+            running[best.owner] = running.get(best.owner, 0) + 1
+            last_started[best.owner] = now
+            chosen.append(best.id)
+        return chosen
+
+    async def _execute(self, job_id: int, job_type: str, payload: Dict[str, Any]) -> None:
+        handler = self.handlers[job_type]
+        db = self.session_factory()
+        job = db.query(Job).filter(Job.id == job_id).first()
+        owner = job.owner if job else None
+        priority = (job.priority if job else None) or handler.priority
+        logger.info(f"Starting {job_type} job {job_id} ({priority}, owner {owner})")
+        error: Optional[str] = None
+        attempt = _job_attempt.set(
+            JobAttempt(
+                job_id,
+                (job.attempts or 0) if job else 1,
+                (job.max_attempts or 1) if job else handler.max_attempts,
+            )
+        )
+        try:
+            with scheduling_scope(owner, priority), runner_job_scope(job_id):
+                if inspect.iscoroutinefunction(handler.func):
+                    await handler.func(db, **payload)
+                else:
+                    # Carry the scheduling scope into the executor thread
+                    context = contextvars.copy_context()
+                    await asyncio.get_running_loop().run_in_executor(
+                        None, lambda: context.run(handler.func, db, **payload)
+                    )
+        except asyncio.CancelledError:
+            if job_id in self._lost:
+                self._lost.discard(job_id)
+                logger.warning(f"{job_type} job {job_id} abandoned after losing its lease")
+            else:
+                # Shutdown: ``stop`` hands the job back to the queue
+                logger.warning(f"{job_type} job {job_id} interrupted by shutdown")
+            raise
+        except Exception as e:
+            error = str(e) or type(e).__name__
+            logger.error(f"{job_type} job {job_id} failed: {error}")
+        finally:
+            _job_attempt.reset(attempt)
+            usage_tracker.end_runner_job(job_id)
+            db.close()
+        self._finish(job_id, error)
+
+    def _finish(self, job_id: int, error: Optional[str]) -> None:
+        db = self.session_factory()
+        try:
+            job = db.query(Job).filter(Job.id == job_id).first()
+            if job is None:
+                return
+            if job.worker_id != self.worker_id:
+                logger.warning(
+                    f"{job.job_type} job {job_id} finished after its lease passed "
+                    f"to {job.worker_id}; discarding the outcome"
+                )
+                return
+            if not self._settle(db, job, error):
+                logger.warning(f"{job.job_type} job {job_id} lost its lease before finishing")
+            db.commit()
+        finally:
+            db.close()
+
+    def _settle(self, db: Session, job: Job, error: Optional[str]) -> bool:
+        """Complete, re-queue or fail ``job`` if it is still held by the lease seen.
+
+        Returns False when another worker changed the job in the meantime.
+        """
+        now = datetime.datetime.utcnow()
+        # The handler has persisted its usage, or it is lost with the attempt
+        values: Dict[Any, Any] = {Job.lease_expires_at: None, Job.usage: None}
+        if error is None:
+            values.update({Job.status: JobStatusEnum.COMPLETED.value, Job.finished_at: now})
+        else:
+            values[Job.last_error] = error
+            if (job.attempts or 0) < (job.max_attempts or 1):
+                delay = settings.JOB_RETRY_BACKOFF_SECONDS * 2 ** max(0, (job.attempts or 1) - 1)
+                values.update(
+                    {
+                        Job.status: JobStatusEnum.QUEUED.value,
+                        Job.run_after: now + datetime.timedelta(seconds=delay),
+                    }
+                )
+            else:
+                values.update({Job.status: JobStatusEnum.FAILED.value, Job.finished_at: now})
+        held = (
+            db.query(Job)
+            .filter(
+                Job.id == job.id,
+                Job.status == JobStatusEnum.RUNNING.value,
+                Job.worker_id.is_(None)
+                if job.worker_id is None
+                else Job.worker_id == job.worker_id,
+                Job.lease_expires_at.is_(None)
+                if job.lease_expires_at is None
+                else Job.lease_expires_at == job.lease_expires_at,
+            )
+            .update(values, synchronize_session=False)
+        )
+        if not held:
+            return False
+        status = values[Job.status]
+        if status == JobStatusEnum.COMPLETED.value:
+            logger.info(f"{job.job_type} job {job.id} completed")
+        elif status == JobStatusEnum.QUEUED.value:
+            logger.warning(
+                f"{job.job_type} job {job.id} will retry in {delay:.0f}s "
+                f"(attempt {job.attempts}/{job.max_attempts})"
+            )
+        else:
+            logger.error(f"{job.job_type} job {job.id} failed permanently: {error}")
+        return True
+
+
+job_runner = JobRunner()
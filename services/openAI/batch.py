@@ -0,0 +1,235 @@
+import abc
+import asyncio
+import json
+import logging
+import os
+import re
+import uuid
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from openai import AsyncOpenAI
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+BATCH_ENDPOINT = "/v1/chat/completions"
+BATCH_DIR = "llm_batches"
+
+# Indicator lines of an analysis sub-batch prompt, and the fields of its results
+CRITERIA_ID = re.compile(r"^- Criteria ID: (.+?)\s*$", re.MULTILINE)
+STUB_RESULT_FIELDS = (
+    "STATEMENT",
+    "EVIDENCE",
+    "CITATIONS",
+    "ALIGNMENT CATEGORY",
+    "JUSTIFICATION",
+    "Alignment Label",
+    "Alignment Definition",
+)
+
+
+def write_batch_requests(
+    path: str, model: str, requests: List[Tuple[str, str, int]]
+) -> str:
+    """Write ``(custom_id, prompt, max_tokens)`` requests as a batch-API JSONL file."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        for custom_id, prompt, max_tokens in requests:
+            line = {
+                "custom_id": custom_id,
+                "method": "POST",
+                "url": BATCH_ENDPOINT,
+                "body": {
+                    "model": model,
+                    "messages": [{"role": "user", "content": prompt}],
+                    "max_tokens": max_tokens,
+                },
+            }
+            f.write(json.dumps(line, ensure_ascii=False) + "\n")
+    logger.info(f"Wrote {len(requests)} batch requests to {path}")
+    return path
+
+
+def parse_batch_output(text: str) -> Dict[str, str]:
+    """Map ``custom_id`` to completion content for a batch-API output file."""
+    contents: Dict[str, str] = {}
+    for line in text.splitlines():
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError as e:
+            # Its request is left out, so callers treat it as failed
+            logger.warning(f"Skipping unparseable batch output line: {e}: {line[:200]}")
+            continue
+        if not isinstance(record, dict):
+            logger.warning(f"Skipping batch output line that is not an object: {line[:200]}")
+            continue
+        custom_id = record.get("custom_id")
+        response = record.get("response") or {}
+        if record.get("error") or response.get("status_code") != 200:
+            logger.warning(
+                f"Batch request {custom_id} failed: {record.get('error') or response.get('status_code')}"
+            )
+            continue
+        choices = response.get("body", {}).get("choices") or [{}]
+        contents[custom_id] = choices[0].get("message", {}).get("content") or ""
+    return contents
+
+
+class BatchBackend(abc.ABC):
+    """Submits a batch-API JSONL file and returns the outputs by ``custom_id``."""
+
+    @abc.abstractmethod
+    async def submit(self, path: str) -> str:
+        ...
+
+    @abc.abstractmethod
+    async def status(self, batch_id: str) -> str:
+        """One of the batch-API statuses, e.g. ``in_progress`` or ``completed``."""
+
+    @abc.abstractmethod
+    async def results(self, batch_id: str) -> Dict[str, str]:
+        ...
+
+
+class OpenAIBatchBackend(BatchBackend):
+    def __init__(self, client: AsyncOpenAI):
+        self.client = client
+
+    async def submit(self, path: str) -> str:
+        with open(path, "rb") as f:
+            input_file = await self.client.files.create(file=f, purpose="batch")
+        batch = await self.client.batches.create(
+            input_file_id=input_file.id,
+            endpoint=BATCH_ENDPOINT,
+            completion_window=settings.LLM_BATCH_COMPLETION_WINDOW,
+        )
+        logger.info(f"Submitted OpenAI batch {batch.id} from {path}")
+        return batch.id
+
+    async def status(self, batch_id: str) -> str:
+        batch = await self.client.batches.retrieve(batch_id)
+        return batch.status
+
+    async def results(self, batch_id: str) -> Dict[str, str]:
+        batch = await self.client.batches.retrieve(batch_id)
+        if not batch.output_file_id:
+            return {}
+        content = await self.client.files.content(batch.output_file_id)
+        return parse_batch_output(content.text)
+
+
+class LocalBatchBackend(BatchBackend):
+    """Offline stand-in that answers each request with ``responder``.
+
+    The responder gets the request body and returns the completion text. By
+    default no API call is made: every request gets ``LLM_BATCH_LOCAL_RESPONSE``
+    if set, or else one placeholder result per ``Criteria ID`` in its prompt,
+    so the analysis completes offline. ``live_responder`` answers with a real
+    ``OpenAIClient.chat``.
+    Output is written in the provider's format so results go through the
+    same parsing as real batches.
+    """
+
+    def __init__(
+        self,
+        responder: Optional[Callable[[Dict[str, Any]], Awaitable[str]]] = None,
+    ):
+        self.responder = responder or self.stub_responder
+        self._outputs: Dict[str, str] = {}
+
+    @staticmethod
+    async def stub_responder(body: Dict[str, Any]) -> str:
+        if settings.LLM_BATCH_LOCAL_RESPONSE:
+            return settings.LLM_BATCH_LOCAL_RESPONSE
+        prompt = body["messages"][0]["content"]
+        return json.dumps(
+            [
+                {"Indicator ID": indicator_id, **{field: "" for field in STUB_RESULT_FIELDS}}
+                for indicator_id in CRITERIA_ID.findall(prompt)
+            ]
+        )
+
+    @staticmethod
+    async def live_responder(body: Dict[str, Any]) -> str:
+        from services.openAI.clients import get_llm_client
+
+        return await get_llm_client(body["model"]).chat(
+            body["messages"][0]["content"], max_tokens=body.get("max_tokens")
+        )
+
+    async def submit(self, path: str) -> str:
+        batch_id = f"local_batch_{uuid.uuid4()}"
+        with open(path, encoding="utf-8") as f:
+            requests = [json.loads(line) for line in f if line.strip()]
+
+        async def answer(request: Dict[str, Any]) -> str:
+            try:
+                content = await self.responder(request["body"])
+                response = {
+                    "status_code": 200,
+                    "body": {"choices": [{"message": {"content": content}}]},
+                }
+                error = None
+            except Exception as e:
+                response = {"status_code": 500, "body": {}}
+                error = {"message": str(e)}
+            return json.dumps(
+                {"custom_id": request["custom_id"], "response": response, "error": error}
+            )
+
+        lines = await asyncio.gather(*(answer(request) for request in requests))
+        self._outputs[batch_id] = "\n".join(lines)
+        return batch_id
+
+    async def status(self, batch_id: str) -> str:
+        return "completed" if batch_id in self._outputs else "failed"
+
+    async def results(self, batch_id: str) -> Dict[str, str]:
+        return parse_batch_output(self._outputs.get(batch_id, ""))
+
+
+TERMINAL_BATCH_STATUSES = {"completed", "failed", "expired", "cancelled"}
+
+
+async def run_batch(
+    backend: BatchBackend,
+    path: Optional[str],
+    poll_seconds: float | None = None,
+    batch_id: Optional[str] = None,
+    on_submitted: Optional[Callable[[str], None]] = None,
+) -> Dict[str, str]:
+    """Submit ``path``, wait for the batch to finish and return its outputs.
+
+    With ``batch_id`` an earlier submission is awaited instead, e.g. after a
+    retry; ``on_submitted`` gets the ID of a new batch so it can be persisted.
+    """
+    poll_seconds = poll_seconds or settings.LLM_BATCH_POLL_SECONDS
+    if batch_id is None:
+        if path is None:
+            raise ValueError("run_batch needs a requests file or a batch ID")
+        batch_id = await backend.submit(path)
+        if on_submitted:
+            on_submitted(batch_id)
+    else:
+        logger.info(f"Re-attaching to batch {batch_id}")
+    while True:
+        status = await backend.status(batch_id)
+        if status in TERMINAL_BATCH_STATUSES:
+            break
+        logger.info(f"Batch {batch_id} is {status}; polling again in {poll_seconds}s")
+        await asyncio.sleep(poll_seconds)
+    if status != "completed":
+        logger.error(f"Batch {batch_id} ended with status {status}")
+    # Expired or cancelled batches still return the requests that finished
+    return await backend.results(batch_id)
+
+
+def get_batch_backend(client: AsyncOpenAI) -> BatchBackend:
+    if settings.LLM_BATCH_BACKEND == "local":
+        if settings.LLM_BATCH_LOCAL_RESPONDER == "live":
+            return LocalBatchBackend(LocalBatchBackend.live_responder)
+        return LocalBatchBackend()
+    return OpenAIBatchBackend(client)
@@ -0,0 +1,330 @@
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class SQLiteCache:
+    """Storage shared by the on-disk caches: one SQLite table of entries.
+
+    Subclasses define the table (``TABLE`` with ``COLUMNS``, which include
+    ``key``, ``size`` and ``accessed_at``) and how values are keyed and
+    serialised. Entries are evicted least-recently-used first once the cache
+    grows past ``max_bytes`` or ``max_entries``.
+
+    The entry count and size are tracked in memory, so an insert costs one
+    keyed lookup; once a limit is passed, expired and then least-recently-used
+    entries are deleted in one batch down to ``EVICT_TO`` of the limits. The
+    totals are re-read from disk at that point, which also picks up writes
+    from other processes sharing the file. Calls block on SQLite, so async
+    code runs them in a thread.
+    """
+
+    TABLE = ""
+    COLUMNS = ""
+    INDEXED = ("accessed_at",)
+    NAME = "Cache"
+    # Eviction frees space down to this fraction of the limits
+    EVICT_TO = 0.9
+    # Keys per lookup query, below SQLite's bound-parameter limit
+    LOOKUP_BATCH_SIZE = 500
+
+    def __init__(self, path: str, max_bytes: int, max_entries: int):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(f"CREATE TABLE IF NOT EXISTS {self.TABLE} ({self.COLUMNS})")
+        for column in self.INDEXED:
+            self._conn.execute(
+                f"CREATE INDEX IF NOT EXISTS ix_{self.TABLE}_{column} "
+                f"ON {self.TABLE} ({column})"
+            )
+        self._conn.commit()
+        self._entries, self._bytes = self._totals()
+
+    def _totals(self) -> tuple[int, int]:
+        count, total = self._conn.execute(
+            f"SELECT COUNT(*), COALESCE(SUM(size), 0) FROM {self.TABLE}"
+        ).fetchone()
+        return count, total
+
+    def _select(self, columns: str, keys: Sequence[str]) -> List[tuple]:
+        """``key, columns`` rows for ``keys``, queried in batches."""
+        rows: List[tuple] = []
+        for start in range(0, len(keys), self.LOOKUP_BATCH_SIZE):
+            batch = keys[start : start + self.LOOKUP_BATCH_SIZE]
+            rows.extend(
+                self._conn.execute(
+                    f"SELECT key, {columns} FROM {self.TABLE} "
+                    f"WHERE key IN ({','.join('?' * len(batch))})",
+                    batch,
+                ).fetchall()
+            )
+        return rows
+
+    def _touch(self, keys: Iterable[str], now: float) -> None:
+        self._conn.executemany(
+            f"UPDATE {self.TABLE} SET accessed_at = ? WHERE key = ?",
+            [(now, key) for key in keys],
+        )
+
+    def _delete(self, key: str, size: int) -> None:
+        self._conn.execute(f"DELETE FROM {self.TABLE} WHERE key = ?", (key,))
+        self._entries -= 1
+        self._bytes -= size
+
+    def _insert(self, rows: List[Dict[str, object]], now: float) -> None:
+        """Insert or replace entries, each a dict of column values, and evict if needed."""
+        if not rows:
+            return
+        previous = dict(self._select("size", [row["key"] for row in rows]))
+        columns = list(rows[0])
+        self._conn.executemany(
+            f"INSERT OR REPLACE INTO {self.TABLE} ({', '.join(columns)}) "
+            f"VALUES ({', '.join('?' * len(columns))})",
+            [tuple(row[column] for column in columns) for row in rows],
+        )
+        for row in rows:
+            if row["key"] not in previous:
+                self._entries += 1
+            self._bytes += row["size"] - previous.get(row["key"], 0)
+        if self._entries > self.max_entries or self._bytes > self.max_bytes:
+            self._evict(now)
+
+    def _expire(self, now: float) -> int:
+        """Delete entries that may no longer be served; returns how many."""
+        return 0
+
+    def _evict(self, now: float) -> None:
+        expired = self._expire(now)
+        count, total = self._totals()
+        target_entries = int(self.max_entries * self.EVICT_TO)
+        target_bytes = int(self.max_bytes * self.EVICT_TO)
+        evicted: List[str] = []
+        if count > target_entries or total > target_bytes:
+            rows = self._conn.execute(
+                f"SELECT key, size FROM {self.TABLE} ORDER BY accessed_at ASC"
+            )
+            for key, size in rows:
+                if count <= target_entries and total <= target_bytes:
+                    break
+                evicted.append(key)
+                count -= 1
+                total -= size
+            self._conn.executemany(
+                f"DELETE FROM {self.TABLE} WHERE key = ?", [(key,) for key in evicted]
+            )
+        self._entries, self._bytes = count, total
+        logger.info(
+            f"{self.NAME} evicted {expired} expired and {len(evicted)} "
+            f"least recently used entries"
+        )
+
+    def stats(self) -> dict:
+        with self._lock:
+            count, total = self._totals()
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "entries": count,
+            "bytes": total,
+        }
+
+
+class ResponseCache(SQLiteCache):
+    """On-disk SQLite cache of chat completions.
+
+    Entries are keyed by a hash of (model, prompt, temperature, max_tokens).
+    Entries older than ``ttl_seconds`` are never served and are the first to
+    go on eviction.
+    """
+
+    TABLE = "responses"
+    COLUMNS = (
+        "key TEXT PRIMARY KEY, response TEXT NOT NULL, size INTEGER NOT NULL, "
+        "created_at REAL NOT NULL, accessed_at REAL NOT NULL"
+    )
+    INDEXED = ("accessed_at", "created_at")
+    NAME = "LLM response cache"
+
+    def __init__(
+        self,
+        path: str,
+        max_bytes: int = 512 * 1024 * 1024,
+        max_entries: int = 100_000,
+        ttl_seconds: int = 30 * 24 * 3600,
+    ):
+        self.ttl_seconds = ttl_seconds
+        super().__init__(path, max_bytes, max_entries)
+
+    @staticmethod
+    def make_key(
+        model: str,
+        prompt: str,
+        temperature: float | None,
+        max_tokens: int | None,
+    ) -> str:
+        payload = json.dumps(
+            [model, prompt, temperature, max_tokens], ensure_ascii=False
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            rows = self._select("response, created_at, size", [key])
+            if not rows or now - rows[0][2] > self.ttl_seconds:
+                if rows:
+                    self._delete(key, rows[0][3])
+                    self._conn.commit()
+                self.misses += 1
+                return None
+            self._touch([key], now)
+            self._conn.commit()
+            self.hits += 1
+            return rows[0][1]
+
+    def set(self, key: str, response: str) -> None:
+        """Store ``response``, replacing any entry for ``key``."""
+        now = time.time()
+        with self._lock:
+            self._insert(
+                [
+                    {
+                        "key": key,
+                        "response": response,
+                        "size": len(response.encode("utf-8")),
+                        "created_at": now,
+                        "accessed_at": now,
+                    }
+                ],
+                now,
+            )
+            self._conn.commit()
+
+    def _expire(self, now: float) -> int:
+        return self._conn.execute(
+            "DELETE FROM responses WHERE created_at < ?", (now - self.ttl_seconds,)
+        ).rowcount
+
+
+_response_cache: Optional[ResponseCache] = None
+_response_cache_lock = threading.Lock()
+
+
+def get_response_cache() -> Optional[ResponseCache]:
+    """Return the process-wide response cache, or None when caching is disabled."""
+    global _response_cache
+    if not settings.LLM_CACHE_ENABLED:
+        return None
+    with _response_cache_lock:
+        if _response_cache is None:
+            _response_cache = ResponseCache(
+                settings.LLM_CACHE_PATH,
+                max_bytes=settings.LLM_CACHE_MAX_BYTES,
+                max_entries=settings.LLM_CACHE_MAX_ENTRIES,
+                ttl_seconds=settings.LLM_CACHE_TTL_SECONDS,
+            )
+            logger.info(f"LLM response cache enabled at {settings.LLM_CACHE_PATH}")
+        return _response_cache
+
+
+class EmbeddingCache(SQLiteCache):
+    """On-disk SQLite cache of embedding vectors.
+
+    Vectors are keyed by a hash of (model, text) and stored as float32 blobs.
+    Embeddings never go stale, so there is no TTL. ``hits`` and ``misses``
+    count texts, not requests.
+    """
+
+    TABLE = "embeddings"
+    COLUMNS = (
+        "key TEXT PRIMARY KEY, vector BLOB NOT NULL, size INTEGER NOT NULL, "
+        "accessed_at REAL NOT NULL"
+    )
+    NAME = "Embedding cache"
+
+    def __init__(
+        self,
+        path: str,
+        max_bytes: int = 1024 * 1024 * 1024,
+        max_entries: int = 200_000,
+    ):
+        super().__init__(path, max_bytes, max_entries)
+
+    @staticmethod
+    def make_key(model: str, text: str) -> str:
+        return hashlib.sha256(f"{model}\0{text}".encode("utf-8")).hexdigest()
+
+    def get_many(self, model: str, texts: Sequence[str]) -> Dict[str, np.ndarray]:
+        """Cached vectors for ``texts``, keyed by text; missing texts are absent."""
+        keys = {self.make_key(model, text): text for text in texts}
+        found: Dict[str, np.ndarray] = {}
+        now = time.time()
+        with self._lock:
+            rows = self._select("vector", list(keys))
+            for key, blob in rows:
+                found[keys[key]] = np.frombuffer(blob, dtype=np.float32)
+            if rows:
+                self._touch([key for key, _ in rows], now)
+                self._conn.commit()
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+        return found
+
+    def set_many(self, model: str, vectors: Dict[str, np.ndarray]) -> None:
+        now = time.time()
+        rows = []
+        for text, vector in vectors.items():
+            blob = np.asarray(vector, dtype=np.float32).tobytes()
+            rows.append(
+                {
+                    "key": self.make_key(model, text),
+                    "vector": blob,
+                    "size": len(blob),
+                    "accessed_at": now,
+                }
+            )
+        with self._lock:
+            self._insert(rows, now)
+            self._conn.commit()
+
+
+_embedding_cache: Optional[EmbeddingCache] = None
+_embedding_cache_lock = threading.Lock()
+
+
+def get_embedding_cache() -> Optional[EmbeddingCache]:
+    """Return the process-wide embedding cache, or None when caching is disabled."""
+    global _embedding_cache
+    if not settings.EMBEDDING_CACHE_ENABLED:
+        return None
+    with _embedding_cache_lock:
+        if _embedding_cache is None:
+            _embedding_cache = EmbeddingCache(
+                settings.EMBEDDING_CACHE_PATH,
+                max_bytes=settings.EMBEDDING_CACHE_MAX_BYTES,
+                max_entries=settings.EMBEDDING_CACHE_MAX_ENTRIES,
+            )
+            logger.info(f"Embedding cache enabled at {settings.EMBEDDING_CACHE_PATH}")
+        return _embedding_cache
@@ -1,36 +1,262 @@
-from openai import AsyncOpenAI
+from openai import AsyncOpenAI, RateLimitError
+import asyncio
 import logging
+import time
+from typing import Any, AsyncIterator, Callable, Dict, List
+from config import settings
+from services.openAI.cache import ResponseCache, get_response_cache
+from services.openAI.circuit_breaker import CircuitBreaker, get_circuit_breaker
+from services.openAI.errors import LLMError, classify_error
+from services.openAI.usage import usage_tracker
+from services.openAI.rate_limiter import (
+    RateLimiter,
+    estimate_tokens,
+    get_rate_limiter,
+)
+from utils.json_stream import JSONArrayStreamParser, salvage_json_array
 
 logger = logging.getLogger(__name__)
 
 
 class OpenAIClient:
-    def __init__(self, api_key: str = "", model: str = "gpt-4o-mini"):
-        self.client = AsyncOpenAI(api_key=api_key) if api_key else AsyncOpenAI()
+    def __init__(
+        self,
+        api_key: str = "",
+        model: str = "gpt-4o-mini",
+        cache: ResponseCache | None = None,
+        rate_limiter: RateLimiter | None = None,
+        client: AsyncOpenAI | None = None,
+        circuit_breaker: CircuitBreaker | None = None,
+    ):
+        # Prefer services.openAI.clients.get_llm_client, which shares one HTTP pool
+        if client is None:
+            client = AsyncOpenAI(api_key=api_key) if api_key else AsyncOpenAI()
+        self.client = client
         self.model = model
+        # Every client shares the process-wide cache and limiter unless injected
+        self.cache = cache if cache is not None else get_response_cache()
+        self.rate_limiter = rate_limiter or get_rate_limiter(model)
+        self.circuit_breaker = circuit_breaker or get_circuit_breaker()
+
+    def _params(
+        self, prompt: str, temperature: float | None, max_tokens: int | None
+    ) -> Dict[str, Any]:
+        params: Dict[str, Any] = {
+            "model": self.model,
+            "messages": [{"role": "user", "content": prompt}],
+        }
+        if temperature is not None:
+            params["temperature"] = temperature
+        if max_tokens is not None:
+            params["max_tokens"] = max_tokens
+        return params
+
+    async def _cached(
+        self,
+        prompt: str,
+        temperature: float | None,
+        max_tokens: int | None,
+        use_cache: bool,
+    ) -> tuple[str | None, str | None]:
+        """Return ``(cache_key, cached_response)``; the key is None when not caching.
+
+        Without ``use_cache`` the cache is not read but the key is still
+        returned, so a retry's response replaces the entry that failed.
+        """
+        if self.cache is None:
+            return None, None
+        cache_key = ResponseCache.make_key(self.model, prompt, temperature, max_tokens)
+        if not use_cache:
+            return cache_key, None
+        cached = await asyncio.to_thread(self.cache.get, cache_key)
+        if cached is not None:
+            logger.info(
+                f"LLM cache hit ({self.cache.hits} hits, {self.cache.misses} misses)"
+            )
+            usage_tracker.record(self.model, cache_hit=True)
+        return cache_key, cached
+
+    def _record_usage(
+        self, started: float, usage: Any = None, prompt: str = "", completion: str = ""
+    ) -> None:
+        """Record one call against the current job; estimates tokens without ``usage``."""
+        latency = time.perf_counter() - started
+        if usage is not None:
+            details = getattr(usage, "prompt_tokens_details", None)
+            usage_tracker.record(
+                self.model,
+                prompt_tokens=usage.prompt_tokens,
+                completion_tokens=usage.completion_tokens,
+                cached_tokens=getattr(details, "cached_tokens", 0) or 0,
+                latency=latency,
+            )
+        else:
+            # An aborted stream has no usage block but is still billed
+            usage_tracker.record(
+                self.model,
+                prompt_tokens=estimate_tokens(prompt, self.model),
+                completion_tokens=estimate_tokens(completion, self.model),
+                latency=latency,
+            )
+
+    async def _create(self, params: Dict[str, Any]) -> Any:
+        """Send one completion request; call inside a rate-limiter slot.
+
+        Raises a typed ``LLMError`` on failure and reports the outcome to the
+        rate limiter and circuit breaker.
+        """
+        started = time.perf_counter()
+        try:
+            raw = await self.client.chat.completions.with_raw_response.create(**params)
+        except Exception as e:
+            if isinstance(e, RateLimitError):
+                self.rate_limiter.record_rate_limited(e.response.headers)
+            usage_tracker.record(
+                self.model, latency=time.perf_counter() - started, error=True
+            )
+            error = classify_error(e)
+            self.circuit_breaker.record_failure(error)
+            logger.error(f"OpenAI GPT call failed ({type(error).__name__}): {e}")
+            raise error from e
+        self.rate_limiter.record_success(raw.headers)
+        self.circuit_breaker.record_success()
+        return raw
 
     async def chat(
         self,
         prompt: str,
         temperature: float | None = None,
         max_tokens: int | None = None,
+        use_cache: bool = True,
+        validate: Callable[[str], bool] | None = None,
     ) -> str:
-        try:
-            params = {
-                "model": self.model,
-                "messages": [{"role": "user", "content": prompt}],
-            }
+        """Return the completion text; raises ``LLMError`` if the call fails.
 
-            if temperature is not None:
-                params["temperature"] = temperature
-            if max_tokens is not None:
-                params["max_tokens"] = max_tokens
+        The text is only cached if ``validate`` accepts it, so a response the
+        caller cannot use is not served again.
+        """
+        cache_key, cached = await self._cached(prompt, temperature, max_tokens, use_cache)
+        if cached is not None:
+            return cached
 
-            response = await self.client.chat.completions.create(**params)
+        self.circuit_breaker.check()
+        params = self._params(prompt, temperature, max_tokens)
+        tokens = estimate_tokens(prompt, self.model, max_tokens)
+        async with self.rate_limiter.slot(tokens):
+            started = time.perf_counter()
+            raw = await self._create(params)
+        response = raw.parse()
+        self._record_usage(started, response.usage)
 
-            content = response.choices[0].message.content or ""
-            return content
+        content = response.choices[0].message.content or ""
+        if cache_key is not None and content and (validate is None or validate(content)):
+            await asyncio.to_thread(self.cache.set, cache_key, content)
+        return content
 
-        except Exception as e:
-            logger.error(f"OpenAI GPT call failed: {e}")
-            return f"GPT-4 analysis failed: {e}"
+    async def chat_stream(
+        self,
+        prompt: str,
+        temperature: float | None = None,
+        max_tokens: int | None = None,
+    ) -> AsyncIterator[str]:
+        """Yield the completion text as it is generated.
+
+        The rate-limiter slot is held until the stream ends or the caller
+        stops iterating, which closes the connection and stops generation.
+        """
+        self.circuit_breaker.check()
+        params = self._params(prompt, temperature, max_tokens)
+        params["stream"] = True
+        # The final chunk then carries the token usage
+        params["stream_options"] = {"include_usage": True}
+        tokens = estimate_tokens(prompt, self.model, max_tokens)
+        async with self.rate_limiter.slot(tokens):
+            started = time.perf_counter()
+            raw = await self._create(params)
+            stream = raw.parse()
+            usage = None
+            parts: List[str] = []
+            try:
+                async for chunk in stream:
+                    if chunk.usage is not None:
+                        usage = chunk.usage
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        parts.append(chunk.choices[0].delta.content)
+                        yield chunk.choices[0].delta.content
+            except LLMError:
+                raise
+            except Exception as e:
+                # The connection dropped mid-stream
+                error = classify_error(e)
+                self.circuit_breaker.record_failure(error)
+                raise error from e
+            finally:
+                await stream.close()
+                self._record_usage(started, usage, prompt, "".join(parts))
+
+    async def chat_json_array(
+        self,
+        prompt: str,
+        max_objects: int | None = None,
+        on_object: Callable[[Dict[str, Any]], None] | None = None,
+        temperature: float | None = None,
+        max_tokens: int | None = None,
+        use_cache: bool = True,
+        validate: Callable[[List[Dict[str, Any]]], bool] | None = None,
+    ) -> List[Dict[str, Any]]:
+        """Stream a completion that must be a JSON array of objects.
+
+        Each object is passed to ``on_object`` as soon as it closes. The
+        stream is aborted once the response is clearly off-format: more than
+        LLM_STREAM_MAX_PREFIX_CHARS of text before the array, or more than
+        ``max_objects`` objects. The objects received so far are returned.
+        A complete array is cached if ``validate`` accepts its objects.
+        """
+        cache_key, cached = await self._cached(prompt, temperature, max_tokens, use_cache)
+        if cached is not None:
+            objects = salvage_json_array(cached)[:max_objects]
+            if on_object:
+                for obj in objects:
+                    on_object(obj)
+            return objects
+
+        parser = JSONArrayStreamParser()
+        objects: List[Dict[str, Any]] = []
+        text_parts: List[str] = []
+        abort_reason = ""
+        stream = self.chat_stream(prompt, temperature, max_tokens)
+        try:
+            async for delta in stream:
+                text_parts.append(delta)
+                for obj in parser.feed(delta):
+                    if max_objects is not None and len(objects) >= max_objects:
+                        abort_reason = f"more than {max_objects} objects"
+                        break
+                    objects.append(obj)
+                    if on_object:
+                        on_object(obj)
+                if not parser.started and parser.prefix_chars > settings.LLM_STREAM_MAX_PREFIX_CHARS:
+                    abort_reason = "text before the JSON array"
+                # After the array closes, keep reading for the final usage chunk
+                if abort_reason:
+                    break
+        except LLMError as e:
+            # Objects already handed to on_object are kept; with none, fail
+            if not objects:
+                raise
+            abort_reason = f"{type(e).__name__}: {e}"
+        finally:
+            await stream.aclose()
+
+        if abort_reason:
+            logger.warning(
+                f"Aborted streamed completion after {len(''.join(text_parts))} characters "
+                f"({abort_reason}); kept {len(objects)} objects"
+            )
+        elif (
+            cache_key is not None
+            and parser.closed
+            and (validate is None or validate(objects))
+        ):
+            await asyncio.to_thread(self.cache.set, cache_key, "".join(text_parts))
+        return objects
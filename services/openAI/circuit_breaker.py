@@ -0,0 +1,103 @@
+import logging
+import threading
+import time
+from typing import Optional
+
+from config import settings
+from services.openAI.errors import (
+    LLMCircuitOpenError,
+    LLMError,
+    LLMServerError,
+    LLMTimeoutError,
+)
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """Stops all LLM calls while the provider is failing.
+
+    After ``failure_threshold`` consecutive server errors or timeouts the
+    circuit opens and every call fails fast with ``LLMCircuitOpenError``
+    carrying the time left. Once ``reset_seconds`` have passed a single probe
+    call is let through; its success closes the circuit, its failure reopens
+    it. An outage longer than ``max_outage_seconds`` makes the error
+    non-retryable so jobs stop waiting.
+    """
+
+    def __init__(
+        self,
+        failure_threshold: int = 5,
+        reset_seconds: float = 30.0,
+        max_outage_seconds: float = 900.0,
+    ):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.max_outage_seconds = max_outage_seconds
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.outage_started_at: Optional[float] = None
+
+    def check(self) -> None:
+        """Raise ``LLMCircuitOpenError`` unless a call may go to the provider now."""
+        if self.state == CLOSED:
+            return
+        now = time.monotonic()
+        # A half-open probe that never reported back (e.g. cancelled) is replaced
+        if now >= self.opened_at + self.reset_seconds:
+            self.state = HALF_OPEN
+            self.opened_at = now
+            logger.info("LLM circuit half-open: sending a probe request")
+            return
+        outage = now - (self.outage_started_at or now)
+        raise LLMCircuitOpenError(
+            f"LLM provider unavailable (circuit {self.state} for {outage:.0f}s)",
+            retry_after=self.opened_at + self.reset_seconds - now,
+            retryable=outage < self.max_outage_seconds,
+        )
+
+    def record_success(self) -> None:
+        if self.state != CLOSED:
+            logger.info("LLM circuit closed: provider is responding again")
+        self.state = CLOSED
+        self.failures = 0
+        self.outage_started_at = None
+
+    def record_failure(self, error: LLMError) -> None:
+        if not isinstance(error, (LLMServerError, LLMTimeoutError)):
+            # Any other answer means the provider is up
+            self.record_success()
+            return
+        self.failures += 1
+        if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+            now = time.monotonic()
+            self.state = OPEN
+            self.opened_at = now
+            if self.outage_started_at is None:
+                self.outage_started_at = now
+            logger.warning(
+                f"LLM circuit open after {self.failures} consecutive failures "
+                f"({error}); pausing calls for {self.reset_seconds:.0f}s"
+            )
+
+
+_circuit_breaker: Optional[CircuitBreaker] = None
+_circuit_breaker_lock = threading.Lock()
+
+
+def get_circuit_breaker() -> CircuitBreaker:
+    """Return the process-wide breaker shared by every LLM client."""
+    global _circuit_breaker
+    with _circuit_breaker_lock:
+        if _circuit_breaker is None:
+            _circuit_breaker = CircuitBreaker(
+                failure_threshold=settings.LLM_CIRCUIT_FAILURE_THRESHOLD,
+                reset_seconds=settings.LLM_CIRCUIT_RESET_SECONDS,
+                max_outage_seconds=settings.LLM_CIRCUIT_MAX_OUTAGE_SECONDS,
+            )
+        return _circuit_breaker
@@ -0,0 +1,133 @@
+import importlib.util
+import logging
+import threading
+from typing import Any, Dict, Optional
+
+import httpx
+from langchain_openai import OpenAIEmbeddings
+from openai import AsyncOpenAI
+
+from config import settings
+from services.openAI.chat import OpenAIClient
+from services.openAI.rate_limiter import capture_embedding_headers
+from utils.event_loops import LoopLocal
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MODEL = "gpt-4o-mini"
+EMBEDDING_MODEL = "text-embedding-ada-002"
+
+
+def model_config(model: str) -> Dict[str, Any]:
+    """Per-model overrides from LLM_MODEL_CONFIG (timeout, max_retries, rpm, tpm)."""
+    return settings.LLM_MODEL_CONFIG.get(model, {})
+
+
+class _LoopClients:
+    """The pooled HTTP client and the clients built on it, for one event loop."""
+
+    def __init__(self):
+        self.http_client: Optional[httpx.AsyncClient] = None
+        self.openai: Optional[AsyncOpenAI] = None
+        self.clients: Dict[str, OpenAIClient] = {}
+        self.embedders: Dict[str, OpenAIEmbeddings] = {}
+
+
+class LLMClientRegistry:
+    """LLM clients built lazily on top of one pooled HTTP client per event loop.
+
+    Every ``OpenAIClient`` and embedder handed out shares the same connection
+    pool, response cache and per-model rate limiter, so keep-alive connections
+    are reused across analyses, reports, indicator parsing and regulation
+    ingestion. Pooled connections belong to the loop that opened them, so
+    each event loop (in practice only the job runner's) gets its own pool.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._loops: LoopLocal[_LoopClients] = LoopLocal(_LoopClients)
+
+    def _build_http_client(self) -> httpx.AsyncClient:
+        # HTTP/2 multiplexes concurrent requests over a few connections; it
+        # needs the optional h2 package and falls back to HTTP/1.1 without it
+        http2 = settings.LLM_HTTP2 and importlib.util.find_spec("h2") is not None
+        if settings.LLM_HTTP2 and not http2:
+            logger.warning("LLM_HTTP2 is set but h2 is not installed; using HTTP/1.1")
+        logger.info(
+            f"Creating shared LLM HTTP client (http2={http2}, "
+            f"max_connections={settings.LLM_MAX_CONNECTIONS})"
+        )
+        return httpx.AsyncClient(
+            http2=http2,
+            limits=httpx.Limits(
+                max_connections=settings.LLM_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.LLM_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=settings.LLM_KEEPALIVE_EXPIRY,
+            ),
+            timeout=httpx.Timeout(
+                settings.LLM_TIMEOUT_SECONDS,
+                connect=settings.LLM_CONNECT_TIMEOUT_SECONDS,
+            ),
+            # Hands rate-limit headers to an enclosing embedding_slot; a no-op
+            # for every other request
+            event_hooks={"response": [capture_embedding_headers]},
+        )
+
+    def _state(self) -> _LoopClients:
+        state = self._loops.get()
+        with self._lock:
+            if state.openai is None:
+                state.http_client = self._build_http_client()
+                state.openai = AsyncOpenAI(
+                    api_key=settings.OPENAI_API_KEY.get_secret_value() or None,
+                    http_client=state.http_client,
+                    max_retries=settings.LLM_MAX_RETRIES,
+                )
+        return state
+
+    def openai(self) -> AsyncOpenAI:
+        """The shared ``AsyncOpenAI`` client (batches, files, raw calls)."""
+        return self._state().openai
+
+    def get(self, model: str = DEFAULT_MODEL) -> OpenAIClient:
+        """The shared ``OpenAIClient`` for ``model``."""
+        state = self._state()
+        with self._lock:
+            if model not in state.clients:
+                config = model_config(model)
+                # with_options copies the client but keeps the same HTTP pool
+                client = state.openai.with_options(
+                    timeout=config.get("timeout", settings.LLM_TIMEOUT_SECONDS),
+                    max_retries=config.get("max_retries", settings.LLM_MAX_RETRIES),
+                )
+                state.clients[model] = OpenAIClient(model=model, client=client)
+            return state.clients[model]
+
+    def embeddings(self, model: str = EMBEDDING_MODEL) -> OpenAIEmbeddings:
+        """The shared langchain embedder for ``model``, on the same HTTP pool."""
+        state = self._state()
+        with self._lock:
+            if model not in state.embedders:
+                state.embedders[model] = OpenAIEmbeddings(
+                    model=model,
+                    api_key=settings.OPENAI_API_KEY,
+                    http_async_client=state.http_client,
+                )
+            return state.embedders[model]
+
+    async def aclose(self) -> None:
+        """Close the running event loop's pool; the next call opens a new one."""
+        state = self._loops.pop()
+        if state is not None and state.http_client is not None:
+            await state.http_client.aclose()
+
+
+llm_clients = LLMClientRegistry()
+
+
+def get_llm_client(model: str = DEFAULT_MODEL) -> OpenAIClient:
+    return llm_clients.get(model)
+
+
+def get_openai() -> AsyncOpenAI:
+    return llm_clients.openai()
@@ -0,0 +1,81 @@
+import httpx
+import openai
+
+from services.openAI.rate_limiter import parse_reset
+
+
+class LLMError(Exception):
+    """A failed LLM call. ``retryable`` says whether the same request may succeed later."""
+
+    retryable = False
+
+    def __init__(self, message: str, retry_after: float | None = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class LLMRateLimitError(LLMError):
+    retryable = True
+
+
+class LLMTimeoutError(LLMError):
+    retryable = True
+
+
+class LLMServerError(LLMError):
+    """The provider returned a 5xx or could not be reached."""
+
+    retryable = True
+
+
+class LLMContextOverflowError(LLMError):
+    """The prompt plus ``max_tokens`` exceeds the model's context window."""
+
+
+class LLMCircuitOpenError(LLMError):
+    """Raised without calling the provider while the circuit breaker is open."""
+
+    def __init__(self, message: str, retry_after: float, retryable: bool = True):
+        super().__init__(message, retry_after)
+        self.retryable = retryable
+
+
+def classify_error(error: Exception) -> LLMError:
+    """Map an OpenAI SDK exception onto the typed ``LLMError`` hierarchy."""
+    if isinstance(error, LLMError):
+        return error
+    if isinstance(error, openai.RateLimitError):
+        headers = error.response.headers
+        retry_after = max(
+            parse_reset(headers.get("x-ratelimit-reset-requests")),
+            parse_reset(headers.get("x-ratelimit-reset-tokens")),
+        )
+        return LLMRateLimitError(str(error), retry_after or None)
+    if isinstance(error, openai.APITimeoutError):
+        return LLMTimeoutError(str(error))
+    if isinstance(error, openai.APIConnectionError):
+        return LLMServerError(str(error))
+    if isinstance(error, openai.BadRequestError) and (
+        error.code == "context_length_exceeded"
+        or "maximum context length" in str(error)
+    ):
+        return LLMContextOverflowError(str(error))
+    if isinstance(error, openai.APIStatusError):
+        if error.status_code >= 500:
+            return LLMServerError(str(error))
+        return LLMError(str(error))
+    # Errors raised while reading a stream, after the response has started
+    if isinstance(error, httpx.TimeoutException):
+        return LLMTimeoutError(str(error))
+    if isinstance(error, (openai.APIError, httpx.TransportError)):
+        return LLMServerError(str(error))
+    return LLMError(str(error))
+
+
+def retry_delay(error: LLMError, attempt: int) -> float | None:
+    """Seconds to wait before retrying after ``error``, or None to give up."""
+    if not error.retryable:
+        return None
+    if error.retry_after is not None:
+        return error.retry_after
+    return min(60.0, 2.0**attempt)
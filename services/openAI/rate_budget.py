@@ -0,0 +1,193 @@
+import logging
+import os
+import socket
+import time
+import uuid
+from typing import Callable, Optional, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from config import settings
+from db import SessionLocal
+from models.rate_budget import RateBudget, RateBudgetMember
+
+logger = logging.getLogger(__name__)
+
+# Leases that lose the race for the shared row are retried this many times
+MAX_LEASE_CONFLICTS = 10
+
+
+class SharedRateBudget:
+    """RPM/TPM budget for one model shared through the database.
+
+    Every process that calls the model leases credits from one shared bucket
+    that refills at the account limit. A process may take at most its fair
+    share, the limit divided by the processes that leased recently, so one
+    busy process cannot starve the others while an idle one takes nothing. A
+    429 seen by any process pauses the bucket for all of them.
+
+    Leases update the shared row with a version check instead of row locks,
+    so SQLite and Postgres behave the same.
+    """
+
+    def __init__(
+        self,
+        model: str,
+        rpm: int,
+        tpm: int,
+        session_factory: Callable[[], Session] = SessionLocal,
+        member: Optional[str] = None,
+    ):
+        self.model = model
+        self.rpm = float(rpm)
+        self.tpm = float(tpm)
+        self.session_factory = session_factory
+        self.member = (
+            member or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        )
+
+    def lease(
+        self,
+        requests: float,
+        tokens: float,
+        remaining: Optional[Tuple[Optional[float], Optional[float]]] = None,
+    ) -> Tuple[float, float, float]:
+        """Take up to ``requests``/``tokens`` credits.
+
+        Returns the granted requests and tokens, and how long to wait before
+        asking again when less than asked for was granted. ``remaining`` is
+        the provider's latest ``x-ratelimit-remaining-*`` pair; the shared
+        bucket is lowered to it.
+        """
+        db = self.session_factory()
+        try:
+            for _ in range(MAX_LEASE_CONFLICTS):
+                db.expire_all()
+                try:
+                    granted = self._try_lease(db, requests, tokens, remaining)
+                except IntegrityError:
+                    # Another process created the shared row first
+                    db.rollback()
+                    continue
+                if granted is not None:
+                    return granted
+                db.rollback()
+            logger.warning(f"Rate budget for {self.model} is contended; backing off")
+            return 0.0, 0.0, 0.1
+        finally:
+            db.close()
+
+    def pause(self, seconds: float) -> None:
+        """Stop every process from leasing for ``seconds``."""
+        until = time.time() + seconds
+        db = self.session_factory()
+        try:
+            db.query(RateBudget).filter(
+                RateBudget.model == self.model, RateBudget.paused_until < until
+            ).update({RateBudget.paused_until: until}, synchronize_session=False)
+            db.commit()
+        finally:
+            db.close()
+
+    def _try_lease(
+        self,
+        db: Session,
+        requests: float,
+        tokens: float,
+        remaining: Optional[Tuple[Optional[float], Optional[float]]],
+    ) -> Optional[Tuple[float, float, float]]:
+        now = time.time()
+        shared = db.get(RateBudget, self.model)
+        if shared is None:
+            shared = RateBudget(
+                model=self.model,
+                requests=self.rpm,
+                tokens=self.tpm,
+                updated_at=now,
+                paused_until=0.0,
+                version=0,
+            )
+            db.add(shared)
+            db.flush()
+        active = (
+            db.query(func.count(RateBudgetMember.member))
+            .filter(
+                RateBudgetMember.model == self.model,
+                RateBudgetMember.member != self.member,
+                RateBudgetMember.updated_at
+                >= now - settings.LLM_RATE_BUDGET_MEMBER_TTL_SECONDS,
+            )
+            .scalar()
+        ) + 1
+        share_requests, share_tokens = self.rpm / active, self.tpm / active
+
+        elapsed = max(0.0, now - float(shared.updated_at))
+        shared_requests = min(self.rpm, float(shared.requests) + elapsed * self.rpm / 60.0)
+        shared_tokens = min(self.tpm, float(shared.tokens) + elapsed * self.tpm / 60.0)
+        if remaining:
+            remaining_requests, remaining_tokens = remaining
+            if remaining_requests is not None:
+                shared_requests = min(shared_requests, remaining_requests)
+            if remaining_tokens is not None:
+                shared_tokens = min(shared_tokens, remaining_tokens)
+
+        own = db.get(RateBudgetMember, (self.model, self.member))
+        if own is None:
+            own = RateBudgetMember(
+                model=self.model,
+                member=self.member,
+                requests=share_requests,
+                tokens=share_tokens,
+                updated_at=now,
+            )
+            db.add(own)
+            own_requests, own_tokens = share_requests, share_tokens
+        else:
+            own_elapsed = max(0.0, now - float(own.updated_at))
+            own_requests = min(
+                share_requests, float(own.requests) + own_elapsed * share_requests / 60.0
+            )
+            own_tokens = min(
+                share_tokens, float(own.tokens) + own_elapsed * share_tokens / 60.0
+            )
+
+        wait = float(shared.paused_until or 0.0) - now
+        if wait > 0:
+            granted_requests = granted_tokens = 0.0
+        else:
+            granted_requests = max(0.0, min(requests, shared_requests, own_requests))
+            granted_tokens = max(0.0, min(tokens, shared_tokens, own_tokens))
+            wait = max(
+                self._refill_wait(requests - granted_requests, self.rpm, share_requests),
+                self._refill_wait(tokens - granted_tokens, self.tpm, share_tokens),
+            )
+
+        updated = (
+            db.query(RateBudget)
+            .filter(RateBudget.model == self.model, RateBudget.version == shared.version)
+            .update(
+                {
+                    RateBudget.requests: shared_requests - granted_requests,
+                    RateBudget.tokens: shared_tokens - granted_tokens,
+                    RateBudget.updated_at: now,
+                    RateBudget.version: RateBudget.version + 1,
+                },
+                synchronize_session=False,
+            )
+        )
+        if not updated:
+            return None
+        own.requests = own_requests - granted_requests
+        own.tokens = own_tokens - granted_tokens
+        own.updated_at = now
+        db.commit()
+        return granted_requests, granted_tokens, wait
+
+    @staticmethod
+    def _refill_wait(deficit: float, limit: float, share: float) -> float:
+        """Seconds until ``deficit`` credits refill at this process's share."""
+        if deficit <= 0:
+            return 0.0
+        return deficit * 60.0 / min(limit, share)
@@ -0,0 +1,345 @@
+import asyncio
+import logging
+import re
+import threading
+import time
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Dict, List, Mapping, Optional, Set, Tuple
+
+import httpx
+import tiktoken
+from openai import RateLimitError
+
+from config import settings
+from services.openAI.rate_budget import SharedRateBudget
+from services.openAI.scheduler import FairQueue, current_scheduling
+from utils.event_loops import LoopLocal
+
+logger = logging.getLogger(__name__)
+
+
+def estimate_tokens(prompt: str, model: str, max_tokens: int | None = None) -> int:
+    """Estimate the tokens a request counts against the TPM limit.
+
+    OpenAI charges the prompt plus the requested ``max_tokens`` against the
+    limit when the request is admitted, so both are included.
+    """
+    try:
+        enc = tiktoken.encoding_for_model(model)
+    except KeyError:
+        enc = tiktoken.get_encoding("o200k_base")
+    return len(enc.encode(prompt)) + (max_tokens or 0)
+
+
+def parse_reset(value: str | None) -> float:
+    """Parse an ``x-ratelimit-reset-*`` header such as ``1s``, ``6m0s`` or ``20ms``."""
+    if not value:
+        return 0.0
+    seconds = 0.0
+    for amount, unit in re.findall(r"([\d.]+)(ms|s|m|h)", value):
+        seconds += float(amount) * {"ms": 0.001, "s": 1, "m": 60, "h": 3600}[unit]
+    return seconds
+
+
+class TokenBucket:
+    """Bucket refilled continuously at ``capacity`` units per minute."""
+
+    def __init__(self, capacity: int):
+        self.capacity = float(capacity)
+        self.level = float(capacity)
+        self.updated_at = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.level = min(
+            self.capacity,
+            self.level + (now - self.updated_at) * self.capacity / 60.0,
+        )
+        self.updated_at = now
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until ``amount`` is available (0 if it is available now)."""
+        self._refill()
+        # A request larger than the whole bucket is admitted once it is full
+        amount = min(amount, self.capacity)
+        if self.level >= amount:
+            return 0.0
+        return (amount - self.level) * 60.0 / self.capacity
+
+    def take(self, amount: float) -> None:
+        self._refill()
+        self.level -= amount
+
+    def sync(self, remaining: float) -> None:
+        """Lower the local level to what the provider reports as remaining."""
+        self._refill()
+        self.level = min(self.level, remaining)
+
+
+class RateLimiter:
+    """RPM/TPM token buckets plus AIMD-controlled concurrency for one model.
+
+    Concurrency grows by one after every successful call and halves on a
+    429, between ``min_concurrency`` and ``max_concurrency``. Waiting calls
+    are admitted in ``FairQueue`` order for the job they belong to, so a
+    small interactive job is not stuck behind a large batch job.
+
+    With a ``budget`` the RPM/TPM credits are leased from the budget shared
+    with other processes instead of refilling locally; credits are leased a
+    little ahead (``LLM_RATE_BUDGET_LEASE_FRACTION`` of the limit) to keep
+    database round trips off most requests.
+    """
+
+    def __init__(
+        self,
+        rpm: int,
+        tpm: int,
+        max_concurrency: int = 32,
+        min_concurrency: int = 1,
+        initial_concurrency: int = 8,
+        budget: Optional[SharedRateBudget] = None,
+    ):
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self.budget = budget
+        # Leased, not yet spent credits when sharing a budget
+        self.leased_requests = 0.0
+        self.leased_tokens = 0.0
+        self._remaining: Optional[Tuple[Optional[float], Optional[float]]] = None
+        self.max_concurrency = max_concurrency
+        self.min_concurrency = min_concurrency
+        self.concurrency = max(
+            min_concurrency, min(initial_concurrency, max_concurrency)
+        )
+        self.in_flight = 0
+        self.paused_until = 0.0
+        self.queue = FairQueue()
+        self._condition = asyncio.Condition()
+        # Pending writes to the shared budget
+        self._background: Set[asyncio.Task] = set()
+
+    @asynccontextmanager
+    async def slot(self, tokens: int):
+        await self.acquire(tokens)
+        try:
+            yield
+        finally:
+            await self.release()
+
+    async def acquire(self, tokens: int) -> None:
+        scope = current_scheduling()
+        async with self._condition:
+            waiter = self.queue.push(scope.tenant, scope.priority, tokens)
+        try:
+            while True:
+                async with self._condition:
+                    while True:
+                        # Only the request at the head of the fair queue may take capacity
+                        if self.queue.head() is waiter and self.in_flight < self.concurrency:
+                            wait = self.paused_until - time.monotonic()
+                            if wait > 0:
+                                pass
+                            elif self.budget is not None:
+                                if not self._leased(tokens):
+                                    break
+                                wait = 0.0
+                            else:
+                                wait = max(
+                                    self.requests.wait_time(1), self.tokens.wait_time(tokens)
+                                )
+                            if wait <= 0:
+                                self._take(tokens)
+                                self.in_flight += 1
+                                self.queue.pop(waiter)
+                                # The next head may be admissible right away
+                                self._condition.notify_all()
+                                return
+                            try:
+                                await asyncio.wait_for(self._condition.wait(), timeout=wait)
+                            except asyncio.TimeoutError:
+                                pass
+                        else:
+                            await self._condition.wait()
+                # Lease outside the condition, so releases and other waiters
+                # are not held up by the database round trip
+                wait = await self._lease(tokens)
+                if wait > 0:
+                    await asyncio.sleep(wait)
+        except BaseException:
+            async with self._condition:
+                self.queue.remove(waiter)
+                self._condition.notify_all()
+            raise
+
+    def _take(self, tokens: int) -> None:
+        if self.budget is not None:
+            self.leased_requests -= 1
+            self.leased_tokens -= min(tokens, self.budget.tpm)
+        else:
+            self.requests.take(1)
+            self.tokens.take(tokens)
+
+    def _leased(self, tokens: int) -> bool:
+        """Whether the leased credits cover one request of ``tokens``."""
+        # A request larger than the whole limit is admitted on a full budget
+        return self.leased_requests >= 1 and self.leased_tokens >= min(
+            tokens, self.budget.tpm
+        )
+
+    async def _lease(self, tokens: int) -> float:
+        """Top up leased credits for one request; returns seconds to wait."""
+        tokens = min(tokens, self.budget.tpm)
+        need_requests = 1 - self.leased_requests
+        need_tokens = tokens - self.leased_tokens
+        if need_requests <= 0 and need_tokens <= 0:
+            return 0.0
+        ahead = settings.LLM_RATE_BUDGET_LEASE_FRACTION
+        remaining, self._remaining = self._remaining, None
+        granted_requests, granted_tokens, wait = await asyncio.to_thread(
+            self.budget.lease,
+            max(0.0, need_requests) + self.budget.rpm * ahead,
+            max(0.0, need_tokens) + self.budget.tpm * ahead,
+            remaining,
+        )
+        self.leased_requests += granted_requests
+        self.leased_tokens += granted_tokens
+        if self._leased(tokens):
+            return 0.0
+        return max(wait, 0.05)
+
+    async def release(self) -> None:
+        async with self._condition:
+            self.in_flight -= 1
+            self._condition.notify_all()
+
+    def record_success(self, headers: Optional[Mapping[str, str]] = None) -> None:
+        if self.concurrency < self.max_concurrency:
+            self.concurrency += 1
+        if not headers:
+            return
+        remaining_requests = headers.get("x-ratelimit-remaining-requests")
+        remaining_tokens = headers.get("x-ratelimit-remaining-tokens")
+        if self.budget is not None:
+            # Applied to the shared bucket with the next lease
+            self._remaining = (
+                float(remaining_requests) if remaining_requests is not None else None,
+                float(remaining_tokens) if remaining_tokens is not None else None,
+            )
+            return
+        if remaining_requests is not None:
+            self.requests.sync(float(remaining_requests))
+        if remaining_tokens is not None:
+            self.tokens.sync(float(remaining_tokens))
+
+    def record_rate_limited(
+        self, headers: Optional[Mapping[str, str]] = None
+    ) -> None:
+        self.concurrency = max(self.min_concurrency, self.concurrency // 2)
+        pause = 1.0
+        if headers:
+            pause = max(
+                pause,
+                parse_reset(headers.get("x-ratelimit-reset-requests")),
+                parse_reset(headers.get("x-ratelimit-reset-tokens")),
+            )
+        self.paused_until = max(self.paused_until, time.monotonic() + pause)
+        if self.budget is not None:
+            # A database write; keep it off the event loop
+            try:
+                loop = asyncio.get_running_loop()
+            except RuntimeError:
+                self._pause_budget(pause)
+            else:
+                task = loop.create_task(asyncio.to_thread(self._pause_budget, pause))
+                self._background.add(task)
+                task.add_done_callback(self._background.discard)
+        logger.warning(
+            f"Rate limited: concurrency lowered to {self.concurrency}, pausing {pause:.1f}s"
+        )
+
+    def _pause_budget(self, seconds: float) -> None:
+        try:
+            self.budget.pause(seconds)
+        except Exception as e:
+            logger.warning(f"Could not pause the shared rate budget: {e}")
+
+
+# Limiters wait on an asyncio.Condition, so each event loop has its own
+_rate_limiters: LoopLocal[Dict[str, RateLimiter]] = LoopLocal(dict)
+_rate_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(
+    model: str, rpm: Optional[int] = None, tpm: Optional[int] = None
+) -> RateLimiter:
+    """Return the limiter for ``model`` in the running event loop.
+
+    ``rpm``/``tpm`` are the limits used when LLM_MODEL_CONFIG has none for
+    the model; they default to OPENAI_RPM_LIMIT/OPENAI_TPM_LIMIT. Models are
+    only called from the job runner's loop, so in practice a process has one
+    limiter per model; LLM_SHARED_RATE_LIMIT shares the budget regardless.
+    """
+    limiters = _rate_limiters.get()
+    with _rate_limiters_lock:
+        if model not in limiters:
+            overrides = settings.LLM_MODEL_CONFIG.get(model, {})
+            rpm = overrides.get("rpm", rpm or settings.OPENAI_RPM_LIMIT)
+            tpm = overrides.get("tpm", tpm or settings.OPENAI_TPM_LIMIT)
+            budget = None
+            if settings.LLM_SHARED_RATE_LIMIT:
+                budget = SharedRateBudget(model, rpm, tpm)
+            limiters[model] = RateLimiter(
+                rpm=rpm,
+                tpm=tpm,
+                max_concurrency=settings.LLM_MAX_CONCURRENCY,
+                min_concurrency=settings.LLM_MIN_CONCURRENCY,
+                initial_concurrency=settings.LLM_INITIAL_CONCURRENCY,
+                budget=budget,
+            )
+        return limiters[model]
+
+
+@dataclass
+class EmbeddingCall:
+    """Response headers of the embedding requests made inside ``embedding_slot``."""
+
+    headers: Optional[Mapping[str, str]] = None
+
+
+_embedding_call: ContextVar[Optional[EmbeddingCall]] = ContextVar(
+    "embedding_call", default=None
+)
+
+
+async def capture_embedding_headers(response: httpx.Response) -> None:
+    """httpx response hook handing headers to the enclosing ``embedding_slot``."""
+    call = _embedding_call.get()
+    if call is not None:
+        call.headers = response.headers
+
+
+@asynccontextmanager
+async def embedding_slot(model: str, texts: List[str]):
+    """Hold a rate-limiter slot for one embedding call over ``texts``.
+
+    As with chat calls, the remaining-limit headers of the response (captured
+    by ``capture_embedding_headers`` on the embedding HTTP client) sync the
+    limiter, and a 429 lowers concurrency and pauses it.
+    """
+    limiter = get_rate_limiter(
+        model, settings.OPENAI_EMBEDDING_RPM_LIMIT, settings.OPENAI_EMBEDDING_TPM_LIMIT
+    )
+    call = EmbeddingCall()
+    token = _embedding_call.set(call)
+    try:
+        async with limiter.slot(sum(estimate_tokens(text, model) for text in texts)):
+            try:
+                yield call
+            except RateLimitError as e:
+                limiter.record_rate_limited(e.response.headers)
+                raise
+    finally:
+        _embedding_call.reset(token)
+    limiter.record_success(call.headers)
@@ -0,0 +1,114 @@
+import itertools
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from config import settings
+from enums.job import JobPriorityEnum
+
+DEFAULT_TENANT = "anonymous"
+
+LANES = [priority.value for priority in JobPriorityEnum]
+
+
+def lane_rank(priority: Optional[str]) -> int:
+    """Position of ``priority`` in the lane order; unknown values are standard."""
+    if priority in LANES:
+        return LANES.index(priority)
+    return LANES.index(JobPriorityEnum.STANDARD.value)
+
+
+@dataclass(frozen=True)
+class SchedulingScope:
+    tenant: str
+    priority: str
+
+
+# Set per job like the usage scope; LLM calls made in the job queue under it
+_scheduling_scope: ContextVar[Optional[SchedulingScope]] = ContextVar(
+    "llm_scheduling_scope", default=None
+)
+
+
+@contextmanager
+def scheduling_scope(tenant: Optional[str], priority: Optional[str]):
+    """Queue LLM calls made inside the block for ``tenant`` in lane ``priority``."""
+    token = _scheduling_scope.set(
+        SchedulingScope(
+            tenant or DEFAULT_TENANT, priority or JobPriorityEnum.STANDARD.value
+        )
+    )
+    try:
+        yield
+    finally:
+        _scheduling_scope.reset(token)
+
+
+def current_scheduling() -> SchedulingScope:
+    return _scheduling_scope.get() or SchedulingScope(
+        DEFAULT_TENANT, JobPriorityEnum.STANDARD.value
+    )
+
+
+@dataclass(eq=False)
+class Waiter:
+    lane: int
+    tenant: str
+    start: float
+    finish: float
+    seq: int
+
+
+class FairQueue:
+    """Orders requests waiting for rate-limiter capacity.
+
+    Lanes are served in strict priority order, so interactive work goes
+    ahead of batch work and batch work only takes capacity nobody else is
+    waiting for. Inside a lane, tenants share capacity by start-time fair
+    queuing weighted by ``SCHEDULER_TENANT_WEIGHTS``: each request costs its
+    estimated tokens, so a tenant with thousands of queued sub-batches
+    cannot delay another tenant's few by more than about one request each.
+    """
+
+    def __init__(self):
+        self._waiters: List[Waiter] = []
+        self._virtual_time: Dict[int, float] = {}
+        self._last_finish: Dict[Tuple[int, str], float] = {}
+        self._seq = itertools.count()
+
+    def __len__(self) -> int:
+        return len(self._waiters)
+
+    def push(self, tenant: str, priority: str, cost: float) -> Waiter:
+        lane = lane_rank(priority)
+        weight = settings.SCHEDULER_TENANT_WEIGHTS.get(tenant, 1.0) or 1.0
+        start = max(
+            self._virtual_time.get(lane, 0.0), self._last_finish.get((lane, tenant), 0.0)
+        )
+        finish = start + max(cost, 1.0) / weight
+        self._last_finish[(lane, tenant)] = finish
+        waiter = Waiter(lane, tenant, start, finish, next(self._seq))
+        self._waiters.append(waiter)
+        return waiter
+
+    def head(self) -> Optional[Waiter]:
+        if not self._waiters:
+            return None
+        return min(self._waiters, key=lambda w: (w.lane, w.start, w.seq))
+
+    def pop(self, waiter: Waiter) -> None:
+        """Remove a waiter that was served and advance its lane's clock."""
+        self._virtual_time[waiter.lane] = max(
+            self._virtual_time.get(waiter.lane, 0.0), waiter.start
+        )
+        self.remove(waiter)
+
+    def remove(self, waiter: Waiter) -> None:
+        """Remove a served or abandoned waiter; an idle lane starts afresh."""
+        if waiter in self._waiters:
+            self._waiters.remove(waiter)
+        if not any(w.lane == waiter.lane for w in self._waiters):
+            self._virtual_time.pop(waiter.lane, None)
+            for key in [key for key in self._last_finish if key[0] == waiter.lane]:
+                del self._last_finish[key]
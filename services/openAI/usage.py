@@ -0,0 +1,251 @@
+import json
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, replace
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from sqlalchemy.orm import Session
+
+from config import settings
+from utils.tokens import count_tokens
+
+logger = logging.getLogger(__name__)
+
+USAGE_FIELDS = (
+    "calls",
+    "errors",
+    "cache_hits",
+    "prompt_tokens",
+    "cached_tokens",
+    "completion_tokens",
+    "cost_usd",
+    "latency_seconds",
+)
+
+
+@dataclass(frozen=True)
+class UsageScope:
+    job_type: str
+    job_id: int
+    stage: str
+
+
+# Set per job; asyncio tasks inherit it, so every LLM call in a job is tagged
+_usage_scope: ContextVar[Optional[UsageScope]] = ContextVar("llm_usage_scope", default=None)
+
+
+@contextmanager
+def usage_scope(job_type: str, job_id: int, stage: str):
+    """Attribute LLM calls made inside the block to ``job_type``/``job_id``."""
+    token = _usage_scope.set(UsageScope(job_type, job_id, stage))
+    try:
+        yield
+    finally:
+        _usage_scope.reset(token)
+
+
+# The runner job an LLM call is made in, so its live usage can be flushed
+_runner_job: ContextVar[Optional[int]] = ContextVar("llm_runner_job", default=None)
+
+
+@contextmanager
+def runner_job_scope(job_id: int):
+    """Tag usage recorded inside the block with the ``jobs`` row running it."""
+    token = _runner_job.set(job_id)
+    try:
+        yield
+    finally:
+        _runner_job.reset(token)
+
+
+def usage_key(job_type: str, job_id: int) -> str:
+    """Key of a job's live usage in a flushed ``jobs.usage`` snapshot."""
+    return f"{job_type}:{job_id}"
+
+
+@contextmanager
+def usage_stage(stage: str):
+    """Switch the stage of the current job's scope; a no-op outside a job."""
+    current = _usage_scope.get()
+    if current is None:
+        yield
+        return
+    token = _usage_scope.set(replace(current, stage=stage))
+    try:
+        yield
+    finally:
+        _usage_scope.reset(token)
+
+
+def estimate_cost(
+    model: str, prompt_tokens: int, cached_tokens: int, completion_tokens: int
+) -> float:
+    """USD cost from LLM_PRICING (per million tokens); 0 for unknown models."""
+    prices = settings.LLM_PRICING.get(model)
+    if not prices:
+        return 0.0
+    uncached = prompt_tokens - cached_tokens
+    return (
+        uncached * prices.get("input", 0.0)
+        + cached_tokens * prices.get("cached_input", prices.get("input", 0.0))
+        + completion_tokens * prices.get("output", 0.0)
+    ) / 1_000_000
+
+
+def empty_totals() -> Dict[str, float]:
+    return {field: 0 for field in USAGE_FIELDS}
+
+
+def merge_usage(*summaries: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Add up usage summaries, e.g. an interrupted run and its resumption."""
+    stages: Dict[str, Dict[str, float]] = {}
+    for summary in summaries:
+        for stage, totals in ((summary or {}).get("stages") or {}).items():
+            merged = stages.setdefault(stage, empty_totals())
+            for field in USAGE_FIELDS:
+                merged[field] += totals.get(field, 0)
+    return _summarize(stages)
+
+
+def _summarize(stages: Dict[str, Dict[str, float]]) -> Dict[str, Any]:
+    total = empty_totals()
+    for totals in stages.values():
+        for field in USAGE_FIELDS:
+            total[field] += totals[field]
+    for totals in [*stages.values(), total]:
+        totals["cost_usd"] = round(totals["cost_usd"], 6)
+        totals["latency_seconds"] = round(totals["latency_seconds"], 3)
+    return {"stages": stages, "total": total}
+
+
+def load_usage(value: Optional[str]) -> Optional[Dict[str, Any]]:
+    """Parse a stored ``usage`` column."""
+    if not value:
+        return None
+    try:
+        return json.loads(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class UsageTracker:
+    """In-memory token, cost and latency totals per job and stage.
+
+    Totals are kept until the job persists them with ``pop``; status
+    endpoints read ``summary`` while the job is still running. The job runner
+    flushes a ``snapshot`` of each running job to the jobs table, for status
+    endpoints served by other processes.
+    """
+
+    def __init__(self):
+        self._jobs: Dict[Tuple[str, int], Dict[str, Dict[str, float]]] = {}
+        # Usage keys recorded under each runner job
+        self._runner_jobs: Dict[int, Set[Tuple[str, int]]] = {}
+        self._lock = threading.Lock()
+
+    def record(
+        self,
+        model: str,
+        prompt_tokens: int = 0,
+        completion_tokens: int = 0,
+        cached_tokens: int = 0,
+        latency: float = 0.0,
+        cache_hit: bool = False,
+        error: bool = False,
+    ) -> None:
+        scope = _usage_scope.get()
+        if scope is None:
+            return
+        cost = estimate_cost(model, prompt_tokens, cached_tokens, completion_tokens)
+        runner_job = _runner_job.get()
+        with self._lock:
+            if runner_job is not None:
+                self._runner_jobs.setdefault(runner_job, set()).add(
+                    (scope.job_type, scope.job_id)
+                )
+            stages = self._jobs.setdefault((scope.job_type, scope.job_id), {})
+            totals = stages.setdefault(scope.stage, empty_totals())
+            totals["calls"] += 1
+            totals["errors"] += int(error)
+            totals["cache_hits"] += int(cache_hit)
+            totals["prompt_tokens"] += prompt_tokens
+            totals["cached_tokens"] += cached_tokens
+            totals["completion_tokens"] += completion_tokens
+            totals["cost_usd"] += cost
+            totals["latency_seconds"] += latency
+        logger.debug(
+            f"LLM usage [{scope.job_type} {scope.job_id} {scope.stage}] {model}: "
+            f"{prompt_tokens} prompt ({cached_tokens} cached), {completion_tokens} completion, "
+            f"{latency:.2f}s"
+        )
+
+    def summary(self, job_type: str, job_id: int) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            stages = self._jobs.get((job_type, job_id))
+            if stages is None:
+                return None
+            return _summarize({stage: dict(totals) for stage, totals in stages.items()})
+
+    def pop(self, job_type: str, job_id: int) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            stages = self._jobs.pop((job_type, job_id), None)
+        return _summarize(stages) if stages is not None else None
+
+    def snapshot(self, runner_job: int) -> Dict[str, Dict[str, Any]]:
+        """Unpersisted usage recorded under ``runner_job``, by ``usage_key``."""
+        with self._lock:
+            keys = [key for key in self._runner_jobs.get(runner_job, ()) if key in self._jobs]
+            return {
+                usage_key(*key): _summarize(
+                    {stage: dict(totals) for stage, totals in self._jobs[key].items()}
+                )
+                for key in keys
+            }
+
+    def end_runner_job(self, runner_job: int) -> None:
+        with self._lock:
+            self._runner_jobs.pop(runner_job, None)
+
+
+usage_tracker = UsageTracker()
+
+
+def record_embedding(
+    model: str, texts: List[str], started: float, error: bool = False
+) -> None:
+    """Record an embedding request against the current job."""
+    usage_tracker.record(
+        model,
+        prompt_tokens=0 if error else sum(count_tokens(text, model) for text in texts),
+        latency=time.perf_counter() - started,
+        error=error,
+    )
+
+
+def job_usage(
+    job_type: str, job_id: int, stored: Optional[str], db: Optional[Session] = None
+) -> Optional[Dict[str, Any]]:
+    """Usage for a status response: stored totals plus any still being collected.
+
+    Live totals come from this process or, given ``db``, from the snapshot a
+    runner in another process flushed to the jobs table.
+    """
+    live = usage_tracker.summary(job_type, job_id)
+    if live is None and db is not None:
+        from services.jobs import flushed_usage
+
+        live = flushed_usage(db, usage_key(job_type, job_id))
+    saved = load_usage(stored)
+    if live is None:
+        return saved
+    return merge_usage(saved, live)
+
+
+def usage_headers(usage: Optional[Dict[str, Any]]) -> Dict[str, str]:
+    """Response headers carrying usage when the status endpoint returns a file."""
+    if not usage:
+        return {}
+    return {"X-LLM-Usage": json.dumps(usage, separators=(",", ":"))}
@@ -1,42 +1,41 @@
 """Service layer for regulation analysis."""
 
-import os
-import uuid
-from typing import List, Dict, Optional
-import pandas as pd
-import pdfplumber
-from fastapi import HTTPException
+import hashlib
+from typing import Optional
 from sqlalchemy.orm import Session
-from langchain_openai import OpenAIEmbeddings
-from langchain_pinecone import PineconeVectorStore
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from openai import AsyncOpenAI
-from pydantic import SecretStr
-import re
-
 
 from models.regulation import Regulation
 from config import settings
-from vector_store.pinecone import embed_and_store_documents, chunk_text
+from vector_store.ingestion import DocumentIngester, IngestionProgress
+from services.openAI.clients import get_openai
 
 
 class RegulationService:
     """Service for handling regulation analysis operations."""
 
-    def __init__(self):
-        """Initialize service with necessary clients."""
-        self.openai_client = AsyncOpenAI(
-            api_key=settings.OPENAI_API_KEY.get_secret_value()
-        )
-        self.embeddings = OpenAIEmbeddings(
-            model="text-embedding-ada-002", api_key=settings.OPENAI_API_KEY
-        )
+    @property
+    def openai_client(self):
+        """The shared, pooled OpenAI client, created on first use."""
+        return get_openai()
+
+    def create_regulation(
+        self,
+        db: Session,
+        name: str,
+        file_type: str,
+        document_key: Optional[str] = None,
+    ) -> Regulation:
+        """Create a new regulation record.
 
-    def create_regulation(self, db: Session, name: str, file_type: str) -> Regulation:
-        """Create a new regulation record."""
+        Pass ``document_key`` to make the upload a new version of an earlier
+        regulation with the same key, replacing its vectors.
+        """
         namespace = settings.PINECONE_NAMESPACE
         regulation = Regulation(
-            name=name, file_type=file_type, pinecone_namespace=namespace
+            name=name,
+            file_type=file_type,
+            pinecone_namespace=namespace,
+            document_key=document_key,
         )
         db.add(regulation)
         db.commit()
@@ -54,29 +53,114 @@ class RegulationService:
             setattr(regulation, "embedding_status", status)
             db.commit()
 
-    def process_regulation(self, db: Session, file_path: str, regulation_id: int):
+    @staticmethod
+    def _file_hash(file_path: str) -> str:
+        digest = hashlib.sha256()
+        with open(file_path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+        return digest.hexdigest()
+
+    def previous_version(
+        self, db: Session, regulation: Regulation, document_key: str
+    ) -> Optional[Regulation]:
+        """The upload of ``document_key`` into the same namespace just before this one."""
+        return (
+            db.query(Regulation)
+            .filter(
+                Regulation.id < regulation.id,
+                Regulation.document_key == document_key,
+                Regulation.pinecone_namespace == regulation.pinecone_namespace,
+            )
+            .order_by(Regulation.id.desc())
+            .first()
+        )
+
+    def identical_upload(self, db: Session, regulation: Regulation) -> Optional[Regulation]:
+        """An earlier upload of the same file that is still its document's current version."""
+        candidates = (
+            db.query(Regulation)
+            .filter(
+                Regulation.id < regulation.id,
+                Regulation.content_hash == regulation.content_hash,
+                Regulation.pinecone_namespace == regulation.pinecone_namespace,
+                Regulation.embedding_status == "completed",
+                Regulation.document_key.isnot(None),
+            )
+            .order_by(Regulation.id.desc())
+        )
+        for candidate in candidates:
+            latest = self.previous_version(db, regulation, str(candidate.document_key))
+            if latest is not None and latest.id == candidate.id:
+                return candidate
+        return None
+
+    def record_ingestion_progress(
+        self, db: Session, regulation_id: int, progress: IngestionProgress
+    ):
+        """Store the running ingestion counters on the regulation."""
+        db.query(Regulation).filter(Regulation.id == regulation_id).update(
+            {
+                Regulation.pages_total: progress.pages_total,
+                Regulation.pages_done: progress.pages_done,
+                Regulation.chunks_total: progress.chunks_total,
+                Regulation.chunks_reused: progress.chunks_reused,
+                Regulation.vectors_upserted: progress.vectors_upserted,
+                Regulation.vectors_deleted: progress.vectors_deleted,
+            },
+            synchronize_session=False,
+        )
+        db.commit()
+
+    async def process_regulation(self, db: Session, file_path: str, regulation_id: int):
         try:
             regulation = self.get_regulation(db, regulation_id)
             if not regulation:
                 raise Exception("Regulation not found")
 
-            documents = []
-            with pdfplumber.open(file_path) as pdf:
-                for page_number, page in enumerate(pdf.pages, start=1):
-                    page_text = page.extract_text()
-                    if not page_text:
-                        continue
-                    chunks = chunk_text(page_text)
-                    for chunk_index, chunk in enumerate(chunks):
-                        chunk.metadata = {
-                            "page": page_number,
-                            "chunk_index": chunk_index,
-                            "regulation_id": regulation_id,
-                        }
-                        documents.append(chunk)
-
-            embed_and_store_documents(documents, str(regulation.pinecone_namespace))
+            regulation.content_hash = self._file_hash(file_path)
+            if regulation.document_key:
+                previous = self.previous_version(
+                    db, regulation, str(regulation.document_key)
+                )
+            else:
+                # A byte-identical file joins the earlier upload's document;
+                # anything else is a document of its own
+                previous = self.identical_upload(db, regulation)
+                regulation.document_key = (
+                    previous.document_key if previous else f"regulation-{regulation.id}"
+                )
+            db.commit()
+            if (
+                previous is not None
+                and previous.embedding_status == "completed"
+                and previous.content_hash == regulation.content_hash
+            ):
+                # The namespace already holds exactly this document
+                self.record_ingestion_progress(
+                    db,
+                    regulation_id,
+                    IngestionProgress(
+                        pages_total=previous.pages_total or 0,
+                        pages_done=previous.pages_total or 0,
+                        chunks_total=previous.chunks_total or 0,
+                        chunks_reused=previous.chunks_total or 0,
+                    ),
+                )
+                self.update_embedding_status(db, regulation_id, "completed")
+                return
+
+            ingester = DocumentIngester(
+                str(regulation.pinecone_namespace),
+                on_progress=lambda progress: self.record_ingestion_progress(
+                    db, regulation_id, progress
+                ),
+            )
+            await ingester.ingest_pdf(
+                file_path, str(regulation.document_key), {"regulation_id": regulation_id}
+            )
             self.update_embedding_status(db, regulation_id, "completed")
         except Exception as e:
+            db.rollback()
             self.update_embedding_status(db, regulation_id, "failed")
             raise Exception(str(e))
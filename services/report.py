@@ -1,4 +1,5 @@
 import os
+import json
 import uuid
 import logging
 from sqlalchemy.orm import Session
@@ -9,7 +10,9 @@ from db import SessionLocal
 from typing import Optional, Dict, Any
 import asyncio
 import pandas as pd
-from services.openAI.chat import OpenAIClient
+from services.openAI.clients import get_llm_client
+from services.openAI.usage import job_usage, usage_scope, usage_tracker
+from enums.usage import UsageJobTypeEnum, UsageStageEnum
 import tiktoken
 
 logger = logging.getLogger(__name__)
@@ -21,8 +24,6 @@ REPORT_EXCEL_MEDIA_TYPE = "application/vnd.openxmlformats-officedocument.spreads
 os.makedirs(TEMP_UPLOAD_DIR, exist_ok=True)
 os.makedirs(REPORTS_DIR, exist_ok=True)
 
-openai_client = OpenAIClient(model="gpt-4o-mini")
-
 def chunk_text_by_tokens(text, model, max_tokens):
     enc = tiktoken.encoding_for_model(model)
     tokens = enc.encode(text)
@@ -90,6 +91,15 @@ class ReportService:
             logger.error(f"Error updating report {report_id} status: {str(e)}")
             raise
 
+    def record_llm_usage(self, db: Session, report_id: int):
+        """Persist the report job's token, cost and latency totals."""
+        usage = usage_tracker.pop(UsageJobTypeEnum.REPORT.value, report_id)
+        report = db.query(Report).filter(Report.id == report_id).first()
+        if report and usage:
+            setattr(report, "usage", json.dumps(usage))
+            db.commit()
+            logger.info(f"Report {report_id} LLM usage: {usage['total']}")
+
     async def generate_and_save_report(
         self,
         report_id: int,
@@ -98,10 +108,32 @@ class ReportService:
         standard_version: str,
         standard_year: str,
         organization: str,
+    ):
+        with usage_scope(
+            UsageJobTypeEnum.REPORT.value, report_id, UsageStageEnum.REPORT.value
+        ):
+            await self._generate_and_save_report(
+                report_id,
+                temp_file_path,
+                standard_name,
+                standard_version,
+                standard_year,
+                organization,
+            )
+
+    async def _generate_and_save_report(
+        self,
+        report_id: int,
+        temp_file_path: str,
+        standard_name: str,
+        standard_version: str,
+        standard_year: str,
+        organization: str,
     ):
         db = SessionLocal()
         try:
             self.update_report_status(db, report_id, ReportStatus.IN_PROGRESS.value)
+            openai_client = get_llm_client("gpt-4o-mini")
             logger.info(f"Starting report generation for report {report_id} from file: {temp_file_path}")
             # --- LLM/Report Generation Logic ---
             df = pd.read_excel(temp_file_path)
@@ -165,6 +197,7 @@ class ReportService:
             self.update_report_status(db, report_id, ReportStatus.ERROR.value)
         finally:
             await self._cleanup_temp_file(temp_file_path)
+            self.record_llm_usage(db, report_id)
             db.close()
 
     async def _cleanup_temp_file(self, file_path: str):
@@ -189,6 +222,7 @@ class ReportService:
             "report_id": getattr(report, 'id'),
             "status": status_value,
             "created_at": getattr(report, 'created_at').isoformat() if hasattr(report, 'created_at') and getattr(report, 'created_at') else None,
+            "usage": job_usage(UsageJobTypeEnum.REPORT.value, report_id, getattr(report, 'usage', None), db),
         }
         if status_value == ReportStatus.COMPLETED.value:
             if abs_file_path and os.path.exists(abs_file_path):
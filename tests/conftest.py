@@ -0,0 +1,53 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+# Settings and the engine are created on import, so configure them first
+_db_dir = tempfile.mkdtemp(prefix="tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_db_dir, 'test.db')}"
+os.environ.setdefault("OPENAI_API_KEY", "test")
+os.environ.setdefault("PINECONE_API_KEY", "test")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import tiktoken  # noqa: E402
+
+from db import Base, SessionLocal, engine  # noqa: E402
+
+# Every table create_all should know about
+import models.analysis  # noqa: E402,F401
+import models.analysis_partition  # noqa: E402,F401
+import models.analysis_result  # noqa: E402,F401
+import models.indicator  # noqa: E402,F401
+import models.indicator_status  # noqa: E402,F401
+import models.job  # noqa: E402,F401
+import models.rate_budget  # noqa: E402,F401
+import models.regulation  # noqa: E402,F401
+import models.report  # noqa: E402,F401
+import models.user  # noqa: E402,F401
+
+
+@pytest.fixture
+def db():
+    Base.metadata.create_all(bind=engine)
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+        Base.metadata.drop_all(bind=engine)
+
+
+class WhitespaceEncoding:
+    """One token per word; tiktoken downloads its real encodings on first use."""
+
+    def encode(self, text, *args, **kwargs):
+        return text.split()
+
+
+@pytest.fixture
+def whitespace_tokens(monkeypatch):
+    monkeypatch.setattr(tiktoken, "encoding_for_model", lambda model: WhitespaceEncoding())
+    monkeypatch.setattr(tiktoken, "get_encoding", lambda name: WhitespaceEncoding())
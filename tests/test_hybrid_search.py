@@ -0,0 +1,119 @@
+import pytest
+
+import vector_store.pinecone_store as pinecone_store
+from config import settings
+from vector_store.backends import VectorBackend, VectorMatch
+from vector_store.lexical_index import (
+    LexicalIndex,
+    fuse_rankings,
+    get_lexical_index,
+    lexical_terms,
+)
+
+CHUNKS = [
+    ("doc#0", "Operators shall exercise due care with respect to relevant products."),
+    ("doc#1", "Operators shall submit a due diligence statement under Article 9(1)(d)."),
+    ("doc#2", "Article 12 lists obligations; Article 9 paragraph 2 covers statements."),
+    ("doc#3", "Traders placing products on the market keep records for five years."),
+]
+QUESTION = "Is a due diligence statement required under Article 9(1)(d)?"
+
+
+def matches(*ids):
+    return [{"id": vector_id, "text": vector_id} for vector_id in ids]
+
+
+def test_terms_keep_references_and_add_bigrams():
+    terms = lexical_terms("The due diligence statement of Article 9(1)(d)")
+    assert "9_1_d" in terms
+    assert "the" not in terms and "of" not in terms
+    assert "due_diligence" in terms and "diligence_statement" in terms
+
+
+def test_bm25_ranks_the_exact_phrase_and_reference_first(tmp_path):
+    index = LexicalIndex(str(tmp_path / "ns.sqlite3"))
+    try:
+        index.replace_document("doc", CHUNKS)
+        assert index.search(QUESTION, 3)[0]["id"] == "doc#1"
+        assert index.search("the of and", 3) == []
+
+        # Re-ingesting a document replaces its chunks
+        index.replace_document("doc", CHUNKS[:1])
+        assert [m["id"] for m in index.search(QUESTION, 3)] == ["doc#0"]
+    finally:
+        index.close()
+
+
+def test_rrf_prefers_ids_ranked_well_by_both_lists():
+    vector = matches("a", "b", "c", "d")
+    lexical = matches("c", "e", "b")
+
+    assert [m["id"] for m in fuse_rankings([(vector, 1.0), (lexical, 1.0)], 3)] == [
+        "c",
+        "b",
+        "a",
+    ]
+    # A zero weight leaves the vector ranking as it was
+    assert fuse_rankings([(vector, 1.0), (lexical, 0.0)], 4) == vector
+
+
+class FakeEmbedder:
+    async def aembed_documents(self, texts, chunk_size=None):
+        return [[1.0, 0.0] for _ in texts]
+
+
+class FakeVectorBackend(VectorBackend):
+    """Returns the same nearest chunks for every query, none of them exact."""
+
+    def __init__(self, ids):
+        self.ids = ids
+        self.top_k = None
+
+    def namespace_exists(self, namespace):
+        return True
+
+    async def upsert(self, namespace, vectors):
+        pass
+
+    async def query(self, namespace, vectors, top_k):
+        self.top_k = top_k
+        texts = dict(CHUNKS)
+        return [
+            [
+                VectorMatch(id=i, score=1.0, metadata={"text": texts[i]})
+                for i in self.ids[:top_k]
+            ]
+            for _ in vectors
+        ]
+
+    async def list_ids(self, namespace, prefix):
+        return set()
+
+    async def delete(self, namespace, ids):
+        pass
+
+
+@pytest.fixture
+def searcher(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "LEXICAL_INDEX_DIR", str(tmp_path))
+    monkeypatch.setattr(settings, "RAG_HYBRID_CANDIDATES", 4)
+    monkeypatch.setattr(pinecone_store, "get_embedder", FakeEmbedder)
+    index = get_lexical_index("ns", create=True)
+    index.replace_document("doc", CHUNKS)
+    backend = FakeVectorBackend(["doc#0", "doc#3", "doc#2", "doc#1"])
+    yield pinecone_store.RAGSearcher(k=3, namespace="ns", backend=backend)
+    index.close()
+
+
+@pytest.mark.asyncio
+async def test_hybrid_search_lifts_the_lexical_match(searcher, monkeypatch):
+    monkeypatch.setattr(settings, "RAG_HYBRID_ENABLED", False)
+    [vector_only] = await searcher.batch_search_matches([QUESTION])
+    assert [m["id"] for m in vector_only] == ["doc#0", "doc#3", "doc#2"]
+
+    monkeypatch.setattr(settings, "RAG_HYBRID_ENABLED", True)
+    [hybrid] = await searcher.batch_search_matches([QUESTION])
+    assert searcher.backend.top_k == 4
+    # The exact reference, last by vector, displaces the chunk only the vectors liked
+    assert {m["id"] for m in hybrid} == {"doc#0", "doc#1", "doc#2"}
+    assert all(m["text"] == dict(CHUNKS)[m["id"]] for m in hybrid)
@@ -0,0 +1,175 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from config import settings
+from enums.job import JobStatusEnum
+from models.job import Job
+from services.jobs import JobRunner, current_attempt
+
+
+@pytest.fixture(autouse=True)
+def fast_runner(monkeypatch):
+    monkeypatch.setattr(settings, "JOB_POLL_SECONDS", 0.05)
+    monkeypatch.setattr(settings, "JOB_HEARTBEAT_SECONDS", 0.1)
+    monkeypatch.setattr(settings, "JOB_LEASE_SECONDS", 0.5)
+    monkeypatch.setattr(settings, "JOB_RETRY_BACKOFF_SECONDS", 0.0)
+
+
+@pytest.fixture
+def runners():
+    started = []
+
+    def make(name, **handlers):
+        runner = JobRunner(worker_id=name)
+        for job_type, (func, kwargs) in handlers.items():
+            runner.register(job_type, func, **kwargs)
+        runner.start()
+        started.append(runner)
+        return runner
+
+    yield make
+    for runner in started:
+        runner.stop(timeout=5)
+
+
+def wait_for(predicate, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return
+        time.sleep(0.05)
+    raise AssertionError("condition not met in time")
+
+
+def jobs(db):
+    db.expire_all()
+    return db.query(Job).order_by(Job.id).all()
+
+
+def all_settled(db):
+    return all(
+        job.status in (JobStatusEnum.COMPLETED.value, JobStatusEnum.FAILED.value)
+        for job in jobs(db)
+    )
+
+
+def test_two_runners_claim_each_job_once(db, runners):
+    runs = []
+    lock = threading.Lock()
+
+    def handler(name):
+        async def work(db, key):
+            await asyncio.sleep(0.02)
+            with lock:
+                runs.append((key, name))
+
+        return work, {"concurrency": 4}
+
+    first = runners("first", work=handler("first"))
+    runners("second", work=handler("second"))
+    for key in range(40):
+        first.enqueue(db, "work", {"key": key})
+
+    wait_for(lambda: all_settled(db))
+    assert sorted(key for key, _ in runs) == list(range(40))
+    assert {name for _, name in runs} == {"first", "second"}
+    assert all(
+        job.status == JobStatusEnum.COMPLETED.value and job.attempts == 1
+        for job in jobs(db)
+    )
+
+
+def test_expired_lease_is_requeued_and_old_copy_cancelled(db, runners):
+    events = []
+    started = threading.Event()
+
+    def stalled(name):
+        async def work(db):
+            events.append((name, current_attempt().attempt))
+            if current_attempt().attempt == 1:
+                started.set()
+                try:
+                    await asyncio.sleep(30)
+                except asyncio.CancelledError:
+                    events.append((name, "cancelled"))
+                    raise
+
+        return work, {"max_attempts": 3}
+
+    first = runners("first", slow=stalled("first"))
+    first.enqueue(db, "slow", {})
+    assert started.wait(5)
+
+    # The first worker stops renewing its lease, e.g. during a network partition
+    partitioned = threading.Event()
+    partitioned.set()
+    renew = first._renew_leases
+    first._renew_leases = lambda: None if partitioned.is_set() else renew()
+    runners("second", slow=stalled("second"))
+    wait_for(lambda: any(event[1] == 2 for event in events))
+    partitioned.clear()
+
+    wait_for(lambda: all_settled(db) and ("first", "cancelled") in events)
+    [job] = jobs(db)
+    assert job.status == JobStatusEnum.COMPLETED.value
+    assert job.attempts == 2
+    assert "expired" in job.last_error
+    assert [event for event in events if event[1] != "cancelled"] == [
+        ("first", 1),
+        (job.worker_id, 2),
+    ]
+
+
+def test_expired_lease_reclaimed_by_same_worker_cancels_old_copy(db, runners):
+    events = []
+
+    async def work(db):
+        attempt = current_attempt().attempt
+        events.append(attempt)
+        if attempt == 1:
+            try:
+                await asyncio.sleep(30)
+            except asyncio.CancelledError:
+                events.append("cancelled")
+                raise
+
+    runner = runners("only", slow=(work, {"concurrency": 2, "max_attempts": 3}))
+    runner._renew_leases = lambda: None
+    runner.enqueue(db, "slow", {})
+
+    wait_for(lambda: all_settled(db) and "cancelled" in events)
+    [job] = jobs(db)
+    assert job.status == JobStatusEnum.COMPLETED.value
+    assert job.attempts == 2
+    assert not runner._running
+
+
+def test_clean_shutdown_does_not_consume_an_attempt(db, runners):
+    started = threading.Event()
+
+    async def blocking(db):
+        started.set()
+        await asyncio.sleep(30)
+
+    first = runners("first", once=(blocking, {"max_attempts": 1}))
+    first.enqueue(db, "once", {})
+    assert started.wait(5)
+    first.stop(timeout=5)
+
+    [job] = jobs(db)
+    assert job.status == JobStatusEnum.QUEUED.value
+    assert job.attempts == 0
+    assert job.last_error == "Interrupted by worker shutdown"
+
+    async def quick(db):
+        assert current_attempt().final
+
+    runners("second", once=(quick, {"max_attempts": 1}))
+    wait_for(lambda: all_settled(db))
+    [job] = jobs(db)
+    assert job.status == JobStatusEnum.COMPLETED.value
+    assert job.attempts == 1
+    assert job.worker_id == "second"
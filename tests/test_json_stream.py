@@ -0,0 +1,110 @@
+import json
+
+import pytest
+
+from config import settings
+from services.openAI.cache import ResponseCache
+from services.openAI.chat import OpenAIClient
+from services.openAI.errors import LLMServerError
+from utils.json_stream import JSONArrayStreamParser, salvage_json_array
+
+ROWS = [{"Indicator ID": f"I{i}", "STATEMENT": "a [b] {c}"} for i in range(5)]
+
+
+def chunks(text, size):
+    return [text[i : i + size] for i in range(0, len(text), size)]
+
+
+@pytest.mark.parametrize("size", [1, 3, 7, 1000])
+def test_parser_yields_each_object_once_whatever_the_chunking(size):
+    parser = JSONArrayStreamParser()
+    seen = [obj for chunk in chunks(json.dumps(ROWS), size) for obj in parser.feed(chunk)]
+    assert seen == ROWS
+    assert parser.closed and not parser.truncated
+
+
+def test_parser_skips_prose_and_brackets_before_the_array():
+    parser = JSONArrayStreamParser()
+    parser.feed("Here are [the] results:\n```json\n" + json.dumps(ROWS[:2]) + "\n```")
+    assert parser.objects == ROWS[:2]
+    assert parser.prefix_chars > 0
+
+
+def test_malformed_or_truncated_objects_keep_their_neighbours():
+    text = '[{"Indicator ID": "a",}, {"Indicator ID": b}, {"Indicator ID": "c"}, {"Indic'
+    assert salvage_json_array(text) == [{"Indicator ID": "a"}, {"Indicator ID": "c"}]
+    parser = JSONArrayStreamParser()
+    parser.feed(text)
+    assert parser.truncated and len(parser.errors) == 1
+
+
+class StreamingClient(OpenAIClient):
+    """Streams scripted deltas and records how many the caller consumed."""
+
+    def __init__(self, deltas, cache):
+        super().__init__(api_key="test", cache=cache)
+        self.deltas = deltas
+        self.sent = 0
+        self.closed = False
+        self.streams = 0
+
+    async def chat_stream(self, prompt, temperature=None, max_tokens=None):
+        self.streams += 1
+        try:
+            for delta in self.deltas:
+                if isinstance(delta, Exception):
+                    raise delta
+                self.sent += 1
+                yield delta
+        finally:
+            self.closed = True
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return ResponseCache(str(tmp_path / "responses.db"))
+
+
+@pytest.mark.asyncio
+async def test_complete_array_is_streamed_and_cached(cache):
+    client = StreamingClient(chunks(json.dumps(ROWS), 4), cache)
+    received = []
+
+    objects = await client.chat_json_array("p", max_objects=5, on_object=received.append)
+    assert objects == received == ROWS
+
+    again = await client.chat_json_array("p", max_objects=5)
+    assert again == ROWS and client.streams == 1
+
+
+@pytest.mark.asyncio
+async def test_prose_response_is_aborted_early(cache, monkeypatch):
+    monkeypatch.setattr(settings, "LLM_STREAM_MAX_PREFIX_CHARS", 32)
+    client = StreamingClient(["I am sorry, but I cannot "] * 100, cache)
+
+    assert await client.chat_json_array("p", max_objects=5) == []
+    assert client.closed and client.sent < 5
+    assert cache.get(ResponseCache.make_key(client.model, "p", None, None)) is None
+
+
+@pytest.mark.asyncio
+async def test_too_many_objects_abort_and_keep_the_expected_ones(cache):
+    text = json.dumps(ROWS * 20)
+    client = StreamingClient(chunks(text, 16), cache)
+
+    assert await client.chat_json_array("p", max_objects=5) == ROWS
+    assert client.closed and client.sent < len(chunks(text, 16)) / 2
+
+
+@pytest.mark.asyncio
+async def test_dropped_stream_keeps_objects_already_received(cache):
+    head = json.dumps(ROWS)[:-60]
+    client = StreamingClient([head, LLMServerError("connection reset")], cache)
+    received = []
+
+    objects = await client.chat_json_array("p", on_object=received.append)
+    assert objects == received and 0 < len(objects) < len(ROWS)
+
+    failing = StreamingClient([LLMServerError("connection reset")], cache)
+    with pytest.raises(LLMServerError):
+        await failing.chat_json_array("q")
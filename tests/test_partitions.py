@@ -0,0 +1,134 @@
+import json
+
+import pytest
+
+import controllers.analysis as analysis_controller
+from config import settings
+from enums.analysis import AnalysisPartitionStatusEnum
+from enums.job import JobPriorityEnum, JobStatusEnum, JobTypeEnum
+from models.analysis import Analysis
+from models.analysis_result import AnalysisResult
+from models.indicator import Indicator
+from models.job import Job
+from services.analysis import AnalysisService
+from services.openAI.scheduler import scheduling_scope
+
+COMPLETED = AnalysisPartitionStatusEnum.COMPLETED.value
+
+
+@pytest.fixture
+def service():
+    return AnalysisService()
+
+
+@pytest.fixture
+def analysis(db, monkeypatch):
+    monkeypatch.setattr(settings, "ANALYSIS_PARTITION_SIZE", 4)
+    db.add_all(
+        Indicator(indicator_id=f"I{i}", indicator=f"indicator {i}", process_id="p")
+        for i in range(10)
+    )
+    row = Analysis(process_id="p", namespace="ns", vss_paths="[]")
+    db.add(row)
+    db.commit()
+    return int(row.id)
+
+
+def complete(service, db, partitions):
+    for partition in partitions:
+        service.update_partition_status(db, int(partition.id), COMPLETED)
+
+
+def test_plan_splits_indicators_into_contiguous_ranges_once(service, db, analysis):
+    partitions = service.plan_partitions(db, analysis, "p")
+
+    assert [p.indicator_count for p in partitions] == [4, 4, 2]
+    ids = [i for (i,) in db.query(Indicator.id).order_by(Indicator.id)]
+    assert [(p.first_indicator_id, p.last_indicator_id) for p in partitions] == [
+        (ids[0], ids[3]),
+        (ids[4], ids[7]),
+        (ids[8], ids[9]),
+    ]
+    assert db.get(Analysis, analysis).partition_count == 3
+    # A retried or resumed analysis keeps its plan
+    assert [p.id for p in service.plan_partitions(db, analysis, "p")] == [
+        p.id for p in partitions
+    ]
+
+
+def test_small_analysis_is_not_partitioned(service, db, analysis, monkeypatch):
+    monkeypatch.setattr(settings, "ANALYSIS_PARTITION_SIZE", 10)
+    assert service.plan_partitions(db, analysis, "p") == []
+
+
+def test_pending_skips_completed_and_active_partitions(service, db, analysis):
+    first, second, third = service.plan_partitions(db, analysis, "p")
+    complete(service, db, [first])
+    job = Job(job_type=JobTypeEnum.ANALYSIS_PARTITION.value, status="running", payload="{}")
+    db.add(job)
+    db.commit()
+    service.set_partition_job(db, int(second.id), int(job.id))
+
+    assert [p.id for p in service.pending_partitions(db, analysis)] == [third.id]
+    assert service.active_job(db, analysis, [JobTypeEnum.ANALYSIS_PARTITION.value]).id == job.id
+
+
+def test_merge_is_claimed_once_after_every_partition(service, db, analysis):
+    partitions = service.plan_partitions(db, analysis, "p")
+    complete(service, db, partitions[:-1])
+    assert not service.claim_merge(db, analysis)
+
+    complete(service, db, partitions[-1:])
+    assert service.claim_merge(db, analysis)
+    assert not service.claim_merge(db, analysis)
+    # Resuming after a failed merge queues it again
+    assert service.claim_merge(db, analysis, force=True)
+
+
+def test_merge_writes_results_in_indicator_order(service, db, analysis, monkeypatch):
+    indicators = db.query(Indicator).order_by(Indicator.id).all()
+    # Partitions finish and save their results in any order
+    for indicator in reversed(indicators):
+        db.add(
+            AnalysisResult(
+                analysis_id=analysis,
+                indicator_id=indicator.indicator_id,
+                result=json.dumps({"Indicator ID": indicator.indicator_id}),
+            )
+        )
+    db.commit()
+    written = []
+    monkeypatch.setattr(
+        service, "write_results_file", lambda rows: written.extend(rows) or "out.xlsx"
+    )
+
+    service.merge_partitions(db, analysis, "p")
+
+    assert [row["Indicator ID"] for row in written] == [i.indicator_id for i in indicators]
+    assert db.get(Analysis, analysis).output_file == "out.xlsx"
+
+
+def test_partition_and_merge_jobs_keep_the_analysis_lane(db, analysis):
+    service = analysis_controller.analysis_service
+    partitions = service.plan_partitions(db, analysis, "p")
+    payload = {"vss_paths": [], "process_id": "p", "namespace": "ns"}
+
+    with scheduling_scope("alice", JobPriorityEnum.INTERACTIVE.value):
+        analysis_controller.enqueue_partition_jobs(db, analysis, payload)
+    queued = db.query(Job).order_by(Job.id).all()
+    assert [(j.job_type, j.priority, j.owner) for j in queued] == [
+        (JobTypeEnum.ANALYSIS_PARTITION.value, JobPriorityEnum.INTERACTIVE.value, "alice")
+    ] * 3
+    # Nothing is queued twice while the partition jobs are active
+    with scheduling_scope("alice", JobPriorityEnum.INTERACTIVE.value):
+        analysis_controller.enqueue_partition_jobs(db, analysis, payload)
+    assert db.query(Job).count() == 3
+
+    complete(service, db, partitions)
+    db.query(Job).update({Job.status: JobStatusEnum.COMPLETED.value})
+    db.commit()
+    with scheduling_scope("alice", JobPriorityEnum.INTERACTIVE.value):
+        analysis_controller.enqueue_partition_jobs(db, analysis, payload)
+    merge = db.query(Job).order_by(Job.id.desc()).first()
+    assert merge.job_type == JobTypeEnum.ANALYSIS_MERGE.value
+    assert merge.priority == JobPriorityEnum.INTERACTIVE.value
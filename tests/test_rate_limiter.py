@@ -0,0 +1,151 @@
+import asyncio
+import json
+import time
+
+import httpx
+import pytest
+from openai import RateLimitError
+
+from config import settings
+from services.openAI.clients import EMBEDDING_MODEL, llm_clients
+from services.openAI.rate_limiter import (
+    RateLimiter,
+    TokenBucket,
+    get_rate_limiter,
+    parse_reset,
+)
+from vector_store.pinecone import CachedEmbeddings
+
+
+@pytest.fixture(autouse=True)
+def local_limits(monkeypatch, whitespace_tokens):
+    monkeypatch.setattr(settings, "LLM_SHARED_RATE_LIMIT", False)
+    monkeypatch.setattr(settings, "LLM_MODEL_CONFIG", {})
+
+
+def test_parse_reset_durations():
+    assert parse_reset("6m0s") == 360
+    assert parse_reset("1.5s") == 1.5
+    assert parse_reset("20ms") == pytest.approx(0.02)
+    assert parse_reset(None) == 0
+
+
+def test_token_bucket_waits_for_refill_and_syncs_down():
+    bucket = TokenBucket(600)
+    assert bucket.wait_time(600) == 0
+    bucket.take(600)
+    # 600 per minute refills 10 per second
+    assert bucket.wait_time(100) == pytest.approx(10, abs=0.1)
+    bucket.sync(1e9)
+    assert bucket.level < 600
+    # More than the whole bucket is admitted once it is full
+    assert TokenBucket(10).wait_time(50) == 0
+
+
+def test_concurrency_is_additive_increase_multiplicative_decrease():
+    limiter = RateLimiter(rpm=100, tpm=10_000, max_concurrency=10, initial_concurrency=8)
+    limiter.record_success()
+    limiter.record_success()
+    assert limiter.concurrency == 10
+    limiter.record_rate_limited({"x-ratelimit-reset-tokens": "5s"})
+    assert limiter.concurrency == 5
+    assert limiter.paused_until - time.monotonic() == pytest.approx(5, abs=0.5)
+    limiter.record_success({"x-ratelimit-remaining-requests": "3"})
+    assert limiter.requests.level <= 3
+
+
+@pytest.mark.asyncio
+async def test_slots_never_exceed_concurrency():
+    limiter = RateLimiter(rpm=10_000, tpm=1_000_000, max_concurrency=2, initial_concurrency=2)
+    peak = in_flight = 0
+
+    async def call():
+        nonlocal peak, in_flight
+        async with limiter.slot(10):
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+
+    await asyncio.gather(*(call() for _ in range(10)))
+    assert peak == 2
+    assert limiter.in_flight == 0
+
+
+@pytest.mark.asyncio
+async def test_limiters_are_shared_within_a_loop_and_not_across_loops():
+    limiter = get_rate_limiter("gpt-4o-mini")
+    assert get_rate_limiter("gpt-4o-mini") is limiter
+
+    async def other_loop():
+        return get_rate_limiter("gpt-4o-mini")
+
+    elsewhere = await asyncio.to_thread(asyncio.run, other_loop())
+    assert elsewhere is not limiter
+
+
+@pytest.fixture
+def embedding_api(monkeypatch):
+    """Serves embedding requests through the registry's real HTTP client hooks."""
+    replies = {"status": 200}
+    build = llm_clients._build_http_client
+
+    def handler(request):
+        if replies["status"] == 429:
+            return httpx.Response(
+                429,
+                headers={"x-ratelimit-reset-requests": "3s"},
+                json={"error": {"message": "slow down", "type": "rate_limit"}},
+            )
+        count = len(json.loads(request.content)["input"])
+        return httpx.Response(
+            200,
+            headers={
+                "x-ratelimit-remaining-requests": "7",
+                "x-ratelimit-remaining-tokens": "1234",
+            },
+            json={
+                "object": "list",
+                "model": EMBEDDING_MODEL,
+                "data": [
+                    {"object": "embedding", "index": i, "embedding": [0.1, 0.2]}
+                    for i in range(count)
+                ],
+                "usage": {"prompt_tokens": count, "total_tokens": count},
+            },
+        )
+
+    def mocked():
+        real = build()
+        return httpx.AsyncClient(
+            transport=httpx.MockTransport(handler), event_hooks=real.event_hooks
+        )
+
+    monkeypatch.setattr(llm_clients, "_build_http_client", mocked)
+    return replies
+
+
+@pytest.mark.asyncio
+async def test_embedding_calls_share_the_model_limiter(embedding_api):
+    embedder = llm_clients.embeddings()
+    embedder.max_retries = 0
+    embedder.check_embedding_ctx_length = False
+    embeddings = CachedEmbeddings(EMBEDDING_MODEL)
+    try:
+        vectors = await embeddings.aembed_documents(["a b", "c"])
+        assert vectors == [pytest.approx([0.1, 0.2])] * 2
+        limiter = get_rate_limiter(EMBEDDING_MODEL)
+        assert limiter.requests.capacity == settings.OPENAI_EMBEDDING_RPM_LIMIT
+        assert limiter.tokens.capacity == settings.OPENAI_EMBEDDING_TPM_LIMIT
+        # The response headers synced the limiter
+        assert limiter.requests.level <= 7
+        assert limiter.tokens.level <= 1234
+
+        concurrency = limiter.concurrency
+        embedding_api["status"] = 429
+        with pytest.raises(RateLimitError):
+            await embeddings.aembed_documents(["d"])
+        assert limiter.concurrency == max(1, concurrency // 2)
+        assert limiter.paused_until - time.monotonic() == pytest.approx(3, abs=0.5)
+    finally:
+        await llm_clients.aclose()
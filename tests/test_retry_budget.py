@@ -0,0 +1,83 @@
+import json
+
+import pytest
+
+from config import settings
+from services.analysis import CallBudget, process_gpt_batches
+from services.openAI.batch import CRITERIA_ID
+
+
+class FakeClient:
+    """Answers each prompt through ``answer(ids)`` and records the IDs asked for."""
+
+    model = "gpt-4o-mini"
+
+    def __init__(self, answer):
+        self.answer = answer
+        self.calls = []
+
+    async def chat(self, prompt, **kwargs):
+        ids = [
+            match.group(1)
+            for match in map(CRITERIA_ID.match, prompt.splitlines())
+            if match
+        ]
+        self.calls.append(ids)
+        return json.dumps([{"Indicator ID": i} for i in self.answer(ids)])
+
+
+def indicators(*ids):
+    return [{"indicator_id": i, "question": "q", "evidence": ["e"]} for i in ids]
+
+
+async def run(client, sub_batches):
+    async def source():
+        for sub_batch in sub_batches:
+            yield sub_batch
+
+    results = await process_gpt_batches(source(), "definition", ["vss"], client)
+    return [row["Indicator ID"] for row in results]
+
+
+@pytest.fixture(autouse=True)
+def offline(monkeypatch, whitespace_tokens):
+    monkeypatch.setattr(settings, "LLM_STREAMING", False)
+    monkeypatch.setattr(settings, "ANALYSIS_LLM_WORKERS", 2)
+
+
+def test_call_budget_take_and_refund():
+    budget = CallBudget(2)
+    assert budget.take() and budget.take()
+    assert budget.exhausted and not budget.take()
+    budget.refund()
+    assert not budget.exhausted and budget.used == 1
+
+
+@pytest.mark.asyncio
+async def test_retries_stop_at_the_call_budget(monkeypatch):
+    monkeypatch.setattr(settings, "ANALYSIS_RETRY_MIN_CALLS", 3)
+    monkeypatch.setattr(settings, "ANALYSIS_RETRY_BUDGET_RATIO", 0.5)
+    client = FakeClient(lambda ids: [])
+    sub_batches = [indicators(f"A{i}", f"B{i}") for i in range(4)]
+
+    assert await run(client, sub_batches) == []
+    # One call per first-pass batch, then max(3, 4 * 0.5) retry calls
+    assert len(client.calls) == 4 + 3
+
+
+@pytest.mark.asyncio
+async def test_partial_batch_retries_only_missing_ids():
+    client = FakeClient(lambda ids: ids[:1])
+
+    assert await run(client, [indicators("a", "b", "c")]) == ["a", "b", "c"]
+    assert client.calls == [["a", "b", "c"], ["b", "c"], ["c"]]
+
+
+@pytest.mark.asyncio
+async def test_empty_batch_is_bisected():
+    client = FakeClient(lambda ids: ids if len(ids) == 1 else [])
+
+    assert await run(client, [indicators("a", "b", "c", "d")]) == ["a", "b", "c", "d"]
+    assert client.calls[0] == ["a", "b", "c", "d"]
+    assert sorted(client.calls[1:3]) == [["a", "b"], ["c", "d"]]
+    assert sorted(client.calls[3:]) == [["a"], ["b"], ["c"], ["d"]]
@@ -0,0 +1,140 @@
+import logging
+from collections import Counter
+from typing import Any, Dict, List, Tuple
+
+from utils.prompts.analysis import format_batch_indicator
+from utils.tokens import count_tokens
+
+logger = logging.getLogger(__name__)
+
+
+def indicator_cost(item: Dict[str, Any]) -> int:
+    """Prompt tokens of one indicator block (question plus regulation evidence)."""
+    return count_tokens(format_batch_indicator(1, item))
+
+
+def pack_batches(
+    items: List[Dict[str, Any]],
+    input_budget: int,
+    output_budget: int,
+    output_tokens_per_item: int,
+    max_items: int,
+) -> List[List[Dict[str, Any]]]:
+    """Pack indicators into batches that fit the input and output token budgets.
+
+    Each indicator costs the tokens of its prompt block (question plus
+    regulation evidence) and ``output_tokens_per_item`` expected output
+    tokens. Batches are filled first-fit by decreasing cost, and returned
+    largest first so the longest calls start earliest. An indicator larger
+    than the whole budget gets a batch of its own.
+    """
+    costs = [indicator_cost(item) for item in items]
+    order = sorted(range(len(items)), key=lambda i: costs[i], reverse=True)
+
+    bins: List[List[int]] = []
+    bin_tokens: List[int] = []
+    for i in order:
+        for b, members in enumerate(bins):
+            if (
+                len(members) < max_items
+                and bin_tokens[b] + costs[i] <= input_budget
+                and (len(members) + 1) * output_tokens_per_item <= output_budget
+            ):
+                members.append(i)
+                bin_tokens[b] += costs[i]
+                break
+        else:
+            bins.append([i])
+            bin_tokens.append(costs[i])
+
+    ranked = sorted(range(len(bins)), key=lambda b: bin_tokens[b], reverse=True)
+    batches = [[items[i] for i in bins[b]] for b in ranked]
+
+    if batches:
+        sizes = Counter(len(batch) for batch in batches)
+        tokens = [bin_tokens[b] for b in ranked]
+        logger.info(
+            f"Packed {len(items)} indicators into {len(batches)} batches; "
+            f"batch sizes: {dict(sorted(sizes.items()))}; "
+            f"indicator tokens per batch: min {min(tokens)}, "
+            f"mean {sum(tokens) // len(tokens)}, max {max(tokens)}"
+        )
+    return batches
+
+
+class BatchPacker:
+    """Online variant of ``pack_batches`` for indicators that arrive one by one.
+
+    Up to ``max_open`` batches are kept open; an indicator goes into the first
+    one it fits. A batch is closed as soon as it is full, and the fullest
+    open batch is closed when a new one would exceed ``max_open``. Closed
+    batches wait in a look-ahead window of ``lookahead`` batches, which is
+    released largest first, so long calls still tend to start early without
+    waiting for the whole stream as ``pack_batches`` does.
+    """
+
+    def __init__(
+        self,
+        input_budget: int,
+        output_budget: int,
+        output_tokens_per_item: int,
+        max_items: int,
+        max_open: int = 4,
+        lookahead: int = 8,
+    ):
+        self.input_budget = input_budget
+        self.max_items = min(max_items, max(1, output_budget // output_tokens_per_item))
+        self.max_open = max_open
+        self.lookahead = lookahead
+        self.open: List[List[Dict[str, Any]]] = []
+        self.open_tokens: List[int] = []
+        self.closed: List[Tuple[int, List[Dict[str, Any]]]] = []
+        self.emitted_sizes: Counter = Counter()
+        self.emitted_tokens: List[int] = []
+
+    def add(self, item: Dict[str, Any]) -> List[List[Dict[str, Any]]]:
+        """Add one indicator; return the batches that became ready."""
+        cost = indicator_cost(item)
+        for b, members in enumerate(self.open):
+            if self.open_tokens[b] + cost <= self.input_budget:
+                members.append(item)
+                self.open_tokens[b] += cost
+                if len(members) >= self.max_items:
+                    self._close(b)
+                return self._release(self.lookahead)
+        self.open.append([item])
+        self.open_tokens.append(cost)
+        if len(self.open) > self.max_open or cost >= self.input_budget:
+            self._close(max(range(len(self.open)), key=lambda b: self.open_tokens[b]))
+        return self._release(self.lookahead)
+
+    def flush(self) -> List[List[Dict[str, Any]]]:
+        """Emit every remaining batch, largest first."""
+        while self.open:
+            self._close(0)
+        ready = self._release(0)
+        if self.emitted_tokens:
+            tokens = self.emitted_tokens
+            logger.info(
+                f"Packed {sum(size * n for size, n in self.emitted_sizes.items())} indicators "
+                f"into {len(tokens)} batches; "
+                f"batch sizes: {dict(sorted(self.emitted_sizes.items()))}; "
+                f"indicator tokens per batch: min {min(tokens)}, "
+                f"mean {sum(tokens) // len(tokens)}, max {max(tokens)}"
+            )
+        return ready
+
+    def _close(self, b: int) -> None:
+        self.closed.append((self.open_tokens.pop(b), self.open.pop(b)))
+
+    def _release(self, keep: int) -> List[List[Dict[str, Any]]]:
+        """Emit the largest closed batches until at most ``keep`` are left."""
+        if len(self.closed) <= keep:
+            return []
+        self.closed.sort(key=lambda closed: closed[0], reverse=True)
+        released = self.closed[: len(self.closed) - keep]
+        self.closed = self.closed[len(self.closed) - keep :]
+        for tokens, batch in released:
+            self.emitted_sizes[len(batch)] += 1
+            self.emitted_tokens.append(tokens)
+        return [batch for _, batch in released]
@@ -0,0 +1,52 @@
+import asyncio
+import threading
+import weakref
+from typing import Callable, Generic, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+def running_loop() -> Optional[asyncio.AbstractEventLoop]:
+    """The running event loop, or None outside one."""
+    try:
+        return asyncio.get_running_loop()
+    except RuntimeError:
+        return None
+
+
+class LoopLocal(Generic[T]):
+    """One value per running event loop, created by ``factory`` on first use.
+
+    asyncio primitives and pooled HTTP connections belong to the loop that
+    first used them, and the API and the job runner run separate loops, so
+    each loop gets its own. A value is dropped along with its loop; outside
+    any loop a single shared value is used.
+    """
+
+    def __init__(self, factory: Callable[[], T]):
+        self._factory = factory
+        self._lock = threading.Lock()
+        self._values: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, T]" = (
+            weakref.WeakKeyDictionary()
+        )
+        self._unbound: Optional[T] = None
+
+    def get(self) -> T:
+        loop = running_loop()
+        with self._lock:
+            if loop is None:
+                if self._unbound is None:
+                    self._unbound = self._factory()
+                return self._unbound
+            if loop not in self._values:
+                self._values[loop] = self._factory()
+            return self._values[loop]
+
+    def pop(self) -> Optional[T]:
+        """Forget and return the running loop's value, if any."""
+        loop = running_loop()
+        with self._lock:
+            if loop is None:
+                value, self._unbound = self._unbound, None
+                return value
+            return self._values.pop(loop, None)
@@ -2,6 +2,10 @@ import fitz  # PyMuPDF for PDFs
 from docx import Document as DocxDocument
 import io
 import logging
+from typing import List, Tuple
+
+import pdfplumber
+from langchain_text_splitters import RecursiveCharacterTextSplitter
 
 logger = logging.getLogger(__name__)
 
@@ -33,3 +37,28 @@ def extract_text_from_docx_bytes(file_bytes: bytes) -> str:
     except Exception as e:
         logger.error(f"DOCX extraction failed: {e}")
     return text
+
+
+def count_pdf_pages(path: str) -> int:
+    with pdfplumber.open(path) as pdf:
+        return len(pdf.pages)
+
+
+def extract_pdf_page_chunks(
+    path: str, first_page: int, last_page: int, chunk_size: int, chunk_overlap: int
+) -> List[Tuple[int, List[str]]]:
+    """Text chunks of pages ``first_page``..``last_page`` (1-based, inclusive).
+
+    Runs in an ingestion worker process, so it opens the PDF itself and only
+    returns plain data; pages without text are skipped.
+    """
+    splitter = RecursiveCharacterTextSplitter(
+        chunk_size=chunk_size, chunk_overlap=chunk_overlap
+    )
+    pages: List[Tuple[int, List[str]]] = []
+    with pdfplumber.open(path) as pdf:
+        for page_number in range(first_page, last_page + 1):
+            page_text = pdf.pages[page_number - 1].extract_text()
+            if page_text:
+                pages.append((page_number, splitter.split_text(page_text)))
+    return pages
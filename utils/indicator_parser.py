@@ -10,14 +10,12 @@ from config import settings
 from docx import Document as OutputDocx
 import io
 import json
+from utils.json_stream import salvage_json_array
 from utils.prompts.indicator import INDICATOR_PROMPT
 import re
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain_core.documents import Document
-from services.openAI.chat import OpenAIClient
-
-
-openai_client = OpenAIClient()
+from services.openAI.clients import get_llm_client
 
 
 def split_text_into_chunks(text: str, chunk_size=3000, chunk_overlap=200) -> list:
@@ -32,14 +30,9 @@ def split_text_into_chunks(text: str, chunk_size=3000, chunk_overlap=200) -> lis
 def try_extract_json(content: str) -> List[dict]:
     try:
         return json.loads(content)
-    except:
-        match = re.search(r"\[\s*{[\s\S]*?}\s*]", content)
-        if match:
-            try:
-                return json.loads(match.group())
-            except Exception as e:
-                print(f"❌ Regex parse failed: {e}")
-    return []
+    except json.JSONDecodeError:
+        # Keep every complete indicator from a truncated or malformed array
+        return salvage_json_array(content)
 
 
 def extract_text_from_pdf_bytes(file_bytes: bytes) -> str:
@@ -92,7 +85,7 @@ async def parse_indicators_with_llm(text: str) -> List[dict]:
         print(f"📦 Processing chunk {i+1}/{len(chunks)} - {len(chunk)} characters")
         try:
 
-            content = await openai_client.chat(
+            content = await get_llm_client().chat(
                 prompt=prompt, temperature=0, max_tokens=4000
             )
             print("\\n Content is ", content, "\n\n")
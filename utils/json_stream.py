@@ -0,0 +1,146 @@
+import json
+import logging
+import re
+from typing import Any, Dict, Iterable, List, Set
+
+logger = logging.getLogger(__name__)
+
+TRAILING_COMMA = re.compile(r",\s*([}\]])")
+
+
+def _loads_lenient(text: str) -> Any:
+    """``json.loads`` that also accepts raw control characters and trailing commas."""
+    try:
+        return json.loads(text, strict=False)
+    except json.JSONDecodeError:
+        return json.loads(TRAILING_COMMA.sub(r"\1", text), strict=False)
+
+
+class JSONArrayStreamParser:
+    """Incremental parser for a JSON array of objects, e.g. an LLM batch response.
+
+    Text is fed in chunks as it arrives; ``feed`` returns every top-level
+    object that closed within the chunk. Anything before the opening ``[`` is
+    skipped; only a ``[`` followed by ``{`` or ``]`` (after optional
+    whitespace) opens the array, so brackets in leading prose do not. A
+    malformed object is dropped without losing its neighbours, so a truncated
+    or slightly broken response still yields every complete object. Text
+    before the object being read is discarded, so each character is scanned
+    once however the response is chunked.
+    """
+
+    def __init__(self):
+        self.buffer = ""
+        self.pos = 0
+        self.started = False
+        self.closed = False
+        self.depth = 0
+        self.in_string = False
+        self.escaped = False
+        self.object_start = -1
+        self.objects: List[Dict[str, Any]] = []
+        self.errors: List[str] = []
+        # Non-whitespace text seen before the array opened (e.g. prose)
+        self.prefix_chars = 0
+
+    def feed(self, chunk: str) -> List[Dict[str, Any]]:
+        if self.closed:
+            return []
+        self.buffer += chunk
+        completed: List[Dict[str, Any]] = []
+        buffer = self.buffer
+        while self.pos < len(buffer) and not self.closed:
+            char = buffer[self.pos]
+            if not self.started:
+                if char == "[":
+                    opens = self._opens_array(buffer, self.pos + 1)
+                    if opens is None:
+                        # Wait for the next chunk to tell
+                        break
+                    if opens:
+                        self.started = True
+                        self.depth = 1
+                    else:
+                        self.prefix_chars += 1
+                elif not char.isspace():
+                    self.prefix_chars += 1
+            elif self.in_string:
+                if self.escaped:
+                    self.escaped = False
+                elif char == "\\":
+                    self.escaped = True
+                elif char == '"':
+                    self.in_string = False
+            elif char == '"':
+                self.in_string = True
+            elif char in "{[":
+                if self.depth == 1 and char == "{":
+                    self.object_start = self.pos
+                self.depth += 1
+            elif char in "}]":
+                self.depth -= 1
+                if self.depth == 1 and char == "}" and self.object_start >= 0:
+                    parsed = self._parse_object(buffer[self.object_start : self.pos + 1])
+                    if parsed is not None:
+                        completed.append(parsed)
+                    self.object_start = -1
+                elif self.depth == 0:
+                    self.closed = True
+            self.pos += 1
+        # Drop everything before the object being read
+        keep = self.object_start if self.object_start >= 0 else self.pos
+        if keep:
+            self.buffer = buffer[keep:]
+            self.pos -= keep
+            if self.object_start >= 0:
+                self.object_start -= keep
+        self.objects.extend(completed)
+        return completed
+
+    @staticmethod
+    def _opens_array(buffer: str, start: int) -> bool | None:
+        """Whether a ``[`` before ``start`` opens an array of objects; None if unknown yet."""
+        while start < len(buffer):
+            if not buffer[start].isspace():
+                return buffer[start] in "{]"
+            start += 1
+        return None
+
+    def _parse_object(self, text: str) -> Dict[str, Any] | None:
+        try:
+            parsed = _loads_lenient(text)
+        except json.JSONDecodeError as e:
+            self.errors.append(str(e))
+            logger.warning(f"Skipping malformed JSON object: {e}; text: {text[:200]}")
+            return None
+        if not isinstance(parsed, dict):
+            return None
+        return parsed
+
+    @property
+    def truncated(self) -> bool:
+        """True when the array was opened but never closed."""
+        return self.started and not self.closed
+
+
+def salvage_json_array(text: str | None) -> List[Dict[str, Any]]:
+    """Every complete object from a possibly truncated or malformed JSON array."""
+    if not text:
+        return []
+    parser = JSONArrayStreamParser()
+    parser.feed(text)
+    if parser.truncated or parser.errors:
+        logger.warning(
+            f"Salvaged {len(parser.objects)} objects from "
+            f"{'truncated' if parser.truncated else 'malformed'} JSON array "
+            f"({len(parser.errors)} malformed objects skipped)"
+        )
+    return parser.objects
+
+
+def missing_ids(
+    objects: Iterable[Dict[str, Any]], expected_ids: Iterable[str], key: str
+) -> Set[str]:
+    """IDs in ``expected_ids`` with no object whose ``key`` matches."""
+    found = {str(obj.get(key)) for obj in objects if key in obj}
+    return set(expected_ids) - found
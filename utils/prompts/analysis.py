@@ -2,6 +2,10 @@ from typing import Union, List, Dict
 import re
 import json
 
+# Bump whenever build_batch_prompt changes in a way that affects results, so
+# stored indicator results are no longer reused.
+ANALYSIS_PROMPT_VERSION = "1"
+
 
 def analysis_prompt(
     alignment_def: Union[str, Dict],
@@ -76,6 +80,15 @@ def analysis_prompt(
     return analysis_prompt
 
 
+def format_batch_indicator(position, item):
+    return f"""
+Indicator {position}:
+- Criteria ID: {item['indicator_id']}
+- Indicator: {item['question']}
+- Evidence from the Regulation: {item['evidence']}
+"""
+
+
 def build_batch_prompt(batch, alignment_def, vss_texts):
     intro = f"""
 You are a regulatory compliance expert specializing in law, ESG, and sustainability standards.
@@ -134,11 +147,6 @@ IMPORTANT:
 """
     indicators_text = ""
     for i, item in enumerate(batch, 1):
-        indicators_text += f"""
-Indicator {i}:
-- Criteria ID: {item['indicator_id']}
-- Indicator: {item['question']}
-- Evidence from the Regulation: {item['evidence']}
-"""
+        indicators_text += format_batch_indicator(i, item)
     full_prompt = intro + "\n\n" + indicators_text + "\n\nOutput:"
     return full_prompt
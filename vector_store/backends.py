@@ -0,0 +1,146 @@
+import abc
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Set
+
+from config import settings
+from vector_store.pinecone import ensure_index, pc
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class VectorMatch:
+    id: str
+    score: float
+    metadata: Dict[str, Any] = field(default_factory=dict)
+
+
+class VectorBackend(abc.ABC):
+    """Stores embedding vectors by namespace and finds the nearest ones.
+
+    Vectors are upserted as ``{"id", "values", "metadata"}`` dicts. Instances
+    may hold connections bound to the running event loop, so create one per
+    loop and ``aclose`` it when done.
+    """
+
+    @abc.abstractmethod
+    def namespace_exists(self, namespace: str) -> bool:
+        ...
+
+    async def ensure_ready(self) -> None:
+        """Create the underlying index if needed; called before writing."""
+
+    @abc.abstractmethod
+    async def upsert(self, namespace: str, vectors: List[Dict[str, Any]]) -> None:
+        ...
+
+    @abc.abstractmethod
+    async def query(
+        self, namespace: str, vectors: List[List[float]], top_k: int
+    ) -> List[List[VectorMatch]]:
+        """The ``top_k`` best matches for each query vector, best first."""
+
+    @abc.abstractmethod
+    async def list_ids(self, namespace: str, prefix: str) -> Set[str]:
+        ...
+
+    @abc.abstractmethod
+    async def delete(self, namespace: str, ids: List[str]) -> None:
+        ...
+
+    async def aclose(self) -> None:
+        """Release connections; nothing to do by default."""
+
+
+class PineconeVectorBackend(VectorBackend):
+    # Pinecone accepts at most this many IDs per delete request
+    DELETE_BATCH_SIZE = 1000
+
+    def __init__(self):
+        self._index = None
+        self._query_semaphore = asyncio.Semaphore(settings.RAG_CONCURRENCY)
+
+    def namespace_exists(self, namespace: str) -> bool:
+        try:
+            index = pc.Index(settings.PINECONE_INDEX_NAME)
+            stats = index.describe_index_stats()
+            namespaces = stats.get("namespaces", {}).keys()
+            return namespace in namespaces
+        except Exception as e:
+            logger.error(f"Error checking Pinecone namespace existence: {e}")
+            return False
+
+    async def ensure_ready(self) -> None:
+        await asyncio.to_thread(ensure_index)
+
+    async def _get_index(self):
+        if self._index is None:
+            description = await asyncio.to_thread(
+                pc.describe_index, settings.PINECONE_INDEX_NAME
+            )
+            self._index = pc.IndexAsyncio(host=description.host)
+        return self._index
+
+    async def upsert(self, namespace: str, vectors: List[Dict[str, Any]]) -> None:
+        index = await self._get_index()
+        await index.upsert(vectors=vectors, namespace=namespace)
+
+    async def query(
+        self, namespace: str, vectors: List[List[float]], top_k: int
+    ) -> List[List[VectorMatch]]:
+        index = await self._get_index()
+
+        async def query_one(vector: List[float]) -> List[VectorMatch]:
+            try:
+                async with self._query_semaphore:
+                    response = await index.query(
+                        vector=vector,
+                        top_k=top_k,
+                        namespace=namespace,
+                        include_metadata=True,
+                    )
+            except Exception as e:
+                logger.error(f"Pinecone query failed in namespace '{namespace}': {e}")
+                return []
+            return [
+                VectorMatch(match.id, match.score, match.metadata or {})
+                for match in response.matches
+            ]
+
+        return list(await asyncio.gather(*(query_one(v) for v in vectors)))
+
+    async def list_ids(self, namespace: str, prefix: str) -> Set[str]:
+        index = await self._get_index()
+        ids: Set[str] = set()
+        token = None
+        while True:
+            response = await index.list_paginated(
+                prefix=prefix, namespace=namespace, pagination_token=token
+            )
+            ids.update(vector.id for vector in response.vectors or [])
+            token = response.pagination.next if response.pagination else None
+            if not token:
+                return ids
+
+    async def delete(self, namespace: str, ids: List[str]) -> None:
+        index = await self._get_index()
+        for start in range(0, len(ids), self.DELETE_BATCH_SIZE):
+            await index.delete(
+                ids=ids[start : start + self.DELETE_BATCH_SIZE], namespace=namespace
+            )
+
+    async def aclose(self) -> None:
+        """Close the pooled async Pinecone connection, if one was opened."""
+        if self._index is not None:
+            await self._index.close()
+            self._index = None
+
+
+def get_vector_backend() -> VectorBackend:
+    if settings.VECTOR_BACKEND == "local":
+        from vector_store.local_index import LocalVectorBackend
+
+        return LocalVectorBackend(settings.LOCAL_VECTOR_DIR)
+    return PineconeVectorBackend()
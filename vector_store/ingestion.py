@@ -0,0 +1,248 @@
+import asyncio
+import hashlib
+import logging
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from config import settings
+from utils.file_extraction import count_pdf_pages, extract_pdf_page_chunks
+from vector_store.backends import VectorBackend, get_vector_backend
+from vector_store.lexical_index import get_lexical_index
+from vector_store.pinecone import get_embedder
+
+logger = logging.getLogger(__name__)
+
+# Attempts per upsert batch before the ingestion fails
+UPSERT_ATTEMPTS = 3
+
+
+def _digest(text: str, length: int) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:length]
+
+
+def vector_id_prefix(namespace: str, document_key: str) -> str:
+    """ID prefix shared by every vector of one document in ``namespace``."""
+    return _digest(namespace + "\0" + document_key, 16) + "#"
+
+
+def vector_id(prefix: str, page: int, text: str) -> str:
+    """Deterministic ID of a chunk, so re-ingesting it overwrites rather than duplicates."""
+    return f"{prefix}p{page}#{_digest(text, 24)}"
+
+
+@dataclass
+class IngestionProgress:
+    pages_total: int = 0
+    pages_done: int = 0
+    chunks_total: int = 0
+    chunks_reused: int = 0
+    vectors_upserted: int = 0
+    vectors_deleted: int = 0
+
+
+@dataclass
+class Chunk:
+    id: str
+    text: str
+    metadata: Dict[str, Any]
+
+
+class DocumentIngester:
+    """Pipelined PDF ingestion into a vector store namespace.
+
+    Page ranges are extracted and chunked in a process pool, chunks are
+    grouped into batches that concurrent workers embed, and embedded batches
+    are upserted by another set of workers. Bounded queues between the stages
+    keep memory flat while every stage runs at once. ``on_progress`` gets the
+    running totals after each extracted page range and upserted batch.
+
+    Vector IDs derive from the document key, page and chunk text, so chunks
+    already stored for the document are not embedded again, and chunks that
+    no longer occur are deleted once the new version is fully stored. The
+    namespace's BM25 index is then rebuilt for the document.
+    """
+
+    def __init__(
+        self,
+        namespace: str,
+        on_progress: Optional[Callable[[IngestionProgress], None]] = None,
+    ):
+        self.namespace = namespace
+        self.on_progress = on_progress
+        self.embedder = get_embedder()
+        self.progress = IngestionProgress()
+
+    async def ingest_pdf(
+        self, path: str, document_key: str, metadata: Dict[str, Any]
+    ) -> IngestionProgress:
+        """Ingest every page of ``path`` as the current version of ``document_key``.
+
+        ``metadata`` is stored on each new vector.
+        """
+        started = time.perf_counter()
+        self.progress = IngestionProgress(pages_total=await asyncio.to_thread(count_pdf_pages, path))
+        self._report()
+        backend = get_vector_backend()
+        await backend.ensure_ready()
+        prefix = vector_id_prefix(self.namespace, document_key)
+        # IDs stored for the previous version, and IDs of the version being ingested
+        existing: set[str] = set()
+        current: set[str] = set()
+        # (vector_id, text) of every distinct chunk, for the lexical index
+        lexical_chunks: List[Tuple[str, str]] = []
+
+        embed_queue: asyncio.Queue = asyncio.Queue(maxsize=settings.INGEST_QUEUE_SIZE)
+        upsert_queue: asyncio.Queue = asyncio.Queue(maxsize=settings.INGEST_QUEUE_SIZE)
+        per_task = settings.INGEST_PAGES_PER_TASK
+        ranges = [
+            (first, min(first + per_task - 1, self.progress.pages_total))
+            for first in range(1, self.progress.pages_total + 1, per_task)
+        ]
+        # Spawned workers: forking a process that runs threads is unsafe
+        pool = ProcessPoolExecutor(
+            max_workers=max(1, min(settings.INGEST_EXTRACT_PROCESSES, len(ranges))),
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+
+        async def extract_stage():
+            loop = asyncio.get_running_loop()
+
+            async def extract(first: int, last: int, future: asyncio.Future):
+                return last - first + 1, await future
+
+            # Submitted up front so pages are extracted while stored IDs are listed
+            extractions = asyncio.as_completed(
+                [
+                    extract(
+                        first,
+                        last,
+                        loop.run_in_executor(
+                            pool,
+                            extract_pdf_page_chunks,
+                            path,
+                            first,
+                            last,
+                            settings.INGEST_CHUNK_SIZE,
+                            settings.INGEST_CHUNK_OVERLAP,
+                        ),
+                    )
+                    for first, last in ranges
+                ]
+            )
+            existing.update(await backend.list_ids(self.namespace, prefix))
+            batch: List[Chunk] = []
+            for extracted in extractions:
+                page_count, pages = await extracted
+                for page_number, texts in pages:
+                    for chunk_index, text in enumerate(texts):
+                        chunk_id = vector_id(prefix, page_number, text)
+                        if chunk_id in current:
+                            continue
+                        current.add(chunk_id)
+                        lexical_chunks.append((chunk_id, text))
+                        if chunk_id in existing:
+                            self.progress.chunks_reused += 1
+                            continue
+                        batch.append(
+                            Chunk(
+                                chunk_id,
+                                text,
+                                {**metadata, "page": page_number, "chunk_index": chunk_index},
+                            )
+                        )
+                        if len(batch) >= settings.RAG_EMBED_BATCH_SIZE:
+                            await embed_queue.put(batch)
+                            batch = []
+                    self.progress.chunks_total += len(texts)
+                self.progress.pages_done += page_count
+                self._report()
+            if batch:
+                await embed_queue.put(batch)
+            for _ in range(settings.INGEST_EMBED_CONCURRENCY):
+                await embed_queue.put(None)
+
+        async def embed_worker():
+            while True:
+                batch = await embed_queue.get()
+                if batch is None:
+                    return
+                vectors = await self.embedder.aembed_documents(
+                    [chunk.text for chunk in batch]
+                )
+                await upsert_queue.put(list(zip(batch, vectors)))
+
+        async def embed_stage():
+            await asyncio.gather(
+                *(embed_worker() for _ in range(settings.INGEST_EMBED_CONCURRENCY))
+            )
+            for _ in range(settings.INGEST_UPSERT_CONCURRENCY):
+                await upsert_queue.put(None)
+
+        async def upsert_worker():
+            while True:
+                items = await upsert_queue.get()
+                if items is None:
+                    return
+                await self._upsert(backend, items)
+                self.progress.vectors_upserted += len(items)
+                self._report()
+
+        tasks = [
+            asyncio.create_task(extract_stage()),
+            asyncio.create_task(embed_stage()),
+            *(
+                asyncio.create_task(upsert_worker())
+                for _ in range(settings.INGEST_UPSERT_CONCURRENCY)
+            ),
+        ]
+        try:
+            await asyncio.gather(*tasks)
+            # Only drop the old version's chunks once the new one is complete
+            stale = sorted(existing - current)
+            if stale:
+                await backend.delete(self.namespace, stale)
+                self.progress.vectors_deleted = len(stale)
+                self._report()
+            lexical_index = get_lexical_index(self.namespace, create=True)
+            await asyncio.to_thread(lexical_index.replace_document, prefix, lexical_chunks)
+        finally:
+            for task in tasks:
+                task.cancel()
+            pool.shutdown(wait=False, cancel_futures=True)
+            await backend.aclose()
+        logger.info(
+            f"Ingested {path} into '{self.namespace}': {self.progress.pages_total} pages, "
+            f"{self.progress.chunks_total} chunks, {self.progress.chunks_reused} reused, "
+            f"{self.progress.vectors_upserted} upserted, {self.progress.vectors_deleted} deleted "
+            f"in {time.perf_counter() - started:.1f}s"
+        )
+        return self.progress
+
+    async def _upsert(
+        self, backend: VectorBackend, items: List[Tuple[Chunk, List[float]]]
+    ) -> None:
+        vectors = [
+            {
+                "id": chunk.id,
+                "values": values,
+                # RAG search reads the passage back from "text"
+                "metadata": {"text": chunk.text, **chunk.metadata},
+            }
+            for chunk, values in items
+        ]
+        for attempt in range(1, UPSERT_ATTEMPTS + 1):
+            try:
+                await backend.upsert(self.namespace, vectors)
+                return
+            except Exception as e:
+                if attempt == UPSERT_ATTEMPTS:
+                    raise
+                logger.warning(f"Vector upsert failed (attempt {attempt}): {e}")
+                await asyncio.sleep(2**attempt)
+
+    def _report(self) -> None:
+        if self.on_progress is not None:
+            self.on_progress(self.progress)
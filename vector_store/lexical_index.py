@@ -0,0 +1,135 @@
+import logging
+import os
+import re
+import sqlite3
+import threading
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+# References such as "9(1)(d)" or "2023/1115" stay single terms
+TOKEN = re.compile(r"[a-z0-9]+(?:\([a-z0-9]+\))+|[a-z0-9]+(?:[./-][a-z0-9]+)*")
+STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in is it its of on or that the "
+    "their this to was were which with shall should must may any all such".split()
+)
+# Terms per query, so a long indicator question stays a cheap lookup
+MAX_QUERY_TERMS = 64
+
+
+def lexical_terms(text: str) -> List[str]:
+    """Lowercased words and references plus adjacent-word bigrams.
+
+    Bigrams let exact phrases ("due diligence statement") and references
+    ("Article 9(1)(d)") outrank chunks that merely share their words.
+    """
+    words = [
+        re.sub(r"[^a-z0-9]+", "_", token).strip("_")
+        for token in TOKEN.findall(text.lower())
+    ]
+    words = [word for word in words if word and word not in STOPWORDS]
+    return words + [f"{a}_{b}" for a, b in zip(words, words[1:])]
+
+
+class LexicalIndex:
+    """BM25 index over the regulation chunks of one namespace.
+
+    Backed by an SQLite FTS5 table of pre-computed ``lexical_terms``, with the
+    chunk text alongside so lexical-only hits can be returned as evidence.
+    Ingestion replaces a document's chunks in one transaction.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE VIRTUAL TABLE IF NOT EXISTS chunks USING fts5(
+                terms,
+                id UNINDEXED,
+                document UNINDEXED,
+                text UNINDEXED,
+                tokenize = "unicode61 tokenchars '_'"
+            )
+            """
+        )
+        self._conn.commit()
+
+    def replace_document(self, document: str, chunks: Sequence[Tuple[str, str]]) -> None:
+        """Make ``(vector_id, text)`` pairs the only chunks indexed for ``document``."""
+        with self._lock:
+            self._conn.execute("DELETE FROM chunks WHERE document = ?", (document,))
+            self._conn.executemany(
+                "INSERT INTO chunks (terms, id, document, text) VALUES (?, ?, ?, ?)",
+                [
+                    (" ".join(lexical_terms(text)), vector_id, document, text)
+                    for vector_id, text in chunks
+                ],
+            )
+            self._conn.commit()
+        logger.info(f"Lexical index {self.path}: {len(chunks)} chunks for document {document}")
+
+    def search(self, query: str, limit: int) -> List[Dict[str, str]]:
+        """Best BM25 matches for ``query`` as ``{"id", "text"}``, best first."""
+        terms = list(dict.fromkeys(lexical_terms(query)))[:MAX_QUERY_TERMS]
+        if not terms:
+            return []
+        expression = " OR ".join(f'"{term}"' for term in terms)
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, text FROM chunks WHERE chunks MATCH ? ORDER BY bm25(chunks) LIMIT ?",
+                (expression, limit),
+            ).fetchall()
+        return [{"id": vector_id, "text": text} for vector_id, text in rows]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+def lexical_index_path(namespace: str) -> str:
+    safe = re.sub(r"[^A-Za-z0-9_.-]", "_", namespace) or "_"
+    return os.path.join(settings.LEXICAL_INDEX_DIR, f"{safe}.sqlite3")
+
+
+_indexes: Dict[str, LexicalIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def get_lexical_index(namespace: str, create: bool = False) -> Optional[LexicalIndex]:
+    """The process-wide index for ``namespace``; None if it was never built and not ``create``."""
+    path = lexical_index_path(namespace)
+    with _indexes_lock:
+        index = _indexes.get(path)
+        if index is None:
+            if not create and not os.path.exists(path):
+                return None
+            index = _indexes[path] = LexicalIndex(path)
+        return index
+
+
+def fuse_rankings(
+    rankings: Sequence[Tuple[List[Dict[str, str]], float]], k: int
+) -> List[Dict[str, str]]:
+    """Reciprocal rank fusion of ``(matches, weight)`` lists, keeping the top ``k``.
+
+    Each match adds ``weight / (RAG_HYBRID_RRF_K + rank)`` to its ID's score,
+    so the lists combine by rank and their raw scores never need comparing.
+    """
+    scores: Dict[str, float] = {}
+    matches: Dict[str, Dict[str, str]] = {}
+    for ranking, weight in rankings:
+        for rank, match in enumerate(ranking, 1):
+            scores[match["id"]] = scores.get(match["id"], 0.0) + weight / (
+                settings.RAG_HYBRID_RRF_K + rank
+            )
+            matches.setdefault(match["id"], match)
+    best = sorted(scores, key=lambda vector_id: -scores[vector_id])[:k]
+    return [matches[vector_id] for vector_id in best]
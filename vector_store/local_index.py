@@ -0,0 +1,232 @@
+import asyncio
+import fcntl
+import json
+import logging
+import os
+import re
+import shutil
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Set, Tuple
+
+import numpy as np
+
+from vector_store.backends import VectorBackend, VectorMatch
+
+logger = logging.getLogger(__name__)
+
+CURRENT_FILE = "CURRENT"
+LOCK_FILE = ".lock"
+VECTORS_FILE = "vectors.npy"
+RECORDS_FILE = "records.json"
+# Loads retried when the version being read is replaced and removed meanwhile
+LOAD_ATTEMPTS = 5
+
+
+@dataclass
+class _Snapshot:
+    version: str
+    ids: List[str]
+    metadata: List[Dict[str, Any]]
+    # Unit-normalised float32 rows, memory-mapped from VECTORS_FILE
+    vectors: np.ndarray
+    positions: Dict[str, int]
+
+
+@dataclass
+class _PendingWrites:
+    upserts: Dict[str, Tuple[np.ndarray, Dict[str, Any]]] = field(default_factory=dict)
+    deletes: Set[str] = field(default_factory=set)
+
+
+EMPTY_SNAPSHOT = _Snapshot("", [], [], np.zeros((0, 0), dtype=np.float32), {})
+
+# Loaded snapshots by namespace directory, shared by every backend in the process
+_snapshots: Dict[str, _Snapshot] = {}
+_snapshots_lock = threading.Lock()
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return (vectors / norms).astype(np.float32)
+
+
+def _read_version(directory: str) -> str:
+    try:
+        with open(os.path.join(directory, CURRENT_FILE), encoding="utf-8") as f:
+            return f.read().strip()
+    except FileNotFoundError:
+        return ""
+
+
+def _load_snapshot(directory: str) -> _Snapshot:
+    """The current version of a namespace, reusing the loaded copy when unchanged.
+
+    A writer removes the previous version right after publishing a new one,
+    so a version that disappears while loading is retried from ``CURRENT``.
+    """
+    attempt = 0
+    while True:
+        attempt += 1
+        version = _read_version(directory)
+        if not version:
+            return EMPTY_SNAPSHOT
+        with _snapshots_lock:
+            cached = _snapshots.get(directory)
+            if cached is not None and cached.version == version:
+                return cached
+        path = os.path.join(directory, version)
+        try:
+            with open(os.path.join(path, RECORDS_FILE), encoding="utf-8") as f:
+                records = json.load(f)
+            vectors = np.load(os.path.join(path, VECTORS_FILE), mmap_mode="r")
+        except FileNotFoundError:
+            if attempt >= LOAD_ATTEMPTS or _read_version(directory) == version:
+                raise
+            logger.info(f"Local vector index {directory}: {version} was replaced while loading")
+            continue
+        snapshot = _Snapshot(
+            version,
+            records["ids"],
+            records["metadata"],
+            vectors,
+            {vector_id: i for i, vector_id in enumerate(records["ids"])},
+        )
+        with _snapshots_lock:
+            _snapshots[directory] = snapshot
+        return snapshot
+
+
+class LocalVectorBackend(VectorBackend):
+    """In-process brute-force vector index, persisted per namespace under ``root``.
+
+    Each namespace directory holds immutable versions, each a memory-mapped
+    ``vectors.npy`` of unit-normalised float32 rows plus ``records.json``
+    with the IDs and metadata, and a ``CURRENT`` file naming the live version.
+    Scores are cosine similarities, as with the Pinecone index.
+
+    Writes are buffered until ``flush`` (called by ``aclose``), which applies
+    them on top of the latest version under a file lock, so writers in other
+    processes merge rather than overwrite each other. Readers pick up the new
+    version on their next query.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+        self._pending: Dict[str, _PendingWrites] = {}
+
+    def _directory(self, namespace: str) -> str:
+        safe = re.sub(r"[^A-Za-z0-9_.-]", "_", namespace) or "_"
+        return os.path.join(self.root, safe)
+
+    def namespace_exists(self, namespace: str) -> bool:
+        return bool(_load_snapshot(self._directory(namespace)).ids)
+
+    async def upsert(self, namespace: str, vectors: List[Dict[str, Any]]) -> None:
+        pending = self._pending.setdefault(namespace, _PendingWrites())
+        for vector in vectors:
+            pending.deletes.discard(vector["id"])
+            pending.upserts[vector["id"]] = (
+                np.asarray(vector["values"], dtype=np.float32),
+                vector.get("metadata") or {},
+            )
+
+    async def delete(self, namespace: str, ids: List[str]) -> None:
+        pending = self._pending.setdefault(namespace, _PendingWrites())
+        for vector_id in ids:
+            pending.upserts.pop(vector_id, None)
+            pending.deletes.add(vector_id)
+
+    async def list_ids(self, namespace: str, prefix: str) -> Set[str]:
+        snapshot = _load_snapshot(self._directory(namespace))
+        ids = {vector_id for vector_id in snapshot.ids if vector_id.startswith(prefix)}
+        pending = self._pending.get(namespace)
+        if pending is not None:
+            ids -= pending.deletes
+            ids.update(i for i in pending.upserts if i.startswith(prefix))
+        return ids
+
+    async def query(
+        self, namespace: str, vectors: List[List[float]], top_k: int
+    ) -> List[List[VectorMatch]]:
+        snapshot = _load_snapshot(self._directory(namespace))
+        if not snapshot.ids or not vectors:
+            return [[] for _ in vectors]
+        return await asyncio.to_thread(self._search, snapshot, vectors, top_k)
+
+    @staticmethod
+    def _search(
+        snapshot: _Snapshot, vectors: List[List[float]], top_k: int
+    ) -> List[List[VectorMatch]]:
+        queries = _normalize(np.asarray(vectors, dtype=np.float32))
+        scores = queries @ snapshot.vectors.T
+        k = min(top_k, len(snapshot.ids))
+        results: List[List[VectorMatch]] = []
+        for row in scores:
+            top = np.argpartition(-row, k - 1)[:k]
+            top = top[np.argsort(-row[top])]
+            results.append(
+                [
+                    VectorMatch(snapshot.ids[i], float(row[i]), snapshot.metadata[i])
+                    for i in top
+                ]
+            )
+        return results
+
+    def flush(self) -> None:
+        """Write buffered upserts and deletes as a new version of each namespace."""
+        for namespace, pending in list(self._pending.items()):
+            if pending.upserts or pending.deletes:
+                self._write(self._directory(namespace), pending)
+            del self._pending[namespace]
+
+    def _write(self, directory: str, pending: _PendingWrites) -> None:
+        os.makedirs(directory, exist_ok=True)
+        with open(os.path.join(directory, LOCK_FILE), "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            current = _load_snapshot(directory)
+            keep = [
+                i
+                for i, vector_id in enumerate(current.ids)
+                if vector_id not in pending.deletes and vector_id not in pending.upserts
+            ]
+            ids = [current.ids[i] for i in keep] + list(pending.upserts)
+            metadata = [current.metadata[i] for i in keep] + [
+                meta for _, meta in pending.upserts.values()
+            ]
+            if pending.upserts:
+                added = _normalize(np.stack([values for values, _ in pending.upserts.values()]))
+                if len(keep) and added.shape[1] != current.vectors.shape[1]:
+                    raise ValueError(
+                        f"Vector dimension {added.shape[1]} does not match the "
+                        f"index dimension {current.vectors.shape[1]} in {directory}"
+                    )
+                vectors = np.concatenate([current.vectors[keep], added]) if keep else added
+            elif keep:
+                vectors = np.asarray(current.vectors[keep])
+            else:
+                vectors = np.zeros((0, 0), dtype=np.float32)
+
+            version = f"v{int(current.version[1:] or 0) + 1:08d}"
+            path = os.path.join(directory, version)
+            shutil.rmtree(path, ignore_errors=True)
+            os.makedirs(path)
+            np.save(os.path.join(path, VECTORS_FILE), vectors)
+            with open(os.path.join(path, RECORDS_FILE), "w", encoding="utf-8") as f:
+                json.dump({"ids": ids, "metadata": metadata}, f, ensure_ascii=False)
+            pointer = os.path.join(directory, CURRENT_FILE + ".tmp")
+            with open(pointer, "w", encoding="utf-8") as f:
+                f.write(version)
+            os.replace(pointer, os.path.join(directory, CURRENT_FILE))
+            # Readers still mapping an old version keep their open files
+            for name in os.listdir(directory):
+                if name != version and re.fullmatch(r"v\d{8}", name):
+                    shutil.rmtree(os.path.join(directory, name), ignore_errors=True)
+        logger.info(
+            f"Local vector index {directory} is now {version} with {len(ids)} vectors "
+            f"({len(pending.upserts)} upserted, {len(pending.deletes)} deleted)"
+        )
+
+    async def aclose(self) -> None:
+        await asyncio.to_thread(self.flush)
@@ -1,19 +1,32 @@
+import asyncio
+import logging
 import time
-import uuid
-from typing import List
+from typing import Dict, List, Optional
+import numpy as np
 from pinecone import Pinecone, ServerlessSpec
-from langchain_openai import OpenAIEmbeddings
-from langchain_pinecone import PineconeVectorStore
 from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from config import settings
+from services.openAI.cache import EmbeddingCache, get_embedding_cache
+from services.openAI.clients import EMBEDDING_MODEL, llm_clients
+from services.openAI.rate_limiter import embedding_slot
+from services.openAI.usage import record_embedding, usage_tracker
+
+logger = logging.getLogger(__name__)
 
 # Initialize Pinecone
 pc = Pinecone(api_key=settings.PINECONE_API_KEY.get_secret_value())
 
+# Set once the index is known to exist, so ingestion skips the round trip
+_index_ready = False
+
 
 def ensure_index():
     """Ensure the Pinecone index exists and is ready."""
+    global _index_ready
+    if _index_ready:
+        return
     if settings.PINECONE_INDEX_NAME not in pc.list_indexes().names():
         pc.create_index(
             name=settings.PINECONE_INDEX_NAME,
@@ -24,13 +37,94 @@ def ensure_index():
         while not pc.describe_index(settings.PINECONE_INDEX_NAME).status["ready"]:
             print("Waiting for index to be ready...")
             time.sleep(2)
+    _index_ready = True
 
 
-def get_embedder():
-    """Return an OpenAI embedder instance."""
-    return OpenAIEmbeddings(
-        model="text-embedding-ada-002", api_key=settings.OPENAI_API_KEY
-    )
+class CachedEmbeddings(Embeddings):
+    """OpenAI embeddings behind the shared embedding cache and rate limiter.
+
+    Only texts missing from the cache are sent to the API, each distinct text
+    once, and only those requests take rate-limit capacity and count towards
+    the job's usage; a request served entirely from the cache is recorded as
+    a cache hit. Vectors are float32, whether cached or fresh.
+    """
+
+    def __init__(
+        self,
+        model: str,
+        cache: Optional[EmbeddingCache] = None,
+        embedder: Optional[Embeddings] = None,
+    ):
+        self.model = model
+        self.cache = cache
+        self._embedder = embedder
+
+    @property
+    def embedder(self) -> Embeddings:
+        # The shared, pooled embedder unless one was injected
+        if self._embedder is not None:
+            return self._embedder
+        return llm_clients.embeddings(self.model)
+
+    def _lookup(self, texts: List[str]) -> tuple[Dict[str, np.ndarray], List[str]]:
+        found = self.cache.get_many(self.model, texts) if self.cache else {}
+        missing = list(dict.fromkeys(text for text in texts if text not in found))
+        if not missing:
+            usage_tracker.record(self.model, cache_hit=True)
+        return found, missing
+
+    def _store(
+        self, found: Dict[str, np.ndarray], missing: List[str], fresh: List[List[float]]
+    ) -> None:
+        vectors = {text: np.asarray(vector, dtype=np.float32) for text, vector in zip(missing, fresh)}
+        if self.cache:
+            self.cache.set_many(self.model, vectors)
+        found.update(vectors)
+
+    async def aembed_documents(
+        self, texts: List[str], chunk_size: Optional[int] = None
+    ) -> List[List[float]]:
+        # The cache blocks on SQLite, so keep it off the event loop
+        found, missing = await asyncio.to_thread(self._lookup, texts)
+        if missing:
+            started = time.perf_counter()
+            try:
+                async with embedding_slot(self.model, missing):
+                    fresh = await self.embedder.aembed_documents(
+                        missing, chunk_size=chunk_size or settings.RAG_EMBED_BATCH_SIZE
+                    )
+            except Exception:
+                record_embedding(self.model, missing, started, error=True)
+                raise
+            record_embedding(self.model, missing, started)
+            await asyncio.to_thread(self._store, found, missing, fresh)
+        return [found[text].tolist() for text in texts]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        found, missing = self._lookup(texts)
+        if missing:
+            started = time.perf_counter()
+            try:
+                fresh = self.embedder.embed_documents(
+                    missing, chunk_size=settings.RAG_EMBED_BATCH_SIZE
+                )
+            except Exception:
+                record_embedding(self.model, missing, started, error=True)
+                raise
+            record_embedding(self.model, missing, started)
+            self._store(found, missing, fresh)
+        return [found[text].tolist() for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return (await self.aembed_documents([text]))[0]
+
+
+def get_embedder() -> CachedEmbeddings:
+    """Return an OpenAI embedder backed by the process-wide embedding cache."""
+    return CachedEmbeddings(EMBEDDING_MODEL, get_embedding_cache())
 
 
 def chunk_text(text: str, chunk_size=1500, chunk_overlap=250) -> List[Document]:
@@ -41,22 +135,3 @@ def chunk_text(text: str, chunk_size=1500, chunk_overlap=250) -> List[Document]:
     texts = splitter.split_text(text)
     return [Document(page_content=chunk) for chunk in texts]
 
-
-def embed_and_store_documents(
-    documents: List[Document], namespace: str, batch_size: int = 100
-):
-    ensure_index()
-    embedder = get_embedder()
-
-    vs = PineconeVectorStore.from_existing_index(
-        index_name=settings.PINECONE_INDEX_NAME, embedding=embedder, namespace=namespace
-    )
-
-    for i in range(0, len(documents), batch_size):
-        batch = documents[i : i + batch_size]
-        ids = [str(uuid.uuid4()) for _ in batch]
-        try:
-            vs.add_documents(documents=batch, ids=ids)
-            print(f"Uploaded batch {i // batch_size + 1}")
-        except Exception as e:
-            print(f"Error uploading batch {i // batch_size + 1}: {e}")
@@ -1,70 +1,123 @@
 import logging
-from langchain_openai import OpenAIEmbeddings
-from langchain_pinecone import PineconeVectorStore
 from config import settings
 import asyncio
-from vector_store.pinecone import pc
+from typing import Dict, List, Optional
+from vector_store.backends import VectorBackend, get_vector_backend
+from vector_store.lexical_index import fuse_rankings, get_lexical_index
+from vector_store.pinecone import get_embedder
 
 logger = logging.getLogger(__name__)
 
 
 def namespace_exists(namespace: str) -> bool:
-    # List all namespaces for the configured index
-    index_name = settings.PINECONE_INDEX_NAME
-    try:
-        index = pc.Index(index_name)
-        stats = index.describe_index_stats()
-        namespaces = stats.get("namespaces", {}).keys()
-        return namespace in namespaces
-    except Exception as e:
-        logger.error(f"Error checking Pinecone namespace existence: {e}")
-        return False
+    """Whether the configured vector backend holds any vectors in ``namespace``."""
+    return get_vector_backend().namespace_exists(namespace)
 
 
 class RAGSearcher:
-    def __init__(self, k=8, namespace=None):
-        self.k = k
+    """Evidence retrieval for indicator questions within one namespace.
+
+    With RAG_HYBRID_ENABLED and a lexical index built for the namespace, the
+    vector matches are fused with BM25 matches, so exact terms and article
+    references rank well; otherwise results are the vector matches alone.
+    """
+
+    def __init__(self, k=None, namespace=None, backend: Optional[VectorBackend] = None):
+        self.k = k or settings.RAG_TOP_K
         self.namespace = namespace or settings.PINECONE_NAMESPACE
         logger.info(f"Initializing RAG searcher with namespace: {self.namespace}")
-        embedder = OpenAIEmbeddings(
-            model="text-embedding-ada-002", api_key=settings.OPENAI_API_KEY
-        )
-        vector_store = PineconeVectorStore.from_existing_index(
-            index_name=settings.PINECONE_INDEX_NAME,
-            embedding=embedder,
-            namespace=self.namespace,
-        )
-        self.retriever = vector_store.as_retriever(search_kwargs={"k": self.k})
+        self.embedder = get_embedder()
+        self._backend = backend
         logger.info("RAG searcher initialized successfully.")
 
-    def search(self, query: str):
+    @property
+    def backend(self) -> VectorBackend:
+        # Created on first use, inside the event loop that will query it
+        if self._backend is None:
+            self._backend = get_vector_backend()
+        return self._backend
+
+    async def async_search(self, query: str):
         logger.info(
-            f"Running RAG search in namespace '{self.namespace}' for query: {query[:100]}..."
+            f"Running async RAG search in namespace '{self.namespace}' for query: {query[:100]}..."
         )
-        docs = self.retriever.get_relevant_documents(query)
-        evidence = [doc.page_content for doc in docs]
+        evidence = (await self.batch_search([query]))[0]
         logger.info(f"Retrieved {len(evidence)} documents.")
         return evidence
 
-    async def async_search(self, query: str):
+    async def batch_search(self, queries: List[str]) -> List[List[str]]:
+        """Search many queries with batched embeddings and one backend query.
+
+        Returns one evidence list per query, in order; a failed query yields [].
+        """
+        matches = await self.batch_search_matches(queries)
+        return [[match["text"] for match in result] for result in matches]
+
+    async def batch_search_matches(self, queries: List[str]) -> List[List[Dict[str, str]]]:
+        """Like ``batch_search`` but each match is ``{"id": vector_id, "text": text}``."""
+        if not queries:
+            return []
         logger.info(
-            f"Running async RAG search in namespace '{self.namespace}' for query: {query[:100]}..."
+            f"Running batched RAG search in namespace '{self.namespace}' for {len(queries)} queries..."
         )
         try:
-            # Run synchronous get_relevant_documents in a thread to make it async-compatible
-            loop = asyncio.get_event_loop()
-            docs = await loop.run_in_executor(
-                None, self.retriever.get_relevant_documents, query
+            vectors = await self.embedder.aembed_documents(
+                queries, chunk_size=settings.RAG_EMBED_BATCH_SIZE
             )
-            evidence = [doc.page_content for doc in docs]
-            logger.info(f"Retrieved {len(evidence)} documents.")
-            return evidence
         except Exception as e:
-            logger.error(
-                f"RAG search failed for query '{query[:100]}...' in namespace '{self.namespace}': {e}"
+            logger.error(f"Batched query embedding failed in namespace '{self.namespace}': {e}")
+            return [[] for _ in queries]
+
+        lexical_index = (
+            get_lexical_index(self.namespace) if settings.RAG_HYBRID_ENABLED else None
+        )
+        top_k = max(self.k, settings.RAG_HYBRID_CANDIDATES) if lexical_index else self.k
+        try:
+            match_lists = await self.backend.query(self.namespace, vectors, top_k)
+        except Exception as e:
+            logger.error(f"RAG search failed in namespace '{self.namespace}': {e}")
+            return [[] for _ in queries]
+        results = [
+            [
+                {"id": match.id, "text": match.metadata.get("text", "")}
+                for match in matches
+                if match.metadata
+            ]
+            for matches in match_lists
+        ]
+        if lexical_index is not None:
+            results = await asyncio.to_thread(
+                self._fuse_lexical, lexical_index, queries, results
             )
-            return []
+        logger.info(
+            f"Retrieved {sum(len(r) for r in results)} documents for {len(queries)} queries."
+        )
+        return results
+
+    def _fuse_lexical(self, lexical_index, queries: List[str], results):
+        fused = []
+        for query, vector_matches in zip(queries, results):
+            try:
+                lexical_matches = lexical_index.search(
+                    query, settings.RAG_HYBRID_CANDIDATES
+                )
+            except Exception as e:
+                logger.error(f"Lexical search failed in namespace '{self.namespace}': {e}")
+                lexical_matches = []
+            fused.append(
+                fuse_rankings(
+                    [
+                        (vector_matches, 1.0),
+                        (lexical_matches, settings.RAG_HYBRID_LEXICAL_WEIGHT),
+                    ],
+                    self.k,
+                )
+            )
+        return fused
 
+    async def aclose(self):
+        """Release the backend, e.g. the pooled async Pinecone connection."""
+        if self._backend is not None:
+            await self._backend.aclose()
+            self._backend = None
 
-# Create one shared instance
-rag_searcher = RAGSearcher()
@@ -0,0 +1,113 @@
+import logging
+import os
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from config import settings
+from enums.usage import UsageStageEnum
+from services.openAI.usage import usage_stage
+from utils.tokens import count_tokens
+from vector_store.pinecone import chunk_text, get_embedder
+
+logger = logging.getLogger(__name__)
+
+
+class VSSIndex:
+    """In-memory index over the VSS documents of a single analysis.
+
+    The VSS text is chunked and embedded once; each analysis sub-batch then
+    asks for the passages closest to its indicators instead of receiving the
+    whole VSS. ``save``/``load`` share the embedded passages between the
+    partition jobs of one analysis.
+    """
+
+    def __init__(self, vss_texts: List[str], k: int | None = None):
+        self.k = k or settings.VSS_RETRIEVAL_TOP_K
+        self.embedder = get_embedder()
+        self.passages: List[str] = []
+        for text in vss_texts:
+            documents = chunk_text(
+                text,
+                chunk_size=settings.VSS_CHUNK_SIZE,
+                chunk_overlap=settings.VSS_CHUNK_OVERLAP,
+            )
+            self.passages.extend(doc.page_content for doc in documents)
+        self.vectors = np.zeros((0, 0), dtype=np.float32)
+        self.query_vectors: Dict[str, np.ndarray] = {}
+        self.full_tokens = count_tokens(" ".join(vss_texts))
+
+    async def build(self) -> None:
+        """Embed all VSS passages; call once before ``context_for_batch``."""
+        if not self.passages:
+            logger.warning("VSS index built with no passages")
+            return
+        with usage_stage(UsageStageEnum.RETRIEVE.value):
+            embeddings = await self.embedder.aembed_documents(self.passages)
+        self.vectors = self._normalize(np.array(embeddings, dtype=np.float32))
+        logger.info(
+            f"Indexed {len(self.passages)} VSS passages (~{self.full_tokens} tokens in full text)"
+        )
+
+    def save(self, path: str) -> None:
+        """Write the passages and their vectors to ``path`` (an .npz file)."""
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez(
+                f,
+                passages=np.array(self.passages, dtype=str),
+                vectors=self.vectors,
+                full_tokens=np.array(self.full_tokens),
+            )
+        # Readers never see a partly written file
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str, k: int | None = None) -> Optional["VSSIndex"]:
+        """The index saved at ``path``, or None if there is none."""
+        if not os.path.exists(path):
+            return None
+        index = cls([], k)
+        with np.load(path) as data:
+            index.passages = data["passages"].tolist()
+            index.vectors = data["vectors"]
+            index.full_tokens = int(data["full_tokens"])
+        logger.info(f"Loaded {len(index.passages)} VSS passages from {path}")
+        return index
+
+    async def context_for_batch(self, batch: List[Dict[str, str]]) -> str:
+        """Return the top-k VSS passages for the indicators in ``batch``."""
+        if not len(self.vectors):
+            return ""
+        await self.embed_questions(batch)
+        queries = np.stack(
+            [self.query_vectors[item["indicator_id"]] for item in batch]
+        )
+        # A passage scores as its best match against any indicator in the batch
+        scores = (queries @ self.vectors.T).max(axis=0)
+        top = np.argsort(-scores)[: self.k]
+        context = "\n\n".join(
+            f"[VSS passage {rank}] {self.passages[i]}"
+            for rank, i in enumerate(sorted(top), 1)
+        )
+        return context
+
+    async def embed_questions(self, batch: List[Dict[str, str]]) -> None:
+        missing = [
+            item for item in batch if item["indicator_id"] not in self.query_vectors
+        ]
+        if not missing:
+            return
+        questions = [item["question"] for item in missing]
+        with usage_stage(UsageStageEnum.RETRIEVE.value):
+            embeddings = await self.embedder.aembed_documents(questions)
+        vectors = self._normalize(np.array(embeddings, dtype=np.float32))
+        for item, vector in zip(missing, vectors):
+            self.query_vectors[item["indicator_id"]] = vector
+
+    @staticmethod
+    def _normalize(vectors: np.ndarray) -> np.ndarray:
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
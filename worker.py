@@ -0,0 +1,41 @@
+"""Standalone job worker.
+
+Runs queued jobs from the shared database without serving HTTP. Start as many
+as needed, on any host that can reach the database:
+
+    python worker.py
+"""
+import logging
+import signal
+import threading
+
+from db import Base, engine
+from services.jobs import job_runner
+from services.openAI.clients import llm_clients
+
+# Importing the controllers registers their job handlers
+import controllers.analysis  # noqa: F401
+import controllers.indicator  # noqa: F401
+import controllers.regulation  # noqa: F401
+import controllers.report  # noqa: F401
+
+logger = logging.getLogger(__name__)
+
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+    Base.metadata.create_all(bind=engine)
+
+    stopping = threading.Event()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(sig, lambda *_: stopping.set())
+
+    job_runner.shutdown_hooks.append(llm_clients.aclose)
+    job_runner.start()
+    stopping.wait()
+    logger.info(f"Stopping worker {job_runner.worker_id}")
+    job_runner.stop()
+
+
+if __name__ == "__main__":
+    main()